@@ -0,0 +1,113 @@
+# 2024 Sven van Loon
+
+"""
+Round-trip random rule sets through the binary rule bank format.
+
+Run from the root of the repository, e.g.:
+
+    python -m benchmarks.bank --rounds 50 --rules 200
+
+Every round writes differently spelled random rules (redundant parentheses,
+'~' or '!', spacing) with 'dumps' and reads them back with 'loads'. The
+names and texts are compared with the ones written, the results of every
+rule compiled from the bank and of the restored RuleSet with the original
+ones. Any difference makes the command exit with status 1.
+"""
+
+from benchmarks.corpus import generate_expression
+from src.bank import dumps, loads
+from src.ruleset import RuleSet
+from src.expression import LogicalExpression
+from typing import List
+import argparse
+import random
+import sys
+
+ROUNDS = 20
+RULES = 100
+LEAVES = 12
+VARIABLES = 6
+ROWS = 16
+
+
+def _respell(text: str, rng: random.Random) -> str:
+    """
+    Write an expression differently without changing its tree.
+    """
+    if rng.random() < 0.5:
+        text = text.replace('!', '~')
+    if rng.random() < 0.3:
+        text = f"({text})"
+    if rng.random() < 0.3:
+        text = text.replace(' ', '')
+    return text
+
+
+def round_trip(rng: random.Random, rules: int) -> List[str]:
+    """
+    Round-trip one random rule set.
+
+    Returns:
+        List[str]: A description of every difference.
+    """
+    names = [chr(ord('A') + i) for i in range(VARIABLES)]
+    texts = []
+    for _ in range(rules):
+        if texts and rng.random() < 0.3:
+            # Another spelling of an earlier rule, which the expression cache
+            # maps to the same parsed expression.
+            text = rng.choice(texts).replace('~', '!')
+        else:
+            text = generate_expression(rng.randint(1, LEAVES), names,
+                                       ['&', '|', '->', '<->'], rng)
+        texts.append(_respell(text, rng))
+    # Half of the rules are named, the others are named by their text.
+    rules = {f"r{i}" if i % 2 else text: text
+             for i, text in enumerate(dict.fromkeys(texts))}
+    original = RuleSet(rules)
+    errors = []
+    with loads(dumps(original)) as bank:
+        if bank.names != list(rules):
+            errors.append("names differ")
+        restored = bank.ruleset()
+        for name, text in rules.items():
+            if bank.text(name) != text:
+                errors.append(f"text of {name!r}: {bank.text(name)!r}"
+                              f" instead of {text!r}")
+            expression = LogicalExpression(text)
+            function = bank.function(name)
+            for _ in range(ROWS // 4):
+                row = [rng.choice((0, 0.5, 1)) for _ in expression.var]
+                if function(*row) != expression.compile()(*row):
+                    errors.append(f"result of {name!r} for {row}")
+        if restored.texts != list(rules.values()):
+            errors.append("texts of the restored rule set differ")
+        rows = [dict(zip(original.var, [rng.choice((0, 0.5, 1))
+                                        for _ in original.var]))
+                for _ in range(ROWS)]
+        if restored.evaluate_many(rows) != original.evaluate_many(rows):
+            errors.append("results of the restored rule set differ")
+    return errors
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--rules', type=int, default=RULES,
+                        help="rules per round")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    errors = []
+    for _ in range(args.rounds):
+        errors += round_trip(rng, args.rules)
+    for error in errors[:20]:
+        print(f"MISMATCH {error}")
+    print(f"{args.rounds} rounds x {args.rules} rules: {len(errors)}"
+          f" mismatches")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
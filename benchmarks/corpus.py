@@ -0,0 +1,99 @@
+# 2024 Sven van Loon
+
+import random
+import string
+from typing import Dict, Iterator, List, NamedTuple
+
+OPERATOR_MIXES = {
+    'mixed': ['&', '|', '->', '<->'],
+    'and-or': ['&', '|'],
+    'implication': ['->', '<->'],
+}
+SIZES = [10, 100, 1000, 10000, 100000]
+VARIABLE_COUNTS = [3, 8, 20]
+NEGATION_PROBABILITY = 0.2
+# Together with its operator, negations and parentheses a leaf takes about
+# this many tokens in large expressions.
+TOKENS_PER_LEAF = 5
+
+
+class Case(NamedTuple):
+    """
+    A generated expression together with the parameters it was generated
+    from.
+    """
+    name: str
+    tokens: int
+    variables: int
+    operators: str
+    text: str
+
+
+def generate_expression(leaves: int, variables: List[str],
+                        operators: List[str], rng: random.Random) -> str:
+    """
+    Generate a random expression.
+
+    The tree is built by splitting the leaves at a random point, so its depth
+    grows logarithmically with its size like the depth of a random binary
+    search tree. Composite operands are always parenthesised, the parser
+    gives all binary operators the same precedence.
+
+    Args:
+        leaves (int): The number of variable occurrences.
+        variables (List[str]): The variables to draw from.
+        operators (List[str]): The binary operators to draw from.
+        rng (random.Random): The random number generator.
+
+    Returns:
+        str: The expression.
+    """
+    if leaves == 1:
+        text = rng.choice(variables)
+    else:
+        split = rng.randint(1, leaves - 1)
+        left = generate_expression(split, variables, operators, rng)
+        right = generate_expression(leaves - split, variables, operators, rng)
+        if split > 1:
+            left = f"({left})"
+        if leaves - split > 1:
+            right = f"({right})"
+        text = f"{left} {rng.choice(operators)} {right}"
+    if rng.random() < NEGATION_PROBABILITY:
+        text = f"!{text}" if leaves == 1 else f"!({text})"
+    return text
+
+
+def generate_corpus(sizes: List[int] = SIZES,
+                    variable_counts: List[int] = VARIABLE_COUNTS,
+                    mixes: Dict[str, List[str]] = OPERATOR_MIXES,
+                    seed: int = 0) -> Iterator[Case]:
+    """
+    Generate one expression for every combination of approximate size in
+    tokens, number of variables and operator mix.
+
+    The corpus only depends on the seed, so results of different runs
+    compare the same expressions.
+
+    Args:
+        sizes (List[int]): The approximate numbers of tokens.
+        variable_counts (List[int]): The numbers of distinct variables, at
+        most 52.
+        mixes (Dict[str, List[str]]): The operator mixes by name.
+        seed (int): The seed of the random number generator.
+
+    Yields:
+        Case: The generated expressions. The number of tokens is only
+        approximate and small expressions can use fewer variables than
+        requested.
+    """
+    letters = string.ascii_uppercase + string.ascii_lowercase
+    for size in sizes:
+        for count in variable_counts:
+            for mix, operators in mixes.items():
+                rng = random.Random(f"{seed}-{size}-{count}-{mix}")
+                leaves = max(1, size // TOKENS_PER_LEAF)
+                text = generate_expression(leaves, list(letters[:count]),
+                                           operators, rng)
+                yield Case(f"tokens={size} variables={count} operators={mix}",
+                           size, count, mix, text)
@@ -0,0 +1,240 @@
+# 2024 Sven van Loon
+
+"""
+Benchmark the phases of the logical expression evaluator.
+
+Run from the root of the repository, e.g.:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Every phase is timed as the best of a few repeats and its peak memory is
+measured in a separate run with tracemalloc, which would otherwise slow down
+the timed runs.
+"""
+
+from benchmarks.corpus import SIZES, Case, generate_corpus
+from src.compiler import compile_flat
+from src.expression import LogicalExpression
+from src.parser import parse
+from contextlib import redirect_stdout
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import tracemalloc
+
+LOGICS = {'classical': None, 'lukasiewicz-3': '3'}
+TRUTH_VALUES = {None: (1, 0), '3': (1, 0.5, 0)}
+REPEAT = 3
+# The evaluate phase evaluates about this many nodes, spread over as many
+# random rows as it takes.
+EVALUATE_WORK = 1 << 18
+# Truth tables of more rows times tokens are not rendered.
+RENDER_WORK = 1 << 18
+THRESHOLD = 0.2
+# Fast phases are called repeatedly until a timed run takes this long.
+MIN_TIME = 0.05
+# tracemalloc looks up the line number of every allocation, which takes time
+# linear in the size of the generated function of an expression. The peak
+# memory of phases running that function is not measured above this many
+# tokens.
+TRACE_LIMIT = 20000
+
+
+def measure(function: Callable[[], object], repeat: int,
+            trace: bool = True) -> Tuple[float, int | None]:
+    """
+    Time a function and measure its peak memory.
+
+    Args:
+        function (Callable): The function to measure.
+        repeat (int): The number of timed runs, a run calls the function as
+        many times as needed to take at least MIN_TIME seconds.
+        trace (bool): If False, the peak memory is not measured.
+
+    Returns:
+        tuple: The best time per call in seconds and the peak number of bytes
+        allocated during a call, or None if it was not measured.
+    """
+    number = 1
+    while True:
+        start = perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = perf_counter() - start
+        if elapsed >= MIN_TIME:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (perf_counter() - start) / number)
+    if not trace:
+        return best, None
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def _render(expression: LogicalExpression, logic: str | None) -> None:
+    with redirect_stdout(io.StringIO()):
+        expression.truth_table(logic)
+
+
+def benchmark_case(case: Case, repeat: int = REPEAT) -> Dict:
+    """
+    Benchmark all phases for one expression.
+
+    The phases are 'parse' (tokenizing and building the tree), 'construct'
+    (a complete LogicalExpression), 'compile' (generating the evaluation
+    function) and, for every logic, 'evaluate' (a batch of random rows with
+    intermediate evaluations) and 'render' (printing the truth table, skipped
+    for large tables).
+
+    Args:
+        case (Case): The generated expression.
+        repeat (int): The number of timed runs of every phase.
+
+    Returns:
+        Dict: The number of tokens and variables of the expression and for
+        every phase its time, throughput and peak memory.
+    """
+    expression = LogicalExpression(case.text)
+    tokens = len(expression.exp)
+    flat = expression.flat
+    positions = expression.evaluation_positions
+    # Compile outside of the timed evaluations.
+    expression._compile_evaluations()
+    trace = tokens <= TRACE_LIMIT
+    phases = {
+        'parse': (lambda: parse(case.text), tokens, 'tokens/s', True),
+        'construct': (lambda: LogicalExpression(case.text), tokens,
+                      'tokens/s', True),
+        'compile': (lambda: compile_flat(flat, positions), tokens,
+                    'tokens/s', True),
+    }
+    rng = random.Random(case.name)
+    for name, logic in LOGICS.items():
+        values = TRUTH_VALUES[logic]
+        rows = max(16, EVALUATE_WORK // tokens)
+        batch = [tuple(rng.choice(values) for _ in expression.var)
+                 for _ in range(rows)]
+        phases[f'evaluate[{name}]'] = (
+            lambda batch=batch: expression.evaluate_many(batch, True),
+            rows, 'rows/s', trace)
+        rows = len(values) ** len(expression.var)
+        if rows * tokens <= RENDER_WORK:
+            phases[f'render[{name}]'] = (
+                lambda logic=logic: _render(expression, logic), rows,
+                'rows/s', trace)
+
+    results = {}
+    for phase, (function, amount, unit, traced) in phases.items():
+        seconds, peak = measure(function, repeat, traced)
+        results[phase] = {'seconds': seconds,
+                          'throughput': amount / seconds if seconds else None,
+                          'unit': unit, 'peak_bytes': peak}
+    return {'tokens': tokens, 'variables': len(expression.var),
+            'phases': results}
+
+
+def run(sizes: List[int] = SIZES, repeat: int = REPEAT,
+        verbose: bool = True) -> Dict:
+    """
+    Benchmark every expression of the generated corpus.
+
+    Returns:
+        Dict: The environment the benchmark ran in and the results of every
+        case keyed by its name.
+    """
+    results = {}
+    for case in generate_corpus(sizes):
+        if verbose:
+            print(case.name, file=sys.stderr)
+        results[case.name] = benchmark_case(case, repeat)
+    return {'environment': {'python': platform.python_version(),
+                            'implementation':
+                                platform.python_implementation(),
+                            'machine': platform.machine()},
+            'results': results}
+
+
+def compare(results: Dict, baseline: Dict,
+            threshold: float = THRESHOLD) -> List[str]:
+    """
+    Compare benchmark results with a baseline.
+
+    Args:
+        results (Dict): The results of 'run'.
+        baseline (Dict): Earlier results of 'run'.
+        threshold (float): The relative change in time or peak memory
+        reported as a regression or improvement.
+
+    Returns:
+        List[str]: A line for every phase that became slower or used more
+        memory by more than the threshold. Improvements are printed but not
+        returned.
+    """
+    regressions = []
+    for case, result in results['results'].items():
+        base_phases = baseline['results'].get(case, {}).get('phases', {})
+        for phase, measured in result['phases'].items():
+            base = base_phases.get(phase)
+            if base is None:
+                continue
+            for key, label in (('seconds', 'time'), ('peak_bytes', 'memory')):
+                if not base[key] or measured[key] is None:
+                    continue
+                ratio = measured[key] / base[key]
+                line = f"{case} {phase} {label}: {base[key]:.6g} ->" \
+                       f" {measured[key]:.6g} ({ratio:.2f}x)"
+                if ratio > 1 + threshold:
+                    regressions.append(line)
+                elif ratio < 1 / (1 + threshold):
+                    print(f"improved {line}")
+    for line in regressions:
+        print(f"REGRESSED {line}")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help="approximate expression sizes in tokens")
+    parser.add_argument('--quick', action='store_true',
+                        help="only sizes up to 1000 tokens, one repeat")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', help="write the results to this file")
+    parser.add_argument('--baseline', help="compare with earlier results")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="relative change reported as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [size for size in args.sizes if size <= 1000] if args.quick \
+        else args.sizes
+    results = run(sizes, 1 if args.quick else args.repeat)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
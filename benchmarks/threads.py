@@ -0,0 +1,169 @@
+# 2024 Sven van Loon
+
+"""
+Stress and scale shared expressions across threads.
+
+Run from the root of the repository, e.g.:
+
+    python -m benchmarks.threads --threads 8 --rounds 200
+
+Every thread evaluates its own random assignments with the same shared
+LogicalExpression and CompiledExpression objects, through every evaluation
+entry point, and compares each result with a reference computed in a single
+thread beforehand. Any difference is cross-talk between threads and makes
+the command exit with status 1. The thread switch interval is lowered to
+interleave the threads as much as possible.
+
+Afterwards 'evaluate_threaded' is timed with one thread and with all of
+them. The speedup is only expected on free-threaded builds of CPython.
+"""
+
+from benchmarks.corpus import generate_expression
+from src.expression import LogicalExpression
+from threading import Barrier, Thread
+from time import perf_counter
+from typing import List
+import argparse
+import random
+import sys
+
+THREADS = 8
+ROUNDS = 100
+ROWS = 64
+EXPRESSIONS = 16
+LEAVES = 40
+VARIABLES = 6
+SWITCH_INTERVAL = 1e-6
+SCALE_ROWS = 1 << 19
+
+
+def _assignments(expression: LogicalExpression, rng: random.Random,
+                 rows: int) -> List[tuple]:
+    return [tuple(rng.choice((0, 0.5, 1)) for _ in expression.var)
+            for _ in range(rows)]
+
+
+def _reference(text: str, rows: List[tuple]) -> tuple:
+    """
+    Compute the expected results of a thread with its own instance.
+    """
+    expression = LogicalExpression(text)
+    results = [expression.compile()(*row) for row in rows]
+    lines = [expression._evaluate(dict(zip(expression.var, row)))[1]
+             for row in rows]
+    table = list(expression.iter_truth_table('3'))
+    return results, lines, table
+
+
+def _stress(shared: List[LogicalExpression], rounds: int, rows: int,
+            seed: int, barrier: Barrier, errors: List[str]) -> None:
+    """
+    Evaluate random assignments with the shared expressions and record
+    every result that differs from the reference.
+    """
+    rng = random.Random(seed)
+    work = []
+    for expression in shared:
+        assignment = _assignments(expression, rng, rows)
+        work.append((expression, assignment,
+                     _reference(expression.text, assignment)))
+    barrier.wait()
+    for i in range(rounds):
+        expression, rows_, (results, lines, table) = work[i % len(work)]
+        frozen = expression.freeze()
+        dicts = [dict(zip(expression.var, row)) for row in rows_]
+        checks = {
+            'evaluate_many': expression.evaluate_many(rows_),
+            'evaluate_threaded': frozen.evaluate_threaded(rows_, workers=2,
+                                                          chunk_size=16),
+            'evaluate': [frozen.evaluate(**values) for values in dicts],
+            'evaluate_intermediate': [frozen.evaluate_intermediate(**values)[0]
+                                      for values in dicts],
+            'call': [frozen(*row) for row in rows_],
+        }
+        for name, got in checks.items():
+            if got != results:
+                errors.append(f"{name} of {expression.text!r} in thread"
+                              f" {seed}")
+        if [expression._evaluate(values)[1] for values in dicts] != lines:
+            errors.append(f"evaluation lines of {expression.text!r} in"
+                          f" thread {seed}")
+        if i % 10 == 0 and list(expression.iter_truth_table('3')) != table:
+            errors.append(f"truth table of {expression.text!r} in thread"
+                          f" {seed}")
+
+
+def stress(threads: int, rounds: int, rows: int = ROWS) -> List[str]:
+    """
+    Run the stress test.
+
+    Returns:
+        List[str]: A description of every result that differed from the
+        reference, empty if there was no cross-talk.
+    """
+    rng = random.Random(0)
+    names = [chr(ord('A') + i) for i in range(VARIABLES)]
+    shared = [LogicalExpression(generate_expression(LEAVES, names,
+                                                    ['&', '|', '->', '<->'],
+                                                    rng))
+              for _ in range(EXPRESSIONS)]
+    errors = []
+    barrier = Barrier(threads)
+    workers = [Thread(target=_stress,
+                      args=(shared, rounds, rows, seed, barrier, errors))
+               for seed in range(threads)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return errors
+
+
+def scale(threads: int, rows: int = SCALE_ROWS) -> tuple:
+    """
+    Time 'evaluate_threaded' on one thread and on 'threads' threads.
+
+    Returns:
+        tuple: The seconds taken with one thread and with all threads.
+    """
+    rng = random.Random(1)
+    names = [chr(ord('A') + i) for i in range(VARIABLES)]
+    expression = LogicalExpression(generate_expression(
+        LEAVES, names, ['&', '|', '->', '<->'], rng))
+    frozen = expression.freeze()
+    batch = _assignments(expression, rng, rows)
+    times = []
+    for workers in (1, threads):
+        start = perf_counter()
+        frozen.evaluate_threaded(batch, workers=workers)
+        times.append(perf_counter() - start)
+    return tuple(times)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=THREADS)
+    parser.add_argument('--rounds', type=int, default=ROUNDS,
+                        help="evaluation rounds per thread")
+    args = parser.parse_args(argv)
+
+    errors = stress(args.threads, args.rounds)
+    for error in errors[:20]:
+        print(f"MISMATCH {error}")
+    print(f"{args.threads} threads x {args.rounds} rounds:"
+          f" {len(errors)} mismatches")
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    single, parallel = scale(args.threads)
+    print(f"evaluate_threaded: {single:.3f}s on 1 thread, {parallel:.3f}s on"
+          f" {args.threads} threads ({single / parallel:.2f}x,"
+          f" GIL {'enabled' if gil else 'disabled'})")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
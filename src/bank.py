@@ -0,0 +1,321 @@
+# 2024 Sven van Loon
+
+from src.compiler import compile_flat
+from src.flat import FlatExpression, VARIABLE, NEGATION
+from src.ruleset import RuleSet, Rule
+from array import array
+import mmap
+import struct
+import sys
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence
+
+MAGIC = b'LERB'
+VERSION = 1
+# magic, version, rules, nodes, variables, nodes of the rule trees
+PREFIX = struct.Struct('<4sB3xIIII')
+# Integers are stored as little-endian int32, like array('i').
+INT = array('i').itemsize
+
+
+def _subgraph(opcodes: Sequence[int], left: Sequence[int],
+              right: Sequence[int], variables: Sequence[int],
+              var: List[str], root: int) -> FlatExpression:
+    """
+    Extract the nodes of a graph a root depends on as a FlatExpression over
+    their own sorted variables, the position of every node is its index in
+    the graph.
+    """
+    reachable = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node in reachable:
+            continue
+        reachable.add(node)
+        if opcodes[node] != VARIABLE:
+            stack.append(left[node])
+            if opcodes[node] != NEGATION:
+                stack.append(right[node])
+    nodes = sorted(reachable)
+    names = sorted({var[variables[node]] for node in nodes
+                    if opcodes[node] == VARIABLE})
+    rank = {name: i for i, name in enumerate(names)}
+    index = {node: i for i, node in enumerate(nodes)}
+    flat = FlatExpression(names, array('b'), array('i'), array('i'),
+                          array('i'), array('i'))
+    for node in nodes:
+        opcode = opcodes[node]
+        flat.opcodes.append(opcode)
+        flat.positions.append(node)
+        if opcode == VARIABLE:
+            flat.variables.append(rank[var[variables[node]]])
+            flat.left.append(-1)
+            flat.right.append(-1)
+            continue
+        flat.variables.append(-1)
+        flat.left.append(index[left[node]])
+        flat.right.append(-1 if opcode == NEGATION else index[right[node]])
+    return flat
+
+
+def _int_bytes(values: Iterable[int]) -> bytes:
+    values = array('i', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _copy(typecode: str, values: Sequence[int]) -> array:
+    """
+    Copy a view of the mapped file, or an array, into a new array.
+    """
+    copy = array(typecode)
+    copy.frombytes(memoryview(values).cast('B'))
+    return copy
+
+
+def _strings(strings: List[str]) -> tuple:
+    """
+    Encode strings as one UTF-8 blob and the offsets of their ends.
+    """
+    encoded = [string.encode() for string in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return b''.join(encoded), offsets
+
+
+def dumps(rules: RuleSet | Iterable[Rule] | Mapping[str, Rule]) -> bytes:
+    """
+    Serialise rules to the binary format read by 'RuleBank'.
+
+    The file is a fixed prefix followed by int32 arrays of the graph of the
+    rules as built by RuleSet: the root node of every rule, the end offsets
+    of the names, texts and variables in their string blobs, and the
+    operands and variables of every node. They are followed by the opcodes
+    as bytes and the UTF-8 blobs of the variable table, the names and the
+    original texts of the rules. All integers are little-endian.
+
+    Args:
+        rules (RuleSet, Iterable or Mapping): The rules, a RuleSet or the
+        rules to create one from.
+
+    Returns:
+        bytes: The serialised rules.
+
+    Raises:
+        ValueError: If a rule is not a valid expression or two rules have
+        the same name.
+    """
+    if not isinstance(rules, RuleSet):
+        rules = RuleSet(rules)
+    var = list(rules._variable_ids)
+    var_blob, var_offsets = _strings(var)
+    names_blob, name_offsets = _strings(rules.names)
+    texts_blob, text_offsets = _strings(rules.texts)
+    return b''.join([
+        PREFIX.pack(MAGIC, VERSION, len(rules), len(rules._opcodes),
+                    len(var), rules._tree_nodes),
+        _int_bytes(rules._roots), _int_bytes(name_offsets),
+        _int_bytes(text_offsets), _int_bytes(var_offsets),
+        _int_bytes(rules._left), _int_bytes(rules._right),
+        _int_bytes(rules._variables), rules._opcodes.tobytes(),
+        var_blob, names_blob, texts_blob])
+
+
+def write_bank(rules: RuleSet | Iterable[Rule] | Mapping[str, Rule],
+               path: str) -> int:
+    """
+    Write rules to a file that can be opened with 'RuleBank', see 'dumps'.
+
+    Returns:
+        int: The number of bytes written.
+
+    Example:
+        >>> write_bank({'r1': "(A & B) | C", 'r2': "!(B & A)"}, "rules.lerb")
+        176
+    """
+    data = dumps(rules)
+    with open(path, 'wb') as file:
+        file.write(data)
+    return len(data)
+
+
+class RuleBank():
+    """
+    Rules written by 'write_bank', opened with mmap.
+
+    Opening a bank reads the names of the rules and the variable table and
+    nothing is parsed. The arrays of the graph are zero-copy views of the
+    mapped file: 'function' compiles a single rule from the nodes it depends
+    on, 'ruleset' copies the whole graph into a RuleSet that evaluates every
+    rule at once. The original texts are decoded when they are asked for.
+
+    Example:
+        >>> with RuleBank("rules.lerb") as bank:
+        ...     bank.function('r1')(1, 1, 0)
+        1
+    """
+
+    def __init__(self, source: str | bytes) -> None:
+        """
+        Args:
+            source (str or bytes): The path of a file written by
+            'write_bank', or the bytes returned by 'dumps'.
+
+        Raises:
+            ValueError: If the data is not a rule bank of a supported version
+            or is truncated.
+        """
+        self._file = None
+        self._map = None
+        if isinstance(source, str):
+            self._file = open(source, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+            source = self._map
+        self._views = []
+        try:
+            self._read(memoryview(source))
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f"The data is not a rule bank of version"
+                             f" {VERSION}.") from None
+        self._functions: Dict[str, Callable[..., float]] = {}
+
+    def _read(self, view: memoryview) -> None:
+        self._views.append(view)
+        magic, version, rules, nodes, variables, tree_nodes = \
+            PREFIX.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError
+        offset = PREFIX.size
+
+        def take(count: int, format: str = 'i') -> Sequence[int]:
+            nonlocal offset
+            size = count * (INT if format == 'i' else 1)
+            if offset + size > len(view):
+                raise ValueError
+            part = view[offset:offset + size]
+            offset += size
+            if format == 'i' and sys.byteorder == 'big':
+                # Big-endian machines read a byte-swapped copy.
+                values = _copy('i', part)
+                values.byteswap()
+                return values
+            part = part.cast(format)
+            self._views.append(part)
+            return part
+
+        self._roots = take(rules)
+        name_offsets = take(rules + 1)
+        self._text_offsets = take(rules + 1)
+        var_offsets = take(variables + 1)
+        self._left = take(nodes)
+        self._right = take(nodes)
+        self._variables = take(nodes)
+        self._opcodes = take(nodes, 'b')
+        var_blob = take(var_offsets[-1], 'B')
+        names_blob = take(name_offsets[-1], 'B')
+        self._texts = take(self._text_offsets[-1], 'B')
+        data = bytes(var_blob)
+        self.var_table: List[str] = [
+            data[var_offsets[i]:var_offsets[i + 1]].decode()
+            for i in range(variables)]
+        # The offsets count bytes of the encoded strings.
+        data = bytes(names_blob)
+        self.names: List[str] = [
+            data[name_offsets[i]:name_offsets[i + 1]].decode()
+            for i in range(rules)]
+        self._indices = {name: i for i, name in enumerate(self.names)}
+        self._tree_nodes = tree_nodes
+
+    def __enter__(self) -> 'RuleBank':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def var(self) -> List[str]:
+        """
+        The sorted variables of all rules.
+        """
+        return sorted(self.var_table)
+
+    def _index(self, name: str) -> int:
+        index = self._indices.get(name)
+        if index is None:
+            raise KeyError(f"Rule {name!r} does not exist.")
+        return index
+
+    def text(self, name: str) -> str:
+        """
+        Get the original text of a rule.
+
+        Raises:
+            KeyError: If the rule does not exist.
+        """
+        i = self._index(name)
+        return bytes(self._texts[self._text_offsets[i]:
+                                 self._text_offsets[i + 1]]).decode()
+
+    def flat(self, name: str) -> FlatExpression:
+        """
+        Get a rule as a FlatExpression over its own sorted variables, which
+        shares operands of '&', '|' and '<->' in the order of the graph.
+
+        Raises:
+            KeyError: If the rule does not exist.
+        """
+        return _subgraph(self._opcodes, self._left, self._right,
+                         self._variables, self.var_table,
+                         self._roots[self._index(name)])
+
+    def function(self, name: str) -> Callable[..., float]:
+        """
+        Compile a rule like 'LogicalExpression.compile', the function takes
+        the truth values of the variables of 'flat(name)' as positional
+        arguments in their sorted order. It is cached per rule.
+
+        Raises:
+            KeyError: If the rule does not exist.
+        """
+        function = self._functions.get(name)
+        if function is None:
+            function = compile_flat(self.flat(name), short_circuit=True)
+            self._functions[name] = function
+        return function
+
+    def ruleset(self) -> RuleSet:
+        """
+        Copy the graph into a RuleSet, which evaluates all rules at once and
+        to which more rules can be added.
+        """
+        data = bytes(self._texts)
+        offsets = self._text_offsets
+        texts = [data[offsets[i]:offsets[i + 1]].decode()
+                 for i in range(len(self.names))]
+        return RuleSet._restore(
+            list(self.names), texts, list(self.var_table),
+            _copy('b', self._opcodes), _copy('i', self._left),
+            _copy('i', self._right), _copy('i', self._variables),
+            _copy('i', self._roots), self._tree_nodes)
+
+
+def loads(data: bytes) -> RuleBank:
+    """
+    Read rules serialised by 'dumps'.
+    """
+    return RuleBank(data)
@@ -0,0 +1,99 @@
+# 2024 Sven van Loon
+
+from operator import itemgetter
+from typing import Iterable, List, Mapping, Sequence
+
+
+def check_batch_variables(var: Sequence[str], names: Iterable[str]) -> None:
+    """
+    Check that a batch assigns values to exactly the given variables.
+
+    Args:
+        var (Sequence[str]): The variables of the expression.
+        names (Iterable[str]): The variables the batch assigns values to.
+
+    Raises:
+        ValueError: If a variable is missing or does not exist in the
+        expression.
+    """
+    names = set(names)
+    for key in names:
+        if key not in var:
+            raise ValueError(f"Variable {key} was specified but does not"
+                             f" exist in the expression. This is the list"
+                             f" of variables in the expression {list(var)}")
+    missing = [name for name in var if name not in names]
+    if missing:
+        raise ValueError(f"No values were specified for the variables"
+                         f" {missing}.")
+
+
+def check_batch_values(var: Sequence[str], columns: List[list]) -> None:
+    """
+    Check that all values of a batch are numbers in the range [0, 1].
+
+    Args:
+        var (Sequence[str]): The variables of the expression.
+        columns (List[list]): One column of values per variable, in the
+        order of 'var'.
+
+    Raises:
+        TypeError: If a value is not of type int or float.
+        ValueError: If a value is outside the range [0, 1] or NaN.
+    """
+    for key, column in zip(var, columns):
+        for value in column:
+            if not isinstance(value, (int, float)):
+                raise TypeError(f"Value specified for variable {key} is"
+                                f" not of int or float type, it is of"
+                                f" {type(value)}")
+            # NaN fails every comparison, so it is rejected as well.
+            if not 0 <= value <= 1:
+                raise ValueError(f"Value specified for variable {key} is"
+                                 f" {value} which is not in the range"
+                                 f" [0, 1].")
+
+
+def batch_columns(var: Sequence[str],
+                  assignments: Mapping | Sequence) -> List[list]:
+    """
+    Convert a batch of assignments to one column of values per variable,
+    in the order of 'var'.
+
+    Args:
+        var (Sequence[str]): The variables of the expression.
+        assignments (Mapping or Sequence): Either a mapping of every
+        variable to a sequence of values, or a sequence of assignments
+        given as dictionaries or as tuples in the order of 'var'.
+
+    Returns:
+        List[list]: The columns of values.
+
+    Raises:
+        ValueError: If a variable is missing or does not exist in the
+        expression, or if the columns have different lengths.
+    """
+    if isinstance(assignments, Mapping):
+        check_batch_variables(var, assignments.keys())
+        columns = [list(assignments[name]) for name in var]
+        if len({len(column) for column in columns}) > 1:
+            raise ValueError("All columns of values must have the same"
+                             " length.")
+        return columns
+
+    rows = list(assignments)
+    if not rows:
+        return [[] for _ in var]
+    if isinstance(rows[0], Mapping):
+        check_batch_variables(var, rows[0].keys())
+        n = len(var)
+        if any(len(row) != n for row in rows):
+            raise ValueError(f"Every assignment must specify exactly the"
+                             f" variables {list(var)}.")
+        if n == 1:
+            return [[row[var[0]] for row in rows]]
+        rows = list(map(itemgetter(*var), rows))
+    elif any(len(row) != len(var) for row in rows):
+        raise ValueError(f"Every assignment must have one value for each"
+                         f" of the variables {list(var)}.")
+    return [list(column) for column in zip(*rows)]
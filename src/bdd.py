@@ -0,0 +1,353 @@
+# 2024 Sven van Loon
+
+from src.flat import (FlatExpression, VARIABLE, NEGATION, AND, OR,
+                      IMPLICATION, EQUIVALENCE)
+from typing import Dict, List
+
+FALSE_NODE = 0
+TRUE_NODE = 1
+
+
+class BDDManager():
+    """
+    A manager of reduced ordered binary decision diagrams.
+
+    Nodes are integers indexing the tables of the manager, 0 and 1 are the
+    terminal nodes. Every other node is a triple (level, low, high) made
+    unique by the unique table, so two equivalent functions compiled with
+    the same manager are always the same node. The results of 'ite' are
+    memoised in a computed table that is shared by all compilations.
+
+    The variable order is fixed by the order in which variables are first
+    declared, see 'declare'.
+    """
+
+    def __init__(self) -> None:
+        # Terminal nodes sit below every variable level.
+        self._level = [float('inf'), float('inf')]
+        self._low = [FALSE_NODE, TRUE_NODE]
+        self._high = [FALSE_NODE, TRUE_NODE]
+        self._unique = {}
+        self._computed = {}
+        self._order = []
+        self._levels = {}
+
+    @property
+    def order(self) -> List[str]:
+        """
+        The declared variables, from the top of the diagrams to the bottom.
+        """
+        return list(self._order)
+
+    def __len__(self) -> int:
+        return len(self._level)
+
+    def declare(self, names: List[str]) -> None:
+        """
+        Append variables to the variable order, variables that are already
+        declared keep their level.
+
+        Args:
+            names (List[str]): The variables, in the desired order.
+        """
+        for name in names:
+            if name not in self._levels:
+                self._levels[name] = len(self._order)
+                self._order.append(name)
+
+    def _make(self, level: int, low: int, high: int) -> int:
+        """
+        Get the unique node with the given level and children.
+        """
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            node = len(self._level)
+            self._level.append(level)
+            self._low.append(low)
+            self._high.append(high)
+            self._unique[key] = node
+        return node
+
+    def variable(self, name: str) -> int:
+        """
+        Get the diagram of a single variable, declaring it if needed.
+        """
+        self.declare([name])
+        return self._make(self._levels[name], FALSE_NODE, TRUE_NODE)
+
+    def _cofactors(self, node: int, level: int) -> tuple:
+        if self._level[node] == level:
+            return self._low[node], self._high[node]
+        return node, node
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        """
+        Compute the diagram of 'if f then g else h'.
+
+        Args:
+            f (int): The condition.
+            g (int): The diagram used where the condition is true.
+            h (int): The diagram used where the condition is false.
+
+        Returns:
+            int: The resulting node.
+        """
+        if f == TRUE_NODE:
+            return g
+        if f == FALSE_NODE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE_NODE and h == FALSE_NODE:
+            return f
+        key = (f, g, h)
+        result = self._computed.get(key)
+        if result is not None:
+            return result
+        level = min(self._level[f], self._level[g], self._level[h])
+        f0, f1 = self._cofactors(f, level)
+        g0, g1 = self._cofactors(g, level)
+        h0, h1 = self._cofactors(h, level)
+        result = self._make(level, self.ite(f0, g0, h0),
+                            self.ite(f1, g1, h1))
+        self._computed[key] = result
+        return result
+
+    def negate(self, f: int) -> int:
+        return self.ite(f, FALSE_NODE, TRUE_NODE)
+
+    def compile(self, flat: FlatExpression) -> int:
+        """
+        Compile an expression to a diagram in classical logic.
+
+        Variables that are not declared yet are appended to the order in the
+        order in which they first appear in the expression.
+
+        Args:
+            flat (FlatExpression): The flattened expression.
+
+        Returns:
+            int: The root node of the diagram.
+        """
+        nodes = []
+        for i, opcode in enumerate(flat.opcodes):
+            if opcode == VARIABLE:
+                nodes.append(self.variable(flat.var[flat.variables[i]]))
+                continue
+            a = nodes[flat.left[i]]
+            if opcode == NEGATION:
+                nodes.append(self.negate(a))
+                continue
+            b = nodes[flat.right[i]]
+            if opcode == AND:
+                nodes.append(self.ite(a, b, FALSE_NODE))
+            elif opcode == OR:
+                nodes.append(self.ite(a, TRUE_NODE, b))
+            elif opcode == IMPLICATION:
+                nodes.append(self.ite(a, b, TRUE_NODE))
+            elif opcode == EQUIVALENCE:
+                nodes.append(self.ite(a, b, self.negate(b)))
+        return nodes[flat.root]
+
+    def restrict(self, f: int, values: Dict[str, int]) -> int:
+        """
+        Fix the truth values of some variables of a diagram.
+
+        Args:
+            f (int): The root node of the diagram.
+            values (Dict[str, int]): The truth values (0 or 1) of the fixed
+            variables.
+
+        Returns:
+            int: The root node of the restricted diagram.
+        """
+        fixed = {self._levels[name]: value for name, value in values.items()
+                 if name in self._levels}
+        cache = {}
+
+        def restrict_node(node: int) -> int:
+            if node <= TRUE_NODE:
+                return node
+            if node not in cache:
+                level = self._level[node]
+                if level in fixed:
+                    child = self._high[node] if fixed[level] else \
+                        self._low[node]
+                    cache[node] = restrict_node(child)
+                else:
+                    cache[node] = self._make(level,
+                                             restrict_node(self._low[node]),
+                                             restrict_node(self._high[node]))
+            return cache[node]
+
+        return restrict_node(f)
+
+    def count(self, f: int, names: List[str]) -> int:
+        """
+        Count the satisfying assignments of a diagram.
+
+        Args:
+            f (int): The root node of the diagram.
+            names (List[str]): The variables the assignments range over, they
+            must include every variable the diagram depends on.
+
+        Returns:
+            int: The number of assignments of 'names' for which the function
+            is true.
+        """
+        levels = sorted(self._levels[name] for name in names)
+        # The rank of a level is the number of counted variables above it.
+        rank = {level: i for i, level in enumerate(levels)}
+        n = len(levels)
+        counts = {FALSE_NODE: 0, TRUE_NODE: 1}
+
+        def position(node: int) -> int:
+            return n if node <= TRUE_NODE else rank[self._level[node]]
+
+        def count_node(node: int) -> int:
+            if node not in counts:
+                here = position(node)
+                low, high = self._low[node], self._high[node]
+                counts[node] = \
+                    count_node(low) * 2 ** (position(low) - here - 1) + \
+                    count_node(high) * 2 ** (position(high) - here - 1)
+            return counts[node]
+
+        return count_node(f) * 2 ** position(f)
+
+    def paths(self, f: int) -> List[Dict[str, int]]:
+        """
+        List the paths from the root of a diagram to the true node.
+
+        Every path is a partial assignment of the variables tested on it,
+        the assignments of different paths are disjoint and together they
+        cover exactly the satisfying assignments of the diagram.
+
+        Args:
+            f (int): The root node of the diagram.
+
+        Returns:
+            List[Dict[str, int]]: The truth values (0 or 1) of the variables
+            on every path.
+        """
+        paths = []
+        stack = [(f, {})]
+        while stack:
+            node, path = stack.pop()
+            if node == TRUE_NODE:
+                paths.append(path)
+            elif node != FALSE_NODE:
+                name = self._order[self._level[node]]
+                stack.append((self._low[node], {**path, name: 0}))
+                stack.append((self._high[node], {**path, name: 1}))
+        return paths
+
+    def size(self, f: int) -> int:
+        """
+        Count the nodes of a diagram, including the terminal nodes.
+        """
+        seen = set()
+        stack = [f]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if node > TRUE_NODE:
+                stack += [self._low[node], self._high[node]]
+        return len(seen)
+
+
+class BDD():
+    """
+    A compiled diagram of an expression together with its manager and the
+    variables of the expression.
+    """
+
+    def __init__(self, manager: BDDManager, node: int,
+                 var: List[str]) -> None:
+        self.manager = manager
+        self.node = node
+        self.var = var
+
+    def count(self) -> int:
+        """
+        Count the rows of the classical truth table in which the expression
+        is true, in time linear in the size of the diagram.
+        """
+        return self.manager.count(self.node, self.var)
+
+    def size(self) -> int:
+        """
+        Count the nodes of the diagram, including the terminal nodes.
+        """
+        return self.manager.size(self.node)
+
+    def is_tautology(self) -> bool:
+        return self.node == TRUE_NODE
+
+    def is_contradiction(self) -> bool:
+        return self.node == FALSE_NODE
+
+    def equivalent(self, other: 'BDD') -> bool:
+        """
+        Check if two diagrams represent the same function, which for diagrams
+        of the same manager is a comparison of their root nodes.
+
+        Raises:
+            ValueError: If the diagrams belong to different managers.
+        """
+        if self.manager is not other.manager:
+            raise ValueError("Only diagrams of the same manager can be"
+                             " compared.")
+        return self.node == other.node
+
+    def restrict(self, **values) -> 'BDD':
+        """
+        Fix the truth values of some variables.
+
+        Args:
+            **values: Keyword arguments mapping variable names to 0 or 1.
+
+        Returns:
+            BDD: The diagram of the expression over the remaining variables.
+        """
+        node = self.manager.restrict(self.node, values)
+        var = [name for name in self.var if name not in values]
+        return BDD(self.manager, node, var)
+
+
+def variable_order(flat: FlatExpression) -> List[str]:
+    """
+    Order the variables of an expression for compilation to a diagram.
+
+    Variables are ordered by their first occurrence in a depth first
+    traversal of the tree, which keeps variables that are combined by the
+    same operators close together in the order. This is usually a much
+    better order than the alphabetical order of 'LogicalExpression.var'.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+
+    Returns:
+        List[str]: The variables in the order in which they are declared.
+    """
+    order = {}
+    for i in flat.variables:
+        if i >= 0:
+            order.setdefault(flat.var[i], len(order))
+    return list(order)
+
+
+_manager = BDDManager()
+
+
+def default_manager() -> BDDManager:
+    """
+    Get the process-wide manager, which shares its unique and computed tables
+    between all expressions compiled without an explicit manager.
+    """
+    return _manager
@@ -0,0 +1,78 @@
+# 2024 Sven van Loon
+
+from src.flat import (FlatExpression, VARIABLE, NEGATION, AND, OR,
+                      IMPLICATION, EQUIVALENCE)
+
+
+def variable_bitset(i: int, n: int) -> int:
+    """
+    Build the column of a variable in a classical truth table as a bitset.
+
+    Bit k of the returned integer holds the truth value of the variable in
+    row k of the truth table, with the rows ordered like the lines printed
+    by 'LogicalExpression.truth_table' (the first variable changes slowest,
+    1 comes before 0).
+
+    Args:
+        i (int): The index of the variable in the sorted list of variables.
+        n (int): The number of variables.
+
+    Returns:
+        int: The packed column of the variable.
+
+    Example:
+        >>> bin(variable_bitset(0, 2)), bin(variable_bitset(1, 2))
+        ('0b11', '0b101')
+    """
+    block = 1 << (n - 1 - i)
+    rows = 1 << n
+    column = (1 << block) - 1
+    period = 2 * block
+    # Double the pattern instead of multiplying, big-int division and
+    # multiplication are super-linear in the number of rows.
+    while period < rows:
+        column |= column << period
+        period *= 2
+    return column
+
+
+def evaluate_bitset(flat: FlatExpression) -> int:
+    """
+    Evaluate an expression over all rows of a classical truth table.
+
+    Each column is a Python integer holding one bit per row, so the bitwise
+    operators evaluate a whole column per operation.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+
+    Returns:
+        int: The packed result column of the expression, bit k is set if the
+        expression is true in row k of the truth table.
+    """
+    n = len(flat.var)
+    full = (1 << (1 << n)) - 1
+    columns = [variable_bitset(i, n) for i in range(n)]
+    results = []
+    for i, opcode in enumerate(flat.opcodes):
+        if opcode == VARIABLE:
+            results.append(columns[flat.variables[i]])
+            continue
+        # Every node has a single parent, release the operands as soon as
+        # they are used.
+        left_side = results[flat.left[i]]
+        results[flat.left[i]] = None
+        if opcode == NEGATION:
+            results.append(full & ~left_side)
+            continue
+        right_side = results[flat.right[i]]
+        results[flat.right[i]] = None
+        if opcode == AND:
+            results.append(left_side & right_side)
+        elif opcode == OR:
+            results.append(left_side | right_side)
+        elif opcode == IMPLICATION:
+            results.append(full & (~left_side | right_side))
+        elif opcode == EQUIVALENCE:
+            results.append(full & ~(left_side ^ right_side))
+    return results[flat.root]
@@ -0,0 +1,175 @@
+# 2024 Sven van Loon
+
+from src.expression import LogicalExpression
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+DEFAULT_MAXSIZE = 4096
+
+CacheInfo = namedtuple('CacheInfo',
+                       ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class ExpressionCache():
+    """
+    A size-bounded least recently used cache of parsed expressions.
+
+    Every written spelling of an expression gets its own LogicalExpression,
+    so its 'text', token positions and truth table are the ones the caller
+    wrote. Spellings that only differ in whitespace, redundant parentheses
+    or the spelling of the negation have the same canonical string (see
+    'FlatExpression.to_string') and share the compiled functions that do not
+    depend on token positions, see 'LogicalExpression._share_compiled'.
+
+    The cached LogicalExpression objects are shared between all callers of
+    'get' with the same spelling.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE) -> None:
+        if maxsize < 1:
+            raise ValueError(f"Cache size must be at least 1, got {maxsize}.")
+        self._maxsize = maxsize
+        # Canonical string -> the first expression of that tree, which owns
+        # the shared compiled functions.
+        self._entries = OrderedDict()
+        # Written spelling -> its own expression.
+        self._spellings = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = Lock()
+
+    def get(self, expression: str) -> LogicalExpression:
+        """
+        Get the parsed expression, parsing it only if it is not cached yet.
+
+        Args:
+            expression (str): The logical expression.
+
+        Returns:
+            LogicalExpression: The shared parsed expression of this spelling.
+
+        Raises:
+            SyntaxError: If the provided expression is not valid.
+        """
+        with self._lock:
+            parsed = self._spellings.get(expression)
+            if parsed is not None:
+                self._spellings.move_to_end(expression)
+                self._hits += 1
+                return parsed
+
+        parsed = LogicalExpression(expression)
+        key = parsed.flat.to_string()
+
+        with self._lock:
+            cached = self._spellings.get(expression)
+            if cached is not None:
+                # Another thread parsed the same spelling first.
+                self._hits += 1
+                return cached
+            self._misses += 1
+            owner = self._entries.get(key)
+            if owner is None:
+                self._remember(self._entries, key, parsed)
+            else:
+                self._entries.move_to_end(key)
+                parsed._share_compiled(owner)
+            self._evictions += self._remember(self._spellings, expression,
+                                              parsed)
+            return parsed
+
+    def _remember(self, table: OrderedDict, key: str, value) -> int:
+        """
+        Insert a value in one of the tables, evicting the least recently used
+        values that no longer fit.
+
+        Returns:
+            int: The number of evicted values.
+        """
+        table[key] = value
+        table.move_to_end(key)
+        evicted = 0
+        while len(table) > self._maxsize:
+            table.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def info(self) -> CacheInfo:
+        """
+        Report the statistics of the cache.
+
+        Returns:
+            CacheInfo: The number of hits, misses and evictions, the maximum
+            size and the current number of cached expressions.
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions,
+                             self._maxsize, len(self._spellings))
+
+    def clear(self) -> None:
+        """
+        Remove all cached expressions and reset the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._spellings.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def resize(self, maxsize: int) -> None:
+        """
+        Change the maximum number of cached expressions, evicting the least
+        recently used expressions if the cache shrinks.
+
+        Args:
+            maxsize (int): The new maximum number of cached expressions.
+
+        Raises:
+            ValueError: If the size is smaller than 1.
+        """
+        if maxsize < 1:
+            raise ValueError(f"Cache size must be at least 1, got {maxsize}.")
+        with self._lock:
+            self._maxsize = maxsize
+            while len(self._spellings) > maxsize:
+                self._spellings.popitem(last=False)
+                self._evictions += 1
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+
+_cache = ExpressionCache()
+
+
+def get_expression(expression: str) -> LogicalExpression:
+    """
+    Get a parsed expression from the process-wide expression cache.
+
+    Args:
+        expression (str): The logical expression.
+
+    Returns:
+        LogicalExpression: The shared parsed expression.
+    """
+    return _cache.get(expression)
+
+
+def cache_info() -> CacheInfo:
+    """
+    Report the statistics of the process-wide expression cache.
+    """
+    return _cache.info()
+
+
+def cache_clear() -> None:
+    """
+    Clear the process-wide expression cache and reset its statistics.
+    """
+    _cache.clear()
+
+
+def cache_resize(maxsize: int) -> None:
+    """
+    Change the maximum size of the process-wide expression cache.
+    """
+    _cache.resize(maxsize)
@@ -0,0 +1,506 @@
+# 2024 Sven van Loon
+
+"""
+Evaluate logical expressions from the command line.
+
+Every command reads JSON Lines from the given files, or from stdin if no
+file or '-' is given, and writes one JSON line per input line to stdout, in
+the order of the input:
+
+    table EXPRESSION      the truth table of an expression, one row per line,
+                          or rendered as text, markdown, latex or compact
+                          rows with --format
+    eval                  {"expression": "A & !C", "values": {"A": 1, "C": 0}}
+    eval -e "A & !C"      {"A": 1, "C": 0} or [1, 0] in the order of the
+                          sorted variables
+    check-sat             {"expression": "A & !C"} or "A & !C"
+    count                 {"expression": "A & !C"} or "A & !C"
+
+An "id" of an input object is copied to its output line. Lines that cannot
+be evaluated produce {"error": "..."} and make the command exit with
+status 1. With --workers the lines are processed in chunks by a pool of
+worker processes.
+"""
+
+from src.cache import get_expression
+from src.expression import BITSET_LIMIT
+from src.export import column_names
+from src.logics import get_logic
+from src.render import FORMATS
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice, product
+from typing import Callable, Iterable, Iterator, List, Tuple
+import argparse
+import json
+import os
+import sys
+
+LINES_PER_CHUNK = 1 << 12
+ROWS_PER_CHUNK = 1 << 14
+# Every worker has at most this many chunks queued, which bounds the memory
+# used for input that has been read but not written yet.
+CHUNKS_PER_WORKER = 2
+
+# The output of a chunk of lines and the number of lines that failed.
+Output = Tuple[str, int]
+
+
+def _iter_lines(paths: List[str]) -> Iterator[str]:
+    """
+    Lazily read the non-empty lines of the input files, stdin for '-'.
+    """
+    for path in paths or ['-']:
+        if path == '-':
+            lines = sys.stdin
+        else:
+            lines = open(path)
+        try:
+            for line in lines:
+                if line.strip():
+                    yield line
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+
+def _iter_chunks(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Group the items in lists of at most 'size' items.
+    """
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def _ordered_map(function: Callable, tasks: Iterable,
+                 workers: int) -> Iterator:
+    """
+    Apply a function to every task, in a pool of worker processes if
+    'workers' is greater than 1, and yield the results in the order of the
+    tasks.
+
+    Unlike 'Executor.map' the tasks are submitted while the results are
+    consumed, so an unbounded input is never read into memory at once.
+    """
+    if workers <= 1:
+        yield from map(function, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _error(error: Exception, prefix: str = '') -> str:
+    """
+    Format the output line of an input line that failed.
+    """
+    message = json.dumps(f"{type(error).__name__}: {error}")
+    return f"{{{prefix}\"error\": {message}}}\n"
+
+
+def _reject_constant(name: str) -> None:
+    raise ValueError(f"{name} is not a valid truth value.")
+
+
+def _loads(line: str):
+    """
+    Parse an input line, rejecting NaN and Infinity, which are not valid
+    JSON either.
+
+    Raises:
+        ValueError: If the line is not valid JSON.
+    """
+    return json.loads(line, parse_constant=_reject_constant)
+
+
+def _parse_expression_line(line: str) -> Tuple[str, str]:
+    """
+    Parse an input line holding an expression.
+
+    Returns:
+        tuple: The expression and the text written before the result
+        fields of its output line, which holds its id if it has one.
+
+    Raises:
+        ValueError: If the line is not valid JSON.
+        TypeError: If the line does not hold an expression.
+    """
+    record = _loads(line)
+    if isinstance(record, str):
+        return record, ''
+    if not isinstance(record, dict) or 'expression' not in record:
+        raise TypeError("A line must be an expression or an object with an"
+                        " 'expression'.")
+    prefix = f"\"id\": {json.dumps(record['id'])}, " if 'id' in record else ''
+    return record['expression'], prefix
+
+
+def _row(expression, values) -> tuple:
+    """
+    Order the values of an assignment like 'var'. The values themselves are
+    validated by 'evaluate_many'.
+
+    Raises:
+        ValueError: If a variable is missing or does not exist in the
+            expression, or the number of values does not match the
+            variables.
+        TypeError: If the values are neither an object nor an array, or a
+            value is a boolean.
+    """
+    if isinstance(values, dict):
+        names = expression.var
+        row = None
+        if len(values) == len(names):
+            try:
+                row = tuple(map(values.__getitem__, names))
+            except KeyError:
+                pass
+        if row is None:
+            expression._check_user_values(values)
+            missing = [name for name in names if name not in values]
+            if missing:
+                raise ValueError(f"No values were specified for the"
+                                 f" variables {missing}.")
+            row = tuple(values[name] for name in names)
+    elif isinstance(values, list):
+        if len(values) != len(expression.var):
+            raise ValueError(f"Expected {len(expression.var)} values for the"
+                             f" variables {expression.var}, got"
+                             f" {len(values)}.")
+        row = tuple(values)
+    else:
+        raise TypeError(f"The values must be an object or an array, not"
+                        f" {type(values).__name__}.")
+    for name, value in zip(expression.var, row):
+        # JSON true and false are bools, which Python treats as ints.
+        if isinstance(value, bool):
+            raise TypeError(f"Value specified for variable {name} is a"
+                            f" boolean, use 1 or 0.")
+    return row
+
+
+def _evaluate_lines(text: str | None, lines: List[str]) -> Output:
+    """
+    Evaluate a chunk of 'eval' input lines.
+
+    Lines with the same expression, which are all lines if 'text' is given,
+    are validated and evaluated as one batch with 'evaluate_many'. A batch
+    that contains an invalid assignment is evaluated line by line to report
+    the error of each line.
+    """
+    outputs = [''] * len(lines)
+    errors = 0
+    batches = {}
+    expressions = {}
+
+    def get(text: str):
+        expression = expressions.get(text)
+        if expression is None:
+            expression = expressions[text] = get_expression(text)
+        return expression
+
+    for i, line in enumerate(lines):
+        prefix = ''
+        try:
+            record = _loads(line)
+            if text is None or isinstance(record, dict) and 'values' in record:
+                if not isinstance(record, dict):
+                    raise TypeError("A line must be an object with an"
+                                    " 'expression' and 'values'.")
+                if 'id' in record:
+                    prefix = f"\"id\": {json.dumps(record['id'])}, "
+                if text is None and 'expression' not in record:
+                    raise TypeError("A line must be an object with an"
+                                    " 'expression' and 'values'.")
+                values = record.get('values', {})
+                expression = get(record.get('expression', text))
+            else:
+                values = record
+                if isinstance(record, dict) and 'id' in record:
+                    # Variables are single letters, 'id' is never one.
+                    prefix = f"\"id\": {json.dumps(record['id'])}, "
+                    values = {name: value for name, value in record.items()
+                              if name != 'id'}
+                expression = get(text)
+            row = _row(expression, values)
+        except Exception as error:
+            outputs[i] = _error(error, prefix)
+            errors += 1
+            continue
+        batch = batches.setdefault(id(expression), (expression, [], []))
+        batch[1].append(i)
+        batch[2].append((prefix, row))
+
+    for expression, indices, rows in batches.values():
+        try:
+            results = expression.evaluate_many([row for _, row in rows])
+        except Exception:
+            results = []
+            for _, row in rows:
+                try:
+                    results.append(expression.evaluate_many([row])[0])
+                except Exception as error:
+                    results.append(error)
+        for i, (prefix, _), result in zip(indices, rows, results):
+            if isinstance(result, Exception):
+                outputs[i] = _error(result, prefix)
+                errors += 1
+            else:
+                outputs[i] = (f"{{{prefix}\"result\":"
+                              f" {json.dumps(result)}}}\n")
+    return ''.join(outputs), errors
+
+
+def _check_sat_lines(lines: List[str]) -> Output:
+    """
+    Check the satisfiability of the expressions of a chunk of 'check-sat'
+    input lines, with a model of the satisfiable ones.
+    """
+    outputs = []
+    errors = 0
+    for line in lines:
+        prefix = ''
+        try:
+            text, prefix = _parse_expression_line(line)
+            model = get_expression(text).find_model()
+        except Exception as error:
+            outputs.append(_error(error, prefix))
+            errors += 1
+            continue
+        outputs.append(f"{{{prefix}\"satisfiable\": "
+                       f"{json.dumps(model is not None)}, "
+                       f"\"model\": {json.dumps(model)}}}\n")
+    return ''.join(outputs), errors
+
+
+def _count(expression, logic: str | None) -> Tuple[int, int]:
+    """
+    Count the rows of the truth table in which the expression is true.
+
+    Returns:
+        tuple: The number of true rows and the number of rows.
+    """
+    logic = get_logic(logic)
+    rows = logic.size ** len(expression.var)
+    if logic.size == 2:
+        if len(expression.var) <= BITSET_LIMIT:
+            return expression.count_true(), rows
+        return expression.to_bdd().count(), rows
+    return sum(result == 1
+               for result in expression.iter_results(logic.name)), rows
+
+
+def _count_lines(logic: str | None, lines: List[str]) -> Output:
+    """
+    Count the true rows of the expressions of a chunk of 'count' input
+    lines.
+    """
+    outputs = []
+    errors = 0
+    for line in lines:
+        prefix = ''
+        try:
+            text, prefix = _parse_expression_line(line)
+            count, rows = _count(get_expression(text), logic)
+        except Exception as error:
+            outputs.append(_error(error, prefix))
+            errors += 1
+            continue
+        outputs.append(f"{{{prefix}\"count\": {count}, \"rows\": {rows}}}\n")
+    return ''.join(outputs), errors
+
+
+def _table_rows(text: str, logic: str | None, evaluations: bool,
+                fixed: int, prefix: Tuple[int, ...]) -> Output:
+    """
+    Format the rows of a truth table in which the first 'fixed' variables
+    have the codes in 'prefix'.
+    """
+    expression = get_expression(text)
+    logic = get_logic(logic)
+    names = column_names(expression)
+    if not evaluations:
+        names = expression.var + names[-1:]
+    template = '{' + ', '.join(json.dumps(name) + ': %s'
+                               for name in names) + '}\n'
+    texts = [json.dumps(value) for value in logic.values]
+    lines = []
+    suffixes = product(logic.order, repeat=len(expression.var) - fixed)
+    if not evaluations:
+        # Without the intermediate columns only the result is computed.
+        evaluate = expression._compile_result(logic)
+        for suffix in suffixes:
+            codes = prefix + suffix
+            lines.append(template % tuple(map(texts.__getitem__,
+                                              codes + (evaluate(*codes),))))
+        return ''.join(lines), 0
+    main = expression.evaluation_positions.index(
+        expression._main_connective_position)
+    evaluate = expression._compile_logic(logic)
+    for suffix in suffixes:
+        codes = prefix + suffix
+        row = evaluate(*codes)
+        lines.append(template % tuple(map(texts.__getitem__,
+                                          codes + row + (row[main],))))
+    return ''.join(lines), 0
+
+
+def _table_tasks(text: str, logic: str | None) \
+        -> Tuple[int, Iterator[Tuple[int, ...]]]:
+    """
+    Split a truth table into chunks of at most ROWS_PER_CHUNK rows by fixing
+    the codes of its first variables.
+
+    Returns:
+        tuple: The number of fixed variables and an iterator over their
+        codes, in the order of the rows.
+    """
+    n = len(get_expression(text).var)
+    logic = get_logic(logic)
+    free = 0
+    while free < n and logic.size ** (free + 1) <= ROWS_PER_CHUNK:
+        free += 1
+    return n - free, product(logic.order, repeat=n - free)
+
+
+def _rendered_rows(text: str, logic: str | None, format: str, stop: int,
+                   start: int) -> Output:
+    """
+    Render the rows from 'start' to the next chunk or 'stop' of a truth
+    table.
+    """
+    renderer = get_expression(text).renderer(logic, format)
+    return ''.join(renderer.iter_chunks(
+        start, min(start + ROWS_PER_CHUNK, stop))), 0
+
+
+def _rendered_tasks(text: str, logic: str | None, format: str, start: int,
+                    stop: int | None) -> Tuple[str, int, range, str]:
+    """
+    Split the rows [start, stop) of a rendered truth table into chunks of
+    ROWS_PER_CHUNK rows.
+
+    Returns:
+        tuple: The header, the resolved stop, the first row of every chunk
+        and the footer.
+    """
+    renderer = get_expression(text).renderer(logic, format)
+    start, stop = renderer.indices(start, stop)
+    return renderer.header, stop, range(start, stop, ROWS_PER_CHUNK), \
+        renderer.footer
+
+
+def _write(outputs: Iterable[Output], stream) -> int:
+    """
+    Write the outputs of all chunks to a stream.
+
+    Returns:
+        int: The number of lines that failed.
+    """
+    errors = 0
+    for text, failed in outputs:
+        stream.write(text)
+        errors += failed
+    stream.flush()
+    return errors
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='logical-expression', description=__doc__.splitlines()[1],
+        epilog=__doc__.split('\n\n', 1)[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def command(name: str, help: str) -> argparse.ArgumentParser:
+        subparser = commands.add_parser(name, help=help)
+        subparser.add_argument('-w', '--workers', type=int, default=1,
+                               help="the number of worker processes,"
+                                    " 0 for one per processor")
+        return subparser
+
+    table = command('table', "print the truth table of an expression")
+    table.add_argument('expression')
+    table.add_argument('-l', '--logic', default=None)
+    table.add_argument('--evaluations', action='store_true',
+                       help="include the evaluation of every operator")
+    table.add_argument('-f', '--format', choices=('jsonl',) + FORMATS,
+                       default='jsonl')
+    table.add_argument('--start', type=int, default=0,
+                       help="the first rendered row, negative to count from"
+                            " the end")
+    table.add_argument('--stop', type=int, default=None,
+                       help="the row after the last rendered row")
+
+    evaluate = command('eval', "evaluate assignments")
+    evaluate.add_argument('files', nargs='*')
+    evaluate.add_argument('-e', '--expression',
+                          help="the expression of every line without one")
+
+    check_sat = command('check-sat', "check if expressions are satisfiable")
+    check_sat.add_argument('files', nargs='*')
+
+    count = command('count', "count the true rows of truth tables")
+    count.add_argument('files', nargs='*')
+    count.add_argument('-l', '--logic', default=None)
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    """
+    Run the command line interface.
+
+    Returns:
+        int: The exit status, 1 if any line could not be evaluated.
+    """
+    args = _parser().parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+    header = footer = ''
+    if args.command == 'table' and args.format != 'jsonl':
+        try:
+            header, stop, tasks, footer = _rendered_tasks(
+                args.expression, args.logic, args.format, args.start,
+                args.stop)
+        except (ValueError, SyntaxError) as error:
+            print(f"error: {error}", file=sys.stderr)
+            return 1
+        function = partial(_rendered_rows, args.expression, args.logic,
+                           args.format, stop)
+    elif args.command == 'table':
+        try:
+            fixed, prefixes = _table_tasks(args.expression, args.logic)
+        except (ValueError, SyntaxError) as error:
+            print(f"error: {error}", file=sys.stderr)
+            return 1
+        function = partial(_table_rows, args.expression, args.logic,
+                           args.evaluations, fixed)
+        tasks = prefixes
+    else:
+        if args.command == 'eval':
+            function = partial(_evaluate_lines, args.expression)
+        elif args.command == 'check-sat':
+            function = _check_sat_lines
+        else:
+            function = partial(_count_lines, args.logic)
+        tasks = _iter_chunks(_iter_lines(args.files), LINES_PER_CHUNK)
+    try:
+        sys.stdout.write(header)
+        errors = _write(_ordered_map(function, tasks, workers), sys.stdout)
+        sys.stdout.write(footer)
+    except BrokenPipeError:
+        # The reader of the output went away, e.g. 'head'. Point stdout at
+        # devnull so the interpreter does not fail to flush it at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
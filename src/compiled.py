@@ -0,0 +1,184 @@
+# 2024 Sven van Loon
+
+from src.batch import batch_columns, check_batch_values, \
+    check_batch_variables
+from src.flat import FlatExpression
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple
+
+CHUNK_SIZE = 1 << 14
+
+
+class CompiledExpression():
+    """
+    An immutable evaluator of an expression that can be shared by threads.
+
+    All evaluation functions are compiled when the object is created and
+    nothing is written to the object afterwards. Every call keeps its
+    intermediate values in its own local variables and returns them, so any
+    number of threads can evaluate one CompiledExpression at the same time
+    without locks and without seeing each other's values.
+
+    Create one with 'LogicalExpression.freeze'.
+
+    Example:
+        >>> compiled = LogicalExpression("A & !C").freeze()
+        >>> compiled.evaluate(A=1, C=0)
+        1
+        >>> compiled.evaluate_threaded([(1, 0), (1, 1)] * 100000)[:2]
+        [1, 0]
+    """
+
+    __slots__ = ('var', 'positions', '_flat', '_result', '_evaluations',
+                 '_main')
+
+    def __init__(self, expression) -> None:
+        """
+        Args:
+            expression (LogicalExpression): The expression to compile. Its
+            variables and flat arrays are copied, so the CompiledExpression
+            does not change when the expression is assigned a new rule.
+        """
+        self.var: Tuple[str, ...] = tuple(expression.var)
+        self.positions: Tuple[int, ...] = \
+            tuple(expression.evaluation_positions)
+        flat = expression.flat
+        self._flat = FlatExpression(self.var, array('b', flat.opcodes),
+                                    array('i', flat.left),
+                                    array('i', flat.right),
+                                    array('i', flat.variables),
+                                    array('i', flat.positions))
+        self._result = expression.compile()
+        self._evaluations = expression._compile_evaluations()
+        self._main = self.positions.index(
+            expression._main_connective_position)
+
+    def __setattr__(self, name: str, value) -> None:
+        if hasattr(self, '_main'):
+            raise AttributeError("A CompiledExpression cannot be modified.")
+        super().__setattr__(name, value)
+
+    def __call__(self, *values: float) -> float:
+        """
+        Evaluate the expression without validating the values, which are
+        given as positional arguments in the order of 'var'.
+        """
+        return self._result(*values)
+
+    @property
+    def function(self) -> Callable[..., float]:
+        """
+        The compiled function, see 'LogicalExpression.compile'.
+        """
+        return self._result
+
+    @property
+    def flat(self) -> FlatExpression:
+        """
+        The copy of the flat arrays of the expression that was compiled.
+        """
+        return self._flat
+
+    def _row(self, values: dict) -> tuple:
+        """
+        Validate an assignment and order its values like 'var'.
+
+        Raises:
+            ValueError: If a variable is missing or does not exist in the
+            expression, or a value is outside the valid range [0, 1].
+            TypeError: If a value is not of type int or float.
+        """
+        check_batch_variables(self.var, values.keys())
+        row = tuple(values[name] for name in self.var)
+        check_batch_values(self.var, [[value] for value in row])
+        return row
+
+    def evaluate(self, **values: float) -> float:
+        """
+        Evaluate the expression for one assignment.
+
+        Args:
+            **values: The truth value of every variable.
+
+        Returns:
+            float: The truth value of the expression.
+
+        Raises:
+            ValueError: If a variable is missing or does not exist in the
+                expression, or a value is outside the valid range [0, 1].
+            TypeError: If a value is not of type int or float.
+        """
+        return self._result(*self._row(values))
+
+    def evaluate_intermediate(self, **values: float) \
+            -> Tuple[float, Dict[int, float]]:
+        """
+        Evaluate the expression and its intermediate evaluations for one
+        assignment.
+
+        Returns:
+            tuple: The truth value of the expression and a new dictionary
+            mapping every position in 'positions' to its truth value.
+
+        Raises:
+            ValueError, TypeError: Like 'evaluate'.
+        """
+        evaluations = self._evaluations(*self._row(values))
+        return evaluations[self._main], dict(zip(self.positions, evaluations))
+
+    def _columns(self, assignments: Mapping | Sequence) -> List[list]:
+        columns = batch_columns(self.var, assignments)
+        check_batch_values(self.var, columns)
+        return columns
+
+    def evaluate_many(self, assignments: Mapping | Sequence) -> List[float]:
+        """
+        Evaluate a batch of assignments in the calling thread, like
+        'LogicalExpression.evaluate_many'.
+        """
+        return list(map(self._result, *self._columns(assignments)))
+
+    def evaluate_threaded(self, assignments: Mapping | Sequence,
+                          workers: int | None = None,
+                          chunk_size: int = CHUNK_SIZE) -> List[float]:
+        """
+        Evaluate a batch of assignments in a pool of threads.
+
+        The batch is validated once and split into chunks of 'chunk_size'
+        rows that are evaluated by the threads, the results keep the order
+        of the assignments. The threads only scale on free-threaded builds
+        of CPython, with the GIL they take turns and only release the caller
+        from evaluating the batch itself.
+
+        Args:
+            assignments (Mapping or Sequence): The assignments, as accepted
+            by 'LogicalExpression.evaluate_many'.
+            workers (int or None): The number of threads, defaults to the
+            default of ThreadPoolExecutor.
+            chunk_size (int): The number of rows evaluated per task.
+
+        Returns:
+            List[float]: The truth value of the expression per assignment.
+
+        Raises:
+            ValueError: If a variable is missing or does not exist in the
+                expression, a value is outside the valid range [0, 1] or the
+                chunk size is smaller than 1.
+            TypeError: If a value is not of type int or float.
+        """
+        if chunk_size < 1:
+            raise ValueError(f"Chunk size must be at least 1, got"
+                             f" {chunk_size}.")
+        columns = self._columns(assignments)
+        rows = len(columns[0])
+        if rows <= chunk_size or workers == 1:
+            return list(map(self._result, *columns))
+
+        def evaluate_chunk(start: int) -> List[float]:
+            return list(map(self._result, *[column[start:start + chunk_size]
+                                            for column in columns]))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(evaluate_chunk, range(0, rows, chunk_size))
+            return [result for chunk in chunks for result in chunk]
@@ -0,0 +1,345 @@
+# 2024 Sven van Loon
+
+from src.flat import (FlatExpression, VARIABLE, NEGATION, AND, OR,
+                      IMPLICATION, EQUIVALENCE)
+from src.logics import get_logic
+from typing import Callable, Dict, List, Tuple
+
+FUNCTION_NAME = '_compiled_expression'
+# The names of the lookup tables in code generated for a 'Logic'.
+TABLE_NAMES = {NEGATION: '_negation', AND: '_conjunction', OR: '_disjunction',
+               IMPLICATION: '_implication', EQUIVALENCE: '_equivalence'}
+# Beyond this many nested short-circuits the operands are evaluated in
+# straight-line code, Python limits the indentation depth of a block.
+MAX_NESTING = 48
+# The operand values of the Lukasiewicz operators that decide the result on
+# their own, by operator and by whether the left operand is evaluated first.
+# A result of None is the decisive operand itself.
+DECISIVE = {(AND, True): {0: None}, (AND, False): {0: None},
+            (OR, True): {1: None}, (OR, False): {1: None},
+            (IMPLICATION, True): {0: 1}, (IMPLICATION, False): {1: 1}}
+
+# The decisive values of every operator and evaluation order, mapped to the
+# result they decide.
+Decisive = Dict[Tuple[int, bool], Dict[int, int | None]]
+
+
+def _generate_statements(flat: FlatExpression,
+                         positions: List[int] | None = None,
+                         tables: bool = False) -> List[str]:
+    """
+    Generate the straight-line Python statements evaluating an expression.
+
+    Every operator node gets its own local variable, so the generated code
+    never nests deeper than one operator regardless of the depth of the tree.
+    The statements reproduce the arithmetic of the Lukasiewicz operators in
+    'LogicalExpression' exactly. Variable i is read from the argument '_vi'.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+        positions (List[int] or None): If given, the generated code returns a
+        tuple with the truth values of the nodes at these positions of the
+        tokenized expression instead of the truth value of the expression.
+        tables (bool): If True, the operators look up the integer codes of
+        truth values in the tables named in TABLE_NAMES instead.
+
+    Returns:
+        List[str]: The generated statements, the last one returns the truth
+        value of the expression.
+    """
+    statements = []
+    names = []
+    for i, opcode in enumerate(flat.opcodes):
+        if opcode == VARIABLE:
+            names.append(f"_v{flat.variables[i]}")
+            continue
+        name = f"_t{i}"
+        names.append(name)
+        a = names[flat.left[i]]
+        if tables:
+            index = f"[{a}]" if opcode == NEGATION else \
+                f"[{a}][{names[flat.right[i]]}]"
+            statements.append(f"{name} = {TABLE_NAMES[opcode]}{index}")
+            continue
+        if opcode == NEGATION:
+            statements.append(f"{name} = 1 - {a}")
+            continue
+        statements += _operator_statements(opcode, name, a,
+                                           names[flat.right[i]])
+    if positions is None:
+        statements.append(f"return {names[flat.root]}")
+    else:
+        by_position = dict(zip(flat.positions, names))
+        values = ''.join(by_position[p] + ', ' for p in positions)
+        statements.append(f"return ({values})")
+    return statements
+
+
+def _table_decisive(logic) -> Decisive:
+    """
+    Find the decisive codes of the operators of a logic: a code of the left
+    operand whose row of the lookup table is constant, or a code of the
+    right operand whose column is constant.
+    """
+    decisive = {}
+    for opcode in (AND, OR, IMPLICATION, EQUIVALENCE):
+        table = logic.tables[opcode]
+        rows = {a: row[0] for a, row in enumerate(table)
+                if len(set(row)) == 1}
+        columns = {b: column[0] for b, column in enumerate(zip(*table))
+                   if len(set(column)) == 1}
+        if rows:
+            decisive[opcode, True] = rows
+        if columns:
+            decisive[opcode, False] = columns
+    return decisive
+
+
+def _distributions(flat: FlatExpression, logic) -> List[List[float]]:
+    """
+    Estimate the probability of every code at every node of an expression,
+    assuming independent and uniformly distributed variables.
+    """
+    codes = range(logic.size)
+    uniform = [1 / logic.size] * logic.size
+    distributions = []
+    for i, opcode in enumerate(flat.opcodes):
+        if opcode == VARIABLE:
+            distributions.append(uniform)
+            continue
+        a = distributions[flat.left[i]]
+        distribution = [0.0] * logic.size
+        if opcode == NEGATION:
+            for code in codes:
+                distribution[logic.tables[NEGATION][code]] += a[code]
+        else:
+            b = distributions[flat.right[i]]
+            table = logic.tables[opcode]
+            for x in codes:
+                for y in codes:
+                    distribution[table[x][y]] += a[x] * b[y]
+        distributions.append(distribution)
+    return distributions
+
+
+def _subtree_sizes(flat: FlatExpression) -> List[int]:
+    """
+    Count the operator nodes in the subtree of every node, as an estimate of
+    the cost of evaluating it.
+    """
+    sizes = []
+    for i, opcode in enumerate(flat.opcodes):
+        if opcode == VARIABLE:
+            sizes.append(0)
+        elif opcode == NEGATION:
+            sizes.append(sizes[flat.left[i]] + 1)
+        else:
+            sizes.append(sizes[flat.left[i]] + sizes[flat.right[i]] + 1)
+    return sizes
+
+
+def _generate_short_circuit(flat: FlatExpression, logic=None) -> List[str]:
+    """
+    Generate Python statements evaluating only the truth value of an
+    expression, skipping operands that cannot change the result.
+
+    The operand of a binary operator that is expected to be cheaper or more
+    often decisive is evaluated first. If its value decides the result, as
+    0 does for '&', the other operand is not evaluated at all. The order is
+    chosen by the number of operators in each operand and the probability
+    of a decisive value under uniformly distributed variables. The results
+    are the same as those of '_generate_statements'.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+        logic (Logic or None): If given, the statements evaluate integer
+        codes with the lookup tables of this logic, whose decisive codes
+        are read from the tables.
+
+    Returns:
+        List[str]: The generated statements, indented relative to the body
+        of the function.
+    """
+    if logic is None:
+        decisive = DECISIVE
+        estimate = get_logic(None)
+    else:
+        decisive = _table_decisive(logic)
+        estimate = logic
+    probabilities = _distributions(flat, estimate)
+    sizes = _subtree_sizes(flat)
+
+    def name(i: int) -> str:
+        if flat.opcodes[i] == VARIABLE:
+            return f"_v{flat.variables[i]}"
+        return f"_t{i}"
+
+    def expected_cost(first: int, second: int, values) -> float:
+        decided = sum(probabilities[first][value] for value in values)
+        return sizes[first] + (1 - decided) * sizes[second]
+
+    def plan(i: int) -> Tuple[int, int, Dict[int, int | None] | None]:
+        """
+        Choose the order of the operands of a binary node and the decisive
+        values of the operand evaluated first.
+        """
+        opcode, left, right = flat.opcodes[i], flat.left[i], flat.right[i]
+        options = [(left, right, decisive.get((opcode, True))),
+                   (right, left, decisive.get((opcode, False)))]
+        options = [option for option in options if option[2]]
+        if not options:
+            return left, right, None
+        return min(options, key=lambda option: expected_cost(*option))
+
+    statements = []
+    stack = [(flat.root, 1, 0)]
+    plans = {}
+    while stack:
+        i, depth, stage = stack.pop()
+        opcode = flat.opcodes[i]
+        indent = '    ' * (depth - 1)
+        if opcode == VARIABLE:
+            continue
+        if opcode == NEGATION:
+            if stage == 0:
+                stack += [(i, depth, 1), (flat.left[i], depth, 0)]
+            else:
+                a = name(flat.left[i])
+                line = f"_negation[{a}]" if logic else f"1 - {a}"
+                statements.append(f"{indent}_t{i} = {line}")
+            continue
+        if stage == 0:
+            first, second, values = plans[i] = plan(i)
+            if values is None or depth > MAX_NESTING \
+                    or sizes[second] == 0:
+                plans[i] = first, second, None
+            stack += [(i, depth, 1), (first, depth, 0)]
+            continue
+        first, second, values = plans[i]
+        if stage == 1:
+            if values is not None:
+                x = name(first)
+                for k, (value, result) in enumerate(values.items()):
+                    keyword = 'if' if k == 0 else 'elif'
+                    result = x if result is None else result
+                    statements.append(f"{indent}{keyword} {x} == {value}:")
+                    statements.append(f"{indent}    _t{i} = {result}")
+                statements.append(f"{indent}else:")
+                depth += 1
+            stack += [(i, depth, 2), (second, depth, 0)]
+            continue
+        a, b = name(flat.left[i]), name(flat.right[i])
+        if logic:
+            lines = [f"_t{i} = {TABLE_NAMES[opcode]}[{a}][{b}]"]
+        else:
+            lines = _operator_statements(opcode, f"_t{i}", a, b)
+        statements += [indent + line for line in lines]
+        del plans[i]
+    statements.append(f"return {name(flat.root)}")
+    return statements
+
+
+def _operator_statements(opcode: int, name: str, a: str, b: str) \
+        -> List[str]:
+    """
+    Generate the statements of a binary Lukasiewicz operator.
+    """
+    if opcode == AND:
+        return [f"{name} = {b} if {b} < {a} else {a}"]
+    if opcode == OR:
+        return [f"{name} = {b} if {b} > {a} else {a}"]
+    if opcode == IMPLICATION:
+        return [f"{name} = 1 - {a} + {b}",
+                f"{name} = {name} if {name} < 1 else 1"]
+    return [f"{name} = 1 - ({a} - {b}) if {a} > {b} else 1 - ({b} - {a})"]
+
+
+def generate_source(flat: FlatExpression,
+                    positions: List[int] | None = None,
+                    tables: bool = False,
+                    short_circuit: bool = False, logic=None) -> str:
+    """
+    Generate the source code of a function evaluating an expression.
+
+    Args:
+        flat (FlatExpression): The flattened expression, its variables
+        become the positional arguments of the generated function.
+        positions (List[int] or None): If given, the generated function
+        returns a tuple with the truth values of the nodes at these positions
+        of the tokenized expression.
+        tables (bool): If True, the generated function evaluates integer
+        codes of truth values with lookup tables, which are bound to keyword
+        arguments with the names in TABLE_NAMES.
+        short_circuit (bool): If True, the generated function only computes
+        the truth value of the expression and skips operands that cannot
+        change it, see '_generate_short_circuit'.
+        logic (Logic or None): The logic of the lookup tables, required to
+        short-circuit a function with tables.
+
+    Returns:
+        str: The source code of the generated function.
+
+    Raises:
+        ValueError: If a short-circuited function is asked for positions or
+        for tables without their logic.
+
+    Example:
+        >>> print(generate_source(LogicalExpression("A & !C").flat))
+        def _compiled_expression(_v0, _v1):
+            _t2 = 1 - _v1
+            _t3 = _t2 if _t2 < _v0 else _v0
+            return _t3
+    """
+    arguments = [f"_v{i}" for i in range(len(flat.var))]
+    if tables:
+        # Defaults are bound once and read as fast locals.
+        arguments += [f"{name}={name}" for name in TABLE_NAMES.values()]
+    arguments = ', '.join(arguments)
+    if not short_circuit:
+        body = _generate_statements(flat, positions, tables)
+    elif positions is not None:
+        raise ValueError("Only the truth value of the expression can be"
+                         " short-circuited, not the values at positions.")
+    elif tables and logic is None:
+        raise ValueError("Short-circuiting lookup tables requires their"
+                         " logic.")
+    else:
+        body = _generate_short_circuit(flat, logic if tables else None)
+    signature = f"def {FUNCTION_NAME}({arguments}):"
+    return '\n'.join([signature] + ['    ' + line for line in body]) + '\n'
+
+
+def compile_flat(flat: FlatExpression,
+                 positions: List[int] | None = None, logic=None,
+                 short_circuit: bool = False) -> Callable:
+    """
+    Compile an expression into a native Python function.
+
+    The generated function takes the truth values of the variables as
+    positional arguments in the order of 'flat.var' and returns the truth
+    value of the expression, without walking the nodes or dispatching on
+    operators.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+        positions (List[int] or None): If given, the compiled function
+        returns a tuple with the truth values of the nodes at these positions
+        of the tokenized expression, e.g. all intermediate evaluations.
+        logic (Logic or None): If given, the compiled function takes and
+        returns the integer codes of truth values of this logic and evaluates
+        the operators with its lookup tables.
+        short_circuit (bool): If True, the compiled function skips operands
+        that cannot change the truth value of the expression. It cannot be
+        combined with 'positions'.
+
+    Returns:
+        Callable: The compiled evaluation function.
+    """
+    source = generate_source(flat, positions, logic is not None,
+                             short_circuit, logic)
+    namespace = {}
+    if logic is not None:
+        namespace.update((name, logic.tables[opcode])
+                         for opcode, name in TABLE_NAMES.items())
+    exec(compile(source, '<logical-expression>', 'exec'), namespace)
+    return namespace[FUNCTION_NAME]
@@ -0,0 +1,204 @@
+# 2024 Sven van Loon
+
+from src.logics import get_logic, is_arithmetic
+import json
+import struct
+from itertools import islice
+from typing import Dict, Iterator, List
+
+MAGIC = b'LETC'
+VERSION = 1
+BUFFER_SIZE = 1 << 20
+ROWS_PER_CHUNK = 1 << 14
+
+# Truth values of a table are always 0, 0.5 or 1, and 1.0 == 1 as a
+# dictionary key, so these lookups replace per value formatting.
+TEXT = {1: '1', 0.5: '0.5', 0: '0'}
+CODE = {1: 2, 0.5: 1, 0: 0}
+VALUES = [0, 0.5, 1]
+
+
+def column_names(expression) -> List[str]:
+    """
+    Name the columns of an exported truth table.
+
+    The variables keep their own names, every intermediate evaluation is
+    named after its operator and its position in the tokenized expression,
+    and the last column holds the truth value of the expression.
+
+    Args:
+        expression (LogicalExpression): The exported expression.
+
+    Returns:
+        List[str]: The names of the columns.
+
+    Example:
+        >>> column_names(LogicalExpression("A & !C"))
+        ['A', 'C', '&@1', '!@2', 'result']
+    """
+    tokens = expression.exp
+    evaluations = [f"{tokens[p].value}@{p}"
+                   for p in expression.evaluation_positions]
+    return expression.var + evaluations + ['result']
+
+
+def _iter_rows(expression, logic: str | None) -> Iterator[tuple]:
+    """
+    Lazily generate the rows of the truth table as flat tuples of values in
+    the order of 'column_names'. The logic is checked before anything is
+    written.
+
+    Raises:
+        ValueError: If the logic is not classical logic or '3', the formats
+        store the truth values 0, 0.5 and 1 only.
+    """
+    if not is_arithmetic(get_logic(logic)):
+        raise ValueError(f"Truth tables can be exported in classical logic"
+                         f" and the logic '3' only, not {logic}.")
+    evaluate = expression._compile_evaluations()
+    main = (expression.evaluation_positions
+            .index(expression._main_connective_position))
+    return (comb + evaluations + (evaluations[main],)
+            for comb in expression._iter_combinations(len(expression.var),
+                                                      logic)
+            for evaluations in (evaluate(*comb),))
+
+
+def _iter_chunks(rows: Iterator[list], size: int) -> Iterator[List[list]]:
+    """
+    Group the rows in lists of at most 'size' rows.
+    """
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_csv(expression, path: str, logic: str | None = None,
+              buffer_size: int = BUFFER_SIZE) -> int:
+    """
+    Write the truth table of an expression to a CSV file.
+
+    Args:
+        expression (LogicalExpression): The expression to export.
+        path (str): The path of the output file.
+        logic (str or None): Specifies the logic to be used. If None,
+        defaults to propositional logic, if '3' Lukasiewicz logic. Other
+        logics cannot be exported.
+        buffer_size (int): The size in bytes of the write buffer.
+
+    Returns:
+        int: The number of rows written.
+    """
+    rows = 0
+    table = _iter_rows(expression, logic)
+    with open(path, 'w', buffering=buffer_size, newline='') as file:
+        file.write(','.join(column_names(expression)) + '\n')
+        for chunk in _iter_chunks(table, ROWS_PER_CHUNK):
+            file.write(''.join(','.join(map(TEXT.__getitem__, row)) + '\n'
+                               for row in chunk))
+            rows += len(chunk)
+    return rows
+
+
+def write_jsonl(expression, path: str, logic: str | None = None,
+                buffer_size: int = BUFFER_SIZE) -> int:
+    """
+    Write the truth table of an expression to a JSON Lines file, with one
+    object per row keyed by the names returned by 'column_names'.
+
+    Args:
+        expression (LogicalExpression): The expression to export.
+        path (str): The path of the output file.
+        logic (str or None): Specifies the logic to be used. If None,
+        defaults to propositional logic, if '3' Lukasiewicz logic. Other
+        logics cannot be exported.
+        buffer_size (int): The size in bytes of the write buffer.
+
+    Returns:
+        int: The number of rows written.
+    """
+    # The keys are the same on every line, so the lines are formatted from
+    # a template instead of encoding a dictionary per row.
+    template = '{' + ','.join(json.dumps(name) + ':%s'
+                              for name in column_names(expression)) + '}\n'
+    rows = 0
+    table = _iter_rows(expression, logic)
+    with open(path, 'w', buffering=buffer_size) as file:
+        for chunk in _iter_chunks(table, ROWS_PER_CHUNK):
+            file.write(''.join(template % tuple(map(TEXT.__getitem__, row))
+                               for row in chunk))
+            rows += len(chunk)
+    return rows
+
+
+def write_columnar(expression, path: str, logic: str | None = None,
+                   rows_per_chunk: int = ROWS_PER_CHUNK,
+                   buffer_size: int = BUFFER_SIZE) -> int:
+    """
+    Write the truth table of an expression to a compact binary columnar
+    file.
+
+    The file starts with the magic bytes 'LETC', a version byte and a JSON
+    header naming the expression, the logic and the columns. It is followed
+    by chunks of at most 'rows_per_chunk' rows, each made of the number of
+    rows in the chunk and one byte per value for every column. A truth value
+    v is stored as the byte 2 * v, so 0, 0.5 and 1 become 0, 1 and 2.
+
+    Args:
+        expression (LogicalExpression): The expression to export.
+        path (str): The path of the output file.
+        logic (str or None): Specifies the logic to be used. If None,
+        defaults to propositional logic, if '3' Lukasiewicz logic. Other
+        logics cannot be exported.
+        rows_per_chunk (int): The maximum number of rows in a chunk.
+        buffer_size (int): The size in bytes of the write buffer.
+
+    Returns:
+        int: The number of rows written.
+    """
+    names = column_names(expression)
+    header = json.dumps({'expression': expression.text, 'logic': logic,
+                         'columns': names}).encode()
+    rows = 0
+    table = _iter_rows(expression, logic)
+    with open(path, 'wb', buffering=buffer_size) as file:
+        file.write(MAGIC + struct.pack('<BI', VERSION, len(header)) + header)
+        for chunk in _iter_chunks(table, rows_per_chunk):
+            file.write(struct.pack('<I', len(chunk)))
+            for column in zip(*chunk):
+                file.write(bytes(map(CODE.__getitem__, column)))
+            rows += len(chunk)
+    return rows
+
+
+def read_columnar(path: str) -> Dict[str, list]:
+    """
+    Read a file written by 'write_columnar'.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        Dict[str, list]: A dictionary with the 'expression' and 'logic'
+        from the header and a 'columns' dictionary mapping every column name
+        to its list of truth values.
+
+    Raises:
+        ValueError: If the file is not a columnar truth table file.
+    """
+    with open(path, 'rb') as file:
+        if file.read(4) != MAGIC:
+            raise ValueError(f"{path} is not a columnar truth table file.")
+        version, length = struct.unpack('<BI', file.read(5))
+        if version != VERSION:
+            raise ValueError(f"Unsupported columnar file version {version}.")
+        header = json.loads(file.read(length))
+        columns = {name: [] for name in header['columns']}
+        while size := file.read(4):
+            rows, = struct.unpack('<I', size)
+            for name in header['columns']:
+                columns[name].extend(VALUES[b] for b in file.read(rows))
+    return {'expression': header['expression'], 'logic': header['logic'],
+            'columns': columns}
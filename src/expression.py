@@ -1,21 +1,66 @@
 # 2024 Sven van Loon
 
-from src.scanner import _tokenize_expression, TokenType, infix_to_prefix, Token
-from src.expression_tree import build_tree, TreeNode
+from src.scanner import TokenType, Token
+from src.parser import parse
+from src.expression_tree import TreeNode
+from src.flat import FlatExpression, SYMBOLS
+from src.vectorized import vectorized_truth_table
+from src.compiler import compile_flat
+from src.bitset import evaluate_bitset
+from src.sat import CNF, solve
+from src.bdd import BDD, BDDManager, default_manager, variable_order
+from src.incremental import IncrementalEvaluator, gray_code
+from src.compiled import CompiledExpression
+from src.batch import batch_columns, check_batch_values
+from src.logics import Logic, get_logic, is_arithmetic
+from src.render import TableRenderer
+from src import instrumentation
+from collections import Counter
 from itertools import product
-from typing import List
+from typing import (TYPE_CHECKING, Callable, Dict, Iterator, List, Mapping,
+                    Sequence, TextIO, Tuple)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Up to this many variables the classical truth table is small enough to be
+# evaluated as a bitset, above it the decision procedures use the SAT solver.
+BITSET_LIMIT = 16
 
 
 class LogicalExpression():
     def __init__(self, expression: str) -> None:
-        self._exp = _tokenize_expression(expression)
-        self._prefix_exp, self._main_connective_position = \
-            infix_to_prefix(self.exp)
-        self._var = self._extract_variables()
-        self._operators_positions = self._get_positions_of_operators()
-        self._expression_tree = build_tree(self._prefix_exp)[0]
-        self._evaluations = [0 if i in self._operators_positions else ' '
-                             for i in range(len(self.exp))]
+        self._text = expression
+        # The tokens and the tree are only needed to build the flat arrays,
+        # 'exp' and 'expression_tree' parse the text again when asked for.
+        with instrumentation.timer('init.parse'):
+            tokens, tree = parse(expression)
+        self._main_connective_position = tree.position
+        self._length = len(tokens)
+        with instrumentation.timer('init.analyse'):
+            self._var = self._extract_variables(tokens)
+            self._operators_positions = \
+                self._get_positions_of_operators(tokens)
+        with instrumentation.timer('init.flatten'):
+            self._flat = FlatExpression.from_tree(tree, self._var)
+        self._compiled = None
+        self._compiled_evaluations = None
+        self._compiled_logics = {}
+        self._compiled_results = {}
+        self._renderers = {}
+        self._frozen = None
+        self._bitset = None
+
+    @property
+    def text(self) -> str:
+        """
+        Getter method for the '_text' property.
+
+        Returns:
+            str: The expression as it was written by the user.
+
+        """
+        return self._text
 
     @property
     def var(self) -> List[str]:
@@ -43,14 +88,15 @@ class LogicalExpression():
     @property
     def exp(self) -> List[Token]:
         """
-        Getter method for the '_exp' property.
+        The tokenized expression. The tokens are not kept on the instance,
+        they are rebuilt from the text on every access.
 
         Returns:
             List[Token]: A list containing tokenized elements of the
             expression.
 
         """
-        return self._exp
+        return parse(self._text)[0]
 
     @exp.setter
     def exp(self, expression: str) -> None:
@@ -66,54 +112,78 @@ class LogicalExpression():
     @property
     def expression_tree(self) -> TreeNode:
         """
-        Getter method for the '_expression_tree' property.
+        The expression tree. Like 'exp' it is not kept on the instance but
+        parsed again on every access, evaluations use 'flat'.
 
         Returns:
             TreeNode: A root of the expression tree constructed from the
             expression.
 
         """
-        return self._expression_tree
+        return parse(self._text)[1]
+
+    @property
+    def flat(self) -> FlatExpression:
+        """
+        Getter method for the '_flat' property.
+
+        Returns:
+            FlatExpression: The compact array encoding of the expression
+            tree that all evaluators run on.
+
+        """
+        return self._flat
 
     @property
     def evaluations(self) -> List[str | int]:
         """
-        Getter method for the '_evaluations' property.
+        The evaluations of a row are never stored on the instance, so that
+        one instance can be evaluated by several threads at once. This is
+        the empty layout of an evaluation line that every row starts from.
 
         Returns:
-            List[str | int]: A list containing evaluations of each element in
-            the tokenized expression.
+            List[str | int]: A new list with a space for every element in
+            the tokenized expression and 0 for every operator.
 
         """
-        return self._evaluations
+        evaluations = [' '] * self._length
+        for position in self._operators_positions:
+            evaluations[position] = 0
+        return evaluations
 
-    def _extract_variables(self) -> List[str]:
+    def _extract_variables(self, tokens: List[Token]) -> List[str]:
         """
         Extracts variables from the expression.
 
+        Args:
+            tokens (List[Token]): The tokenized expression.
+
         Returns:
             List[str]: A sorted list of unique variables found in the
             expression.
 
         """
         variables = set()
-        for token in self.exp:
+        for token in tokens:
             if token.type == TokenType.VARIABLE:
                 variables.add(token.value)
 
         return sorted(variables)
 
-    def _get_positions_of_operators(self) -> List[int]:
+    def _get_positions_of_operators(self, tokens: List[Token]) -> List[int]:
         """
         Extracts the index positions of operators in the expression.
 
+        Args:
+            tokens (List[Token]): The tokenized expression.
+
         Returns:
             List[int]: A list of index positions of operators in the
             expression.
 
         """
         positions = []
-        for i, token in enumerate(self.exp):
+        for i, token in enumerate(tokens):
             if token.type == TokenType.OPERATOR or \
                     token.type == TokenType.NEGATION:
                 positions.append(i)
@@ -125,160 +195,346 @@ class LogicalExpression():
 
         Args:
             n (int): The number of variables.
-            logic (str or None): The logic type, can be None (propositional
-            logic) or '3' (Lukasiewicz 3 valued logic).
+            logic (str or None): The name of a registered logic, e.g. None
+            (propositional logic), '3' (Lukasiewicz 3 valued logic) or
+            'goedel-4', see 'src.logics'.
 
         Returns:
             List[List[int]]: A list containing all possible combinations of
             truth values.
 
         """
-        if logic is None:
-            return list(product([1, 0], repeat=n))
-        elif logic == '3':
-            return list(product([1, 0.5, 0], repeat=n))
+        return list(self._iter_combinations(n, logic))
 
-    def _evaluate_tree(self, root: TreeNode, values: dict) -> int:
+    def _iter_combinations(self, n, logic) -> Iterator[Tuple[int, ...]]:
         """
-        Recursively evaluates the truth value at all positions of a logical
-        expression tree and stores them in 'self._evaluations' attribute.
+        Lazily generate all possible combinations of truth values, in the
+        same order as '_all_combinations'.
 
         Args:
-            root (TreeNode): The root node of the logical expression tree.
-            values (dict): A dictionary containing truth values for variables.
+            n (int): The number of variables.
+            logic (str or None): The name of a registered logic.
 
         Returns:
-            int: The evaluated truth value of the expression
-            represented by the tree.
+            Iterator[Tuple[int, ...]]: An iterator over all possible
+            combinations of truth values, from true to false.
 
+        Raises:
+            ValueError: If the logic is not supported.
+
+        """
+        logic = get_logic(logic)
+        return product([logic.values[code] for code in logic.order],
+                       repeat=n)
+
+    def _compile_logic(self, logic: Logic) -> Callable[..., tuple]:
+        """
+        Compile a function evaluating the codes of the truth values at
+        'evaluation_positions' with the lookup tables of a logic, the
+        function is cached on the instance per logic.
+
+        Returns:
+            Callable[..., tuple]: A function taking the codes of the truth
+            values of the variables as positional arguments.
+        """
+        compiled = self._compiled_logics.get(logic.name)
+        if compiled is None:
+            compiled = compile_flat(self.flat, self.evaluation_positions,
+                                    logic)
+            self._compiled_logics[logic.name] = compiled
+        return compiled
+
+    def _compile_result(self, logic: Logic) -> Callable[..., int]:
+        """
+        Compile a short-circuiting function evaluating only the code of the
+        truth value of the expression with the lookup tables of a logic, the
+        function is cached on the instance per logic.
+        """
+        compiled = self._compiled_results.get(logic.name)
+        if compiled is None:
+            compiled = compile_flat(self.flat, logic=logic,
+                                    short_circuit=True)
+            self._compiled_results[logic.name] = compiled
+        return compiled
+
+    def _iter_code_rows(self, logic: Logic) \
+            -> Iterator[Tuple[Tuple[int, ...], tuple]]:
         """
-        if root is None:
-            return 0
+        Lazily evaluate the rows of a truth table on integer codes.
 
-        if root.left is None and root.right is None:
-            if not self.operators_positions:
-                self.evaluations[root.position] = values[root.data]
-            return values[root.data]
+        Yields:
+            tuple: The codes of the truth values of the variables and of the
+            evaluations at 'evaluation_positions'.
+        """
+        evaluate = self._compile_logic(logic)
+        for codes in product(logic.order, repeat=len(self.var)):
+            yield codes, evaluate(*codes)
 
-        left_side = self._evaluate_tree(root.left, values)
+    def _evaluate(self, values: dict) -> Tuple[float, List[str | int]]:
+        """
+        Evaluates the truth value at all positions of the logical expression
+        shown in a truth table, with the value 0.5 written as 'i'.
 
-        right_side = self._evaluate_tree(root.right, values)
+        The evaluations are written to a new list instead of the instance, so
+        concurrent calls do not share any state.
 
-        # check which operation to apply
-        if root.data == '&':
-            self.evaluations[root.position] = min(left_side, right_side)
-            if self.evaluations[root.position] == 0.5:
-                self.evaluations[root.position] = 'i'
-            return min(left_side, right_side)
+        Args:
+            values (dict): A dictionary containing truth values for variables.
 
-        elif root.data == '|':
-            self.evaluations[root.position] = max(left_side, right_side)
-            if self.evaluations[root.position] == 0.5:
-                self.evaluations[root.position] = 'i'
-            return max(left_side, right_side)
+        Returns:
+            tuple: The evaluated truth value of the expression and the
+            evaluations at every position of the tokenized expression.
 
-        elif root.type == TokenType.NEGATION:
-            self.evaluations[root.position] = 1 - left_side
-            if self.evaluations[root.position] == 0.5:
-                self.evaluations[root.position] = 'i'
-            return 1 - left_side
+        """
+        evaluations = self._compile_evaluations()(
+            *[values[name] for name in self.var])
+        row = self.evaluations
+        for position, value in zip(self.evaluation_positions, evaluations):
+            row[position] = 'i' if value == 0.5 else value
+        return evaluations[self.evaluation_positions.index(
+            self._main_connective_position)], row
 
-        elif root.data == "->":
-            self.evaluations[root.position] = \
-                min(1, 1 - left_side + right_side)
-            if self.evaluations[root.position] == 0.5:
-                self.evaluations[root.position] = 'i'
-            return min(1, 1 - left_side + right_side)
+    def compile(self) -> Callable[..., float]:
+        """
+        Compile the expression tree into a native Python function.
+
+        The function is generated once and cached on the instance. It takes
+        the truth values of the variables as positional arguments, in the
+        order of 'self.var', and returns the truth value of the expression.
+        Unlike '_evaluate' it does not compute intermediate evaluations, and
+        it skips operands that cannot change the result, e.g. the right side
+        of '&' when the left side is 0.
 
-        elif root.data == "<->":
-            self.evaluations[root.position] = \
-                1 - abs(left_side - right_side)
-            if self.evaluations[root.position] == 0.5:
-                self.evaluations[root.position] = 'i'
-            return 1 - abs(left_side - right_side)
+        Returns:
+            Callable[..., float]: The compiled evaluation function.
+
+        Example:
+            >>> evaluate = LogicalExpression("A & !C").compile()
+            >>> evaluate(1, 0)
+            1
+        """
+        if self._compiled is None:
+            self._compiled = compile_flat(self.flat, short_circuit=True)
+        return self._compiled
 
-    def _create_dict(self, comb: List) -> dict:
+    def _share_compiled(self, other: 'LogicalExpression') -> None:
         """
-        Creates a dictionary mapping variable names to truth values.
+        Share the compiled functions that only return the truth value of the
+        expression with another spelling of the same tree. They take the
+        variables in sorted order and do not depend on token positions, the
+        functions of the intermediate evaluations are compiled per spelling.
 
         Args:
-            comb (iterable): The combination of truth values for variables.
+            other (LogicalExpression): An expression with the same canonical
+            string.
+        """
+        self._compiled = other.compile()
+        self._compiled_results = other._compiled_results
+
+    def freeze(self) -> CompiledExpression:
+        """
+        Get an immutable evaluator of the expression that any number of
+        threads can use at once, see 'CompiledExpression'. It is created
+        once and cached on the instance.
 
         Returns:
-            dict: A dictionary where variable names are keys and their
-            corresponding truth values are values.
+            CompiledExpression: The compiled expression.
+        """
+        if self._frozen is None:
+            self._frozen = CompiledExpression(self)
+        return self._frozen
 
+    @property
+    def evaluation_positions(self) -> List[int]:
         """
-        values = {}
-        for i, c in enumerate(comb):
-            values[self.var[i]] = c
-        return values
+        The positions in the tokenized expression whose evaluations are shown
+        in a truth table: the operators, or the single variable of an
+        expression without operators.
+
+        Returns:
+            List[int]: A list of index positions in the expression.
 
-    def _print_first_line(self) -> None:
         """
-        Print the first line of the expression representation, separating
-        variables and expression with '/'. Seperates the main connective
-        operator with '/' from both sides.
+        if self.operators_positions:
+            return self.operators_positions
+        return [self._main_connective_position]
 
-        The length of the expression is calculated based on the length of
-        variables, expression parts, and any additional spaces specified by
-        tokens. If the main connective is at the beginning of the expression,
-        the length is adjusted accordingly.
+    def _compile_evaluations(self) -> Callable[..., tuple]:
+        """
+        Compile a function returning the evaluations at
+        'evaluation_positions', the function is cached on the instance.
 
         Returns:
-            None: This function does not return anything. It prints the
-            formatted expression to the console.
-        """
-        length_expression = 3 * len(self.var) + 3 * len(self.exp) + 7 + \
-            sum([token.additional_space for token in self.exp])
-        if self._main_connective_position == 0:
-            length_expression -= 3
-        print(*self.var, sep='  ', end='  /  ')
-        expression = [token.value for token in self.exp]
-        expression_left = expression[:self._main_connective_position]
-        expression_right = expression[self._main_connective_position+1:]
-        if expression_left:
-            print(*expression_left, sep='  ', end='  /  ')
-        print(expression[self._main_connective_position], end='  /  ')
-        if expression_right:
-            print(*expression_right, sep='  ')
-        else:
-            print("")
-        print("-" * length_expression)
+            Callable[..., tuple]: A function taking the truth values of the
+            variables as positional arguments and returning a tuple of the
+            intermediate evaluations.
+        """
+        if self._compiled_evaluations is None:
+            self._compiled_evaluations = compile_flat(
+                self.flat, self.evaluation_positions)
+        return self._compiled_evaluations
 
-    def _print_evaluation_line(self, values: dict) -> None:
+    def iter_truth_table(self, logic: str | None = None) \
+            -> Iterator[Tuple[dict, dict, float]]:
         """
-        Print the evaluation line of the expression, showing the values of
-        variables and the evaluation corresponding to each operator in
-        expression.
+        Lazily generate the rows of the truth table without printing them.
+
+        The combinations of truth values are generated one at a time, so the
+        memory use does not grow with the number of rows.
 
         Args:
-            values (dict): A dictionary containing variable names and their
-            corresponding values.
+            logic (str or None): The name of a registered logic. If None,
+            defaults to propositional logic, if '3' Lukasiewicz logic.
+
+        Yields:
+            tuple: A tuple containing the assignment of truth values to the
+            variables, the intermediate evaluations keyed by their position
+            in the tokenized expression and the truth value of the
+            expression.
+
+        Example:
+            >>> rows = LogicalExpression("A & !C").iter_truth_table()
+            >>> next(rows)
+            ({'A': 1, 'C': 1}, {1: 0, 2: 0}, 0)
+        """
+        logic = get_logic(logic)
+        values = logic.values
+        positions = self.evaluation_positions
+        main = positions.index(self._main_connective_position)
+        for codes, evaluations in self._iter_code_rows(logic):
+            yield (dict(zip(self.var, map(values.__getitem__, codes))),
+                   dict(zip(positions, map(values.__getitem__, evaluations))),
+                   values[evaluations[main]])
+
+    def iter_results(self, logic: str | None = None) -> Iterator[float]:
+        """
+        Lazily generate the truth value of the expression in every row of
+        the truth table, in the order of 'iter_truth_table'.
+
+        The intermediate evaluations are not computed and operands that
+        cannot change the result are skipped, so this is the fastest way to
+        scan a truth table.
+
+        Args:
+            logic (str or None): The name of a registered logic. If None,
+            defaults to propositional logic, if '3' Lukasiewicz logic.
+
+        Yields:
+            float: The truth value of the expression.
+
+        Example:
+            >>> list(LogicalExpression("A & !C").iter_results())
+            [0, 1, 0, 0]
+        """
+        logic = get_logic(logic)
+        values = logic.values
+        evaluate = self._compile_result(logic)
+        for codes in product(logic.order, repeat=len(self.var)):
+            yield values[evaluate(*codes)]
+
+    def incremental(self, **values) -> IncrementalEvaluator:
+        """
+        Create an evaluator that keeps the truth value of the expression up
+        to date while the truth values of single variables change.
+
+        Args:
+            **values: Keyword arguments with the initial truth values of all
+            variables.
 
         Returns:
-            None: This function does not return anything. It prints the
-            formatted evaluation line to the console.
-        """
-        correct_format_values = ['i' if i == 0.5 else i for i in
-                                 values.values()]
-        print(*correct_format_values, sep='  ', end='  /  ')
-        tree = self.expression_tree
-        self._evaluate_tree(tree, values)
-        evaluations_left = \
-            self.evaluations[:self._main_connective_position]
-        evaluations_right = \
-            self.evaluations[self._main_connective_position+1:]
-        if evaluations_left:
-            print(*evaluations_left, sep='  ', end='  /  ')
-        print(self.evaluations[self._main_connective_position],
-              end='  /  ')
-        if evaluations_right:
-            print(*evaluations_right, sep='  ')
+            IncrementalEvaluator: The evaluator.
+
+        Raises:
+            ValueError: If a variable does not exist in the expression, has
+                no value or its value is outside the valid range [0, 1].
+            TypeError: If a value is not of type int or float.
+
+        Example:
+            >>> evaluator = LogicalExpression("A & !C").incremental(A=1, C=1)
+            >>> evaluator.result, evaluator.set('C', 0)
+            (0, 1)
+        """
+        self._check_user_values(values)
+        missing = [name for name in self.var if name not in values]
+        if missing:
+            raise ValueError(f"No values were specified for the variables"
+                             f" {missing}.")
+        return IncrementalEvaluator(self.flat, values)
+
+    def iter_gray_truth_table(self, logic: str | None = None) \
+            -> Iterator[Tuple[Tuple[float, ...], float]]:
+        """
+        Lazily generate the rows of the truth table in reflected Gray code
+        order.
+
+        Successive rows differ in the truth value of a single variable, so
+        every row is computed incrementally from the previous one and only
+        the nodes depending on that variable are re-evaluated. The rows are
+        the same as those of 'iter_truth_table', in a different order.
+
+        Args:
+            logic (str or None): The name of a registered logic. If None,
+            defaults to propositional logic, if '3' Lukasiewicz logic.
+
+        Yields:
+            tuple: A tuple containing the truth values of the variables, in
+            the order of 'self.var', and the truth value of the expression.
+
+        Raises:
+            ValueError: If the logic is not supported.
+        """
+        logic = get_logic(logic)
+        values = logic.values
+        if is_arithmetic(logic):
+            # The evaluator computes the truth values themselves.
+            values = None
+            digits = [logic.values[code] for code in logic.order]
         else:
-            print("")
+            digits = list(logic.order)
+        row = [digits[0]] * len(self.var)
+        evaluator = IncrementalEvaluator(self.flat, dict(zip(self.var, row)),
+                                         None if values is None else logic)
+        changes = gray_code(len(self.var), len(digits))
+        result = evaluator.result
+        while True:
+            if values is None:
+                yield tuple(row), result
+            else:
+                yield tuple(map(values.__getitem__, row)), values[result]
+            change = next(changes, None)
+            if change is None:
+                return
+            i, digit = change
+            row[i] = digits[digit]
+            result = evaluator.set(self.var[i], row[i])
+
+    def renderer(self, logic: str | None = None,
+                 format: str = 'text') -> TableRenderer:
+        """
+        Get a renderer of the truth table, which computes the layout of the
+        table once and is cached on the instance per logic and format.
 
-    def truth_table(self, logic: str | None = None) -> None:
+        Args:
+            logic (str or None): The name of a registered logic.
+            format (str): One of 'src.render.FORMATS': 'text', 'markdown',
+            'latex' or 'compact'.
+
+        Returns:
+            TableRenderer: The renderer.
+
+        Raises:
+            ValueError: If the logic or the format is not supported.
+        """
+        key = (get_logic(logic).name, format)
+        renderer = self._renderers.get(key)
+        if renderer is None:
+            renderer = TableRenderer(self, logic, format)
+            self._renderers[key] = renderer
+        return renderer
+
+    def truth_table(self, logic: str | None = None, format: str = 'text',
+                    start: int = 0, stop: int | None = None,
+                    file: TextIO | None = None) -> None:
         """
         Generate and print the truth table for the logical expression.
 
@@ -286,20 +542,213 @@ class LogicalExpression():
         followed by the evaluation lines representing different combinations
         of truth values for the variables.
 
+        The rows are evaluated on the integer codes of the truth values with
+        the lookup tables of the logic and formatted in chunks by a
+        'TableRenderer', see 'renderer'. A range of rows is printed without
+        evaluating the rows before it.
+
         Args:
-            logic (str or None): Specifies the logic to be used. If None,
-            defaults to propositional logic, if '3' Lukasiewicz logic.
+            logic (str or None): The name of a registered logic. If None,
+            defaults to propositional logic, if '3' Lukasiewicz logic. Other
+            logics like 'kleene' or 'lukasiewicz-5' are listed in
+            'src.logics'.
+            format (str): 'text', 'markdown', 'latex' or 'compact'.
+            start (int): The index of the first row, negative indices count
+            from the end of the table.
+            stop (int or None): The index after the last row, by default the
+            end of the table.
+            file (TextIO or None): The file to write to, by default standard
+            output.
 
         Returns:
             None: This function does not return anything. It prints the truth
             table to the console.
+
+        Raises:
+            ValueError: If the logic or the format is not supported.
+
+        Example:
+            >>> LogicalExpression("A & B").truth_table(start=-1)
+            A  B  /  A  &  /  B
+            -------------------
+            0  0  /  0  0  /  0
+        """
+        self.renderer(logic, format).render(file, start, stop)
+
+    def _count_evaluations(self, prefix: str, rows: int) -> None:
+        """
+        Report the number of rows evaluated and the node-rows per operator,
+        the number of nodes times the number of rows. The node-rows are an
+        upper bound of the nodes visited: the functions of 'compile' and the
+        compact format skip operands that cannot change the result.
+
+        Args:
+            prefix (str): The name of the evaluating method.
+            rows (int): The number of rows evaluated.
+        """
+        instrumentation.count(f'{prefix}.rows', rows)
+        for opcode, nodes in Counter(self.flat.opcodes).items():
+            name = SYMBOLS.get(opcode, 'variable')
+            instrumentation.count(f'{prefix}.node_rows.{name}',
+                                  nodes * rows)
+
+    def vectorized_truth_table(self, logic: str | None = None) \
+            -> Tuple[Dict[str, "np.ndarray"], Dict[int, "np.ndarray"]]:
+        """
+        Compute the truth table of the logical expression with numpy.
+
+        Instead of evaluating the expression tree once per combination, the
+        tree is evaluated once over whole columns of truth values. The rows
+        are in the same order as the lines printed by 'truth_table'.
+
+        Args:
+            logic (str or None): The name of a registered logic. If None,
+            defaults to propositional logic, if '3' Lukasiewicz logic.
+
+        Returns:
+            tuple: A tuple containing the variable columns keyed by variable
+            name and the intermediate evaluation columns keyed by the
+            position of their operator in the tokenized expression. The
+            column at the position of the main connective holds the truth
+            value of the whole expression.
+
+        Raises:
+            ImportError: If numpy is not installed.
+            ValueError: If the logic is not supported.
+        """
+        return vectorized_truth_table(self.flat, self.operators_positions,
+                                      logic)
+
+    def _result_bitset(self) -> int:
+        """
+        Evaluate the classical truth table as a packed bitset, the result is
+        cached on the instance.
+
+        Returns:
+            int: The result column, bit k is set if the expression is true in
+            row k of the classical truth table.
+        """
+        if self._bitset is None:
+            self._bitset = evaluate_bitset(self.flat)
+        return self._bitset
+
+    def count_true(self) -> int:
+        """
+        Count the rows of the classical truth table in which the expression
+        is true.
+
+        Returns:
+            int: The number of satisfying combinations of truth values.
+        """
+        return self._result_bitset().bit_count()
+
+    def is_tautology(self) -> bool:
+        """
+        Check if the expression is true in every row of the classical truth
+        table.
+
+        Small expressions are checked on their bitset truth table, larger
+        ones by showing that the negated expression is not satisfiable.
+
+        Returns:
+            bool: True if the expression is a tautology, False otherwise.
+        """
+        if len(self.var) <= BITSET_LIMIT:
+            return self.count_true() == 2 ** len(self.var)
+        cnf = CNF()
+        return solve(cnf, [-cnf.encode(self.flat)]) is None
+
+    def is_contradiction(self) -> bool:
+        """
+        Check if the expression is false in every row of the classical truth
+        table.
+
+        Returns:
+            bool: True if the expression is a contradiction, False otherwise.
+        """
+        return not self.is_satisfiable()
+
+    def is_satisfiable(self) -> bool:
+        """
+        Check if the expression is true in at least one row of the classical
+        truth table.
+
+        Returns:
+            bool: True if the expression is satisfiable, False otherwise.
+        """
+        if len(self.var) <= BITSET_LIMIT:
+            return self._result_bitset() != 0
+        return self.find_model() is not None
+
+    def find_model(self) -> Dict[str, int] | None:
+        """
+        Find a combination of classical truth values for which the
+        expression is true.
+
+        The expression is converted to conjunctive normal form with the
+        Tseitin transformation and handed to a CDCL SAT solver, so the truth
+        table is never enumerated.
+
+        Returns:
+            Dict[str, int] or None: A dictionary mapping every variable to 1
+            or 0, or None if the expression is not satisfiable.
+
+        Example:
+            >>> LogicalExpression("A & !C").find_model()
+            {'A': 1, 'C': 0}
+        """
+        cnf = CNF()
+        model = solve(cnf, [cnf.encode(self.flat)])
+        if model is None:
+            return None
+        return {name: int(model[name]) for name in self.var}
+
+    def equivalent(self, other: 'LogicalExpression') -> bool:
         """
-        self._print_first_line()
-        combinations = self._all_combinations(len(self.var), logic)
+        Check if two expressions have the same classical truth value for
+        every combination of truth values of their variables.
 
-        for comb in combinations:
-            values = self._create_dict(comb)
-            self._print_evaluation_line(values)
+        Both expressions are encoded in one formula that is satisfiable
+        exactly when their truth values differ for some assignment.
+
+        Args:
+            other (LogicalExpression): The expression to compare with.
+
+        Returns:
+            bool: True if the expressions are equivalent, False otherwise.
+        """
+        cnf = CNF()
+        a = cnf.encode(self.flat)
+        b = cnf.encode(other.flat)
+        cnf.clauses += [[a, b], [-a, -b]]
+        return solve(cnf) is None
+
+    def to_bdd(self, manager: BDDManager | None = None) -> BDD:
+        """
+        Compile the expression to a reduced ordered binary decision diagram.
+
+        Variables that the manager does not know yet are declared in the
+        order of their first occurrence in the expression tree. All
+        expressions compiled with the same manager share its nodes and its
+        computed table, so equivalent expressions compile to the same node.
+
+        Args:
+            manager (BDDManager or None): The manager to compile with,
+            defaults to the process-wide manager.
+
+        Returns:
+            BDD: The compiled diagram.
+
+        Example:
+            >>> a = LogicalExpression("A -> C").to_bdd()
+            >>> b = LogicalExpression("!A | C").to_bdd()
+            >>> a.equivalent(b), a.count()
+            (True, 3)
+        """
+        if manager is None:
+            manager = default_manager()
+        manager.declare(variable_order(self.flat))
+        return BDD(manager, manager.compile(self.flat), self.var)
 
     def _check_user_values(self, values: dict) -> None:
         """
@@ -334,7 +783,8 @@ class LogicalExpression():
             if not isinstance(value, float) and not isinstance(value, int):
                 raise TypeError(f"Value specified for variable {key} is not of"
                                 f" int or float type, it is of {type(value)}")
-            if value < 0 or value > 1:
+            # NaN fails every comparison, so it is rejected as well.
+            if not 0 <= value <= 1:
                 raise ValueError(f"Value specified for variable {key} is "
                                  f" {value} which is not in the range [0, 1].")
 
@@ -366,7 +816,59 @@ class LogicalExpression():
                 int or float.
         """
         self._check_user_values(values)
+        _, evaluations = self._evaluate(values)
+        renderer = self.renderer()
+        print(renderer.header, end='')
+        print(renderer.format_values(
+            [values[name] for name in self.var],
+            [evaluations[position] for position in self.evaluation_positions]),
+            end='')
 
-        self._print_first_line()
+    def evaluate_many(self, assignments: Mapping | Sequence,
+                      intermediate: bool = False) \
+            -> List[float] | Tuple[List[float], Dict[int, List[float]]]:
+        """
+        Evaluate the logical expression for a batch of assignments without
+        printing.
+
+        The batch is validated once and then evaluated with the compiled
+        function of the expression.
 
-        self._print_evaluation_line(values)
+        Args:
+            assignments (Mapping or Sequence): Either a mapping of every
+            variable to a sequence of values, or a sequence of assignments
+            given as dictionaries or as tuples in the order of 'self.var'.
+            intermediate (bool): If True, also return the intermediate
+            evaluations.
+
+        Returns:
+            List[float] or tuple: The truth values of the expression, one per
+            assignment. If 'intermediate' is True, a tuple containing these
+            truth values and a dictionary mapping the positions in
+            'evaluation_positions' to the list of their values.
+
+        Raises:
+            ValueError: If a variable is missing or does not exist in the
+                expression, or if a value is outside the valid range [0, 1].
+            TypeError: If a value is not of type int or float.
+
+        Example:
+            >>> LogicalExpression("A & !C").evaluate_many({'A': [1, 1],
+            ...                                            'C': [0, 1]})
+            [1, 0]
+        """
+        columns = batch_columns(self.var, assignments)
+        check_batch_values(self.var, columns)
+        if instrumentation.enabled():
+            self._count_evaluations('evaluate_many',
+                                    len(columns[0]) if columns else 0)
+        if not intermediate:
+            return list(map(self.compile(), *columns))
+
+        positions = self.evaluation_positions
+        rows = list(map(self._compile_evaluations(), *columns))
+        if rows:
+            evaluations = dict(zip(positions, map(list, zip(*rows))))
+        else:
+            evaluations = {position: [] for position in positions}
+        return evaluations[self._main_connective_position], evaluations
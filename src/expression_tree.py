@@ -4,6 +4,8 @@ from src.scanner import TokenType
 
 
 class TreeNode():
+    __slots__ = ('data', 'type', 'position', 'left', 'right')
+
     def __init__(self, data):
         self.data = data.value
         self.type = data.type
@@ -12,31 +14,77 @@ class TreeNode():
         self.right = None
 
 
-def build_tree(s):
+def postorder(root):
     """
-    Build a binary tree from a prefix expression.
+    Iterate over the nodes of an expression tree in post-order.
 
-    This function constructs a binary tree representing a logical expression
-    from a prefix expression represented as a list of tokens.
+    The traversal uses an explicit stack instead of recursion, so it also
+    works for trees that are deeper than Python's recursion limit. Children
+    are always yielded before their parent, left sub-tree first.
 
     Args:
-        s (list): A list of tokens representing the prefix expression.
+        root (TreeNode): The root node of the expression tree.
 
-    Returns:
-        tuple: A tuple containing the root node of the constructed tree
-            and the remaining tokens after constructing the tree.
+    Yields:
+        TreeNode: The nodes of the tree in post-order.
     """
-    if s[0].type == TokenType.VARIABLE:
-        return TreeNode(s[0]), s[1:]
+    stack = [(root, False)]
+    while stack:
+        node, visited = stack.pop()
+        if node is None:
+            continue
+        if visited:
+            yield node
+        else:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+
+
+def _push_operand(stack: list, node: TreeNode) -> None:
+    """
+    Push an operand on the stack of 'tree_to_string', wrapped in parentheses
+    if it is a binary operation.
+    """
+    if node.type == TokenType.OPERATOR:
+        stack.extend([')', node, '('])
     else:
-        if s[0].type == TokenType.NEGATION:
-            p = TreeNode(s[0])
-            p.left, q = build_tree(s[1:])
-            return p, q
+        stack.append(node)
+
+
+def tree_to_string(root: TreeNode) -> str:
+    """
+    Write an expression tree back as a canonical expression string.
+
+    Binary operations are parenthesised when they are the operand of another
+    operation, negations are always written as '!' and operators are
+    surrounded by single spaces. Two expressions that only differ in
+    whitespace, redundant parentheses or the spelling of the negation have
+    the same canonical string.
+
+    Args:
+        root (TreeNode): The root node of the expression tree.
+
+    Returns:
+        str: The canonical string of the expression.
+
+    Example:
+        >>> tree_to_string(LogicalExpression("((A)&~(C))").expression_tree)
+        'A & !C'
+    """
+    result = []
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            result.append(item)
+        elif item.type == TokenType.VARIABLE:
+            result.append(item.data)
+        elif item.type == TokenType.NEGATION:
+            result.append('!')
+            _push_operand(stack, item.left)
         else:
-            p = TreeNode(s[0])
-            # Build the left sub-tree
-            p.right, q = build_tree(s[1:])
-            # Build the right sub-tree
-            p.left, q = build_tree(q)
-            return p, q
+            _push_operand(stack, item.right)
+            stack.append(f' {item.data} ')
+            _push_operand(stack, item.left)
+    return ''.join(result)
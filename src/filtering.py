@@ -0,0 +1,231 @@
+# 2024 Sven van Loon
+
+from src.vectorized import evaluate_columns
+from itertools import compress, islice
+from typing import Dict, Iterator, List, Mapping, Sequence, Tuple
+import csv
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is an optional dependency
+    pa = None
+
+ROWS_PER_CHUNK = 1 << 16
+
+
+def _column_mapping(expression, columns: Mapping[str, str] | None,
+                    available: Sequence[str]) -> Dict[str, str]:
+    """
+    Map every variable of an expression to the column of a dataset holding
+    its truth values.
+
+    Args:
+        expression (LogicalExpression): The expression.
+        columns (Mapping or None): The column of each variable, variables
+        that are not mapped are read from the column with their own name.
+        available (Sequence[str]): The columns of the dataset.
+
+    Returns:
+        Dict[str, str]: The column of every variable.
+
+    Raises:
+        ValueError: If a mapped variable does not exist in the expression or
+        a column does not exist in the dataset.
+    """
+    columns = dict(columns or {})
+    unknown = [name for name in columns if name not in expression.var]
+    if unknown:
+        raise ValueError(f"The variables {unknown} do not exist in the"
+                         f" expression.")
+    mapping = {name: columns.get(name, name) for name in expression.var}
+    missing = [column for column in mapping.values()
+               if column not in available]
+    if missing:
+        raise ValueError(f"The columns {missing} do not exist in the"
+                         f" dataset.")
+    return mapping
+
+
+def evaluate_chunk(expression, data: Mapping[str, Sequence[float]]) \
+        -> Sequence[float]:
+    """
+    Evaluate an expression for a chunk of rows given as columns.
+
+    The truth values may be any real numbers in [0, 1], which are evaluated
+    with the Lukasiewicz operators. With numpy the chunk is evaluated once
+    per node over whole columns, without numpy row by row with the compiled
+    function of the expression.
+
+    Args:
+        expression (LogicalExpression): The expression.
+        data (Mapping): The column of truth values of every variable.
+
+    Returns:
+        Sequence[float]: The truth value of the expression in every row, a
+        numpy array if numpy is installed.
+
+    Raises:
+        ValueError: If a value is outside the valid range [0, 1] or NaN.
+    """
+    if np is None:
+        return expression.evaluate_many(data)
+    columns = {}
+    for name in expression.var:
+        column = np.asarray(data[name], dtype=np.float64)
+        if column.size and np.isnan(column).any():
+            raise ValueError(f"Value specified for variable {name} is nan"
+                             f" which is not in the range [0, 1].")
+        if column.size and (column.min() < 0 or column.max() > 1):
+            value = column.min() if column.min() < 0 else column.max()
+            raise ValueError(f"Value specified for variable {name} is"
+                             f" {value} which is not in the range [0, 1].")
+        columns[name] = column
+    flat = expression.flat
+    return evaluate_columns(flat, columns)[flat.positions[flat.root]]
+
+
+def _iter_csv_chunks(reader: Iterator[List[str]], mapping: Dict[str, int],
+                     size: int) \
+        -> Iterator[Tuple[List[List[str]], Dict[str, List[str]]]]:
+    """
+    Read the rows of a CSV file in chunks.
+
+    Yields:
+        tuple: The rows of the chunk and the text of the column of every
+        variable.
+    """
+    while True:
+        rows = list(islice(reader, size))
+        if not rows:
+            return
+        yield rows, {name: [row[i] for row in rows]
+                     for name, i in mapping.items()}
+
+
+def filter_csv(expression, source: str, destination: str,
+               columns: Mapping[str, str] | None = None,
+               threshold: float = 1, score_column: str | None = None,
+               chunk_size: int = ROWS_PER_CHUNK) -> Tuple[int, int]:
+    """
+    Use an expression as a row filter over a CSV file with a header row.
+
+    The file is streamed in chunks of rows, every chunk is evaluated at once
+    and its matching rows are written before the next chunk is read, so the
+    memory use does not grow with the size of the file.
+
+    Args:
+        expression (LogicalExpression): The expression.
+        source (str): The path of the CSV file to read.
+        destination (str): The path of the CSV file to write, with the same
+        columns as the source.
+        columns (Mapping or None): The column holding the truth values of
+        each variable, by default the column named like the variable.
+        threshold (float): Only rows in which the truth value of the
+        expression is at least the threshold are written. With 0 every row
+        is written.
+        score_column (str or None): If given, the truth value of the
+        expression is written to an extra column with this name.
+        chunk_size (int): The number of rows evaluated at once.
+
+    Returns:
+        tuple: The number of rows read and the number of rows written.
+
+    Raises:
+        ValueError: If a column is missing or a value is not a number in the
+        range [0, 1].
+
+    Example:
+        >>> filter_csv(LogicalExpression("A & !C"), "in.csv", "out.csv",
+        ...            columns={'A': 'active', 'C': 'cancelled'})
+        (1000000, 24190)
+    """
+    read = written = 0
+    with open(source, newline='') as infile, \
+            open(destination, 'w', newline='') as outfile:
+        reader = csv.reader(infile)
+        writer = csv.writer(outfile)
+        header = next(reader, [])
+        mapping = _column_mapping(expression, columns, header)
+        indices = {name: header.index(column)
+                   for name, column in mapping.items()}
+        writer.writerow(header + [score_column] if score_column else header)
+        for rows, data in _iter_csv_chunks(reader, indices, chunk_size):
+            try:
+                if np is not None:
+                    data = {name: np.array(column, dtype=np.float64)
+                            for name, column in data.items()}
+                else:
+                    data = {name: list(map(float, column))
+                            for name, column in data.items()}
+            except ValueError as error:
+                raise ValueError(f"Rows {read + 1} to {read + len(rows)} of"
+                                 f" {source} contain a value that is not a"
+                                 f" number: {error}") from None
+            scores = evaluate_chunk(expression, data)
+            if np is not None:
+                selected = (scores >= threshold).tolist()
+                scores = scores.tolist()
+            else:
+                selected = [score >= threshold for score in scores]
+            if score_column:
+                rows = [row + [score] for row, score in zip(rows, scores)]
+            matching = list(compress(rows, selected))
+            writer.writerows(matching)
+            read += len(rows)
+            written += len(matching)
+    return read, written
+
+
+def _require_pyarrow() -> None:
+    """
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    if pa is None:
+        raise ImportError("Filtering Parquet files requires pyarrow, install"
+                          " it with 'pip install pyarrow'.")
+
+
+def filter_parquet(expression, source: str, destination: str,
+                   columns: Mapping[str, str] | None = None,
+                   threshold: float = 1, score_column: str | None = None,
+                   chunk_size: int = ROWS_PER_CHUNK) -> Tuple[int, int]:
+    """
+    Use an expression as a row filter over a Parquet file, like
+    'filter_csv'. The file is read in record batches of 'chunk_size' rows
+    and the matching rows of every batch are appended to the destination.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+        ValueError: If a column is missing or a value is not in the range
+        [0, 1].
+    """
+    _require_pyarrow()
+    source_file = pq.ParquetFile(source)
+    schema = source_file.schema_arrow
+    mapping = _column_mapping(expression, columns, schema.names)
+    if score_column:
+        schema = schema.append(pa.field(score_column, pa.float64()))
+    read = written = 0
+    with pq.ParquetWriter(destination, schema) as writer:
+        for batch in source_file.iter_batches(batch_size=chunk_size):
+            data = {name: batch.column(column).to_numpy(zero_copy_only=False)
+                    for name, column in mapping.items()}
+            scores = evaluate_chunk(expression, data)
+            if score_column:
+                batch = pa.RecordBatch.from_arrays(
+                    batch.columns + [pa.array(scores, pa.float64())],
+                    schema=schema)
+            matching = batch.filter(pc.greater_equal(
+                pa.array(scores, pa.float64()), threshold))
+            writer.write_batch(matching)
+            read += batch.num_rows
+            written += matching.num_rows
+    return read, written
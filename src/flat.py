@@ -0,0 +1,221 @@
+# 2024 Sven van Loon
+
+from src.scanner import TokenType
+from src.expression_tree import TreeNode, postorder
+from array import array
+from sys import getsizeof
+from typing import Dict, List
+
+VARIABLE, NEGATION, AND, OR, IMPLICATION, EQUIVALENCE = range(6)
+OPCODES = {'&': AND, '|': OR, '->': IMPLICATION, '<->': EQUIVALENCE}
+SYMBOLS = {NEGATION: '!', AND: '&', OR: '|', IMPLICATION: '->',
+           EQUIVALENCE: '<->'}
+
+
+def apply_operator(opcode: int, a: float, b: float) -> float:
+    """
+    Apply an operator to the truth values of its operands with the
+    Lukasiewicz arithmetic used by 'LogicalExpression', which coincides with
+    classical logic on the values 0 and 1.
+
+    Args:
+        opcode (int): The opcode of the operator, not VARIABLE.
+        a (float): The truth value of the left (or only) operand.
+        b (float): The truth value of the right operand, ignored for a
+        negation.
+
+    Returns:
+        float: The truth value of the operation.
+    """
+    if opcode == NEGATION:
+        return 1 - a
+    if opcode == AND:
+        return min(a, b)
+    if opcode == OR:
+        return max(a, b)
+    if opcode == IMPLICATION:
+        return min(1, 1 - a + b)
+    return 1 - abs(a - b)
+
+
+class FlatExpression():
+    """
+    A compact, array-backed encoding of an expression tree.
+
+    The nodes are stored in post-order as a struct of arrays, so every node
+    comes after its children and the root is the last node. For node i,
+    'opcodes[i]' is one of the opcodes of this module, 'left[i]' and
+    'right[i]' are the indices of its children (-1 if absent, a negation only
+    has a left child), 'variables[i]' is the index in 'var' of the variable
+    of a leaf (-1 for operators) and 'positions[i]' is the position of the
+    node in the tokenized expression.
+
+    A FlatExpression does not reference any Token or TreeNode, so it is all
+    that has to be kept in memory to evaluate a rule.
+    """
+
+    __slots__ = ('var', 'opcodes', 'left', 'right', 'variables', 'positions')
+
+    def __init__(self, var: List[str], opcodes: array, left: array,
+                 right: array, variables: array, positions: array) -> None:
+        self.var = var
+        self.opcodes = opcodes
+        self.left = left
+        self.right = right
+        self.variables = variables
+        self.positions = positions
+
+    @classmethod
+    def from_tree(cls, root: TreeNode, var: List[str]) -> 'FlatExpression':
+        """
+        Flatten an expression tree.
+
+        Args:
+            root (TreeNode): The root node of the expression tree.
+            var (List[str]): The sorted variables of the expression.
+
+        Returns:
+            FlatExpression: The flattened expression.
+        """
+        var_ids = {name: i for i, name in enumerate(var)}
+        flat = cls(list(var), array('b'), array('i'), array('i'),
+                   array('i'), array('i'))
+        index = {}
+        for node in postorder(root):
+            index[id(node)] = len(flat.opcodes)
+            flat.positions.append(node.position)
+            if node.type == TokenType.VARIABLE:
+                flat.opcodes.append(VARIABLE)
+                flat.variables.append(var_ids[node.data])
+                flat.left.append(-1)
+                flat.right.append(-1)
+                continue
+            flat.variables.append(-1)
+            flat.left.append(index.pop(id(node.left)))
+            if node.type == TokenType.NEGATION:
+                flat.opcodes.append(NEGATION)
+                flat.right.append(-1)
+            else:
+                flat.opcodes.append(OPCODES[node.data])
+                flat.right.append(index.pop(id(node.right)))
+        return flat
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    @property
+    def root(self) -> int:
+        """
+        The index of the root node, which is always the last node.
+        """
+        return len(self.opcodes) - 1
+
+    def to_string(self) -> str:
+        """
+        Write the expression as the canonical string of 'tree_to_string',
+        without building the tree.
+
+        Returns:
+            str: The canonical string of the expression.
+        """
+        result = []
+        stack = [self.root]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                result.append(item)
+                continue
+            opcode = self.opcodes[item]
+            if opcode == VARIABLE:
+                result.append(self.var[self.variables[item]])
+            elif opcode == NEGATION:
+                result.append('!')
+                self._push_operand(stack, self.left[item])
+            else:
+                self._push_operand(stack, self.right[item])
+                stack.append(f' {SYMBOLS[opcode]} ')
+                self._push_operand(stack, self.left[item])
+        return ''.join(result)
+
+    def _push_operand(self, stack: list, node: int) -> None:
+        if self.opcodes[node] not in (VARIABLE, NEGATION):
+            stack.extend([')', node, '('])
+        else:
+            stack.append(node)
+
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the node arrays, including the array
+        object headers.
+        """
+        return sum(getsizeof(a) for a in (self.opcodes, self.left, self.right,
+                                          self.variables, self.positions))
+
+
+def tree_bytes(root: TreeNode, tokens: list) -> int:
+    """
+    Measure the memory used by an expression tree and its tokens.
+
+    Args:
+        root (TreeNode): The root node of the expression tree.
+        tokens (list): The tokenized expression.
+
+    Returns:
+        int: The number of bytes used by the node and token objects and the
+        token list, not counting the shared strings and enum members.
+    """
+    size = getsizeof(tokens)
+    for obj in list(postorder(root)) + list(tokens):
+        size += getsizeof(obj)
+        if hasattr(obj, '__dict__'):
+            size += getsizeof(obj.__dict__)
+    return size
+
+
+def instance_bytes(expression) -> int:
+    """
+    Measure the memory an expression keeps after it is constructed.
+
+    Args:
+        expression (LogicalExpression): The expression to measure.
+
+    Returns:
+        int: The number of bytes used by the instance, its attributes and the
+        flat arrays, not counting the shared strings and small integers or
+        the functions compiled later.
+    """
+    size = getsizeof(expression) + getsizeof(expression.__dict__)
+    for value in vars(expression).values():
+        if value is not None:
+            size += getsizeof(value)
+    flat = expression.flat
+    return size + flat.nbytes() + getsizeof(flat.var)
+
+
+def memory_report(expression) -> Dict[str, float]:
+    """
+    Measure the memory per node of an expression.
+
+    An instance only keeps the flat arrays, the tokens and the tree are
+    built while parsing and rebuilt by 'exp' and 'expression_tree'.
+
+    Args:
+        expression (LogicalExpression): The expression to measure.
+
+    Returns:
+        Dict[str, float]: The number of nodes, and the bytes per node of the
+        whole instance, of its flat arrays and of the TreeNode/Token object
+        graph that is not kept.
+
+    Example:
+        >>> memory_report(LogicalExpression("A & !C"))
+        {'nodes': 4, 'instance_bytes_per_node': ...,
+         'flat_bytes_per_node': ..., 'tree_bytes_per_node': ...}
+    """
+    flat = expression.flat
+    nodes = len(flat)
+    return {'nodes': nodes,
+            'instance_bytes_per_node': instance_bytes(expression) / nodes,
+            'flat_bytes_per_node': flat.nbytes() / nodes,
+            'tree_bytes_per_node':
+                tree_bytes(expression.expression_tree, expression.exp) / nodes}
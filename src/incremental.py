@@ -0,0 +1,200 @@
+# 2024 Sven van Loon
+
+from src.flat import FlatExpression, VARIABLE, NEGATION, apply_operator
+from src.logics import Logic
+from heapq import heappush, heappop
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+def _lookup(logic: Logic) -> Callable[[int, int, int], int]:
+    """
+    Get an operator like 'apply_operator' that applies the lookup tables of
+    a logic to codes of truth values.
+    """
+    tables = logic.tables
+
+    def apply(opcode: int, a: int, b: int) -> int:
+        if opcode == NEGATION:
+            return tables[NEGATION][a]
+        return tables[opcode][a][b]
+    return apply
+
+
+class IncrementalEvaluator():
+    """
+    Keep the truth values of every node of an expression tree up to date
+    while the truth values of the variables change one at a time.
+
+    The nodes are stored in post-order, so every node comes after its
+    children. When a variable changes only the ancestors of its leaves are
+    recomputed, in post-order, and propagation stops at nodes whose value
+    does not change. Changing a variable that occurs once therefore costs at
+    most the depth of the tree instead of its size.
+
+    By default the truth values are evaluated with the Lukasiewicz
+    arithmetic of 'apply_operator'. With a logic the values are the codes of
+    its truth values and the operators are its lookup tables.
+    """
+
+    def __init__(self, flat: FlatExpression, values: Dict[str, float],
+                 logic: Logic | None = None) -> None:
+        """
+        Args:
+            flat (FlatExpression): The flattened expression.
+            values (Dict[str, float]): The initial truth values of all
+            variables of the expression, or their codes if a logic is given.
+            logic (Logic or None): The logic whose codes are evaluated.
+        """
+        self._flat = flat
+        self._apply = apply_operator if logic is None else _lookup(logic)
+        self._parent = [-1] * len(flat)
+        self._leaves = {}
+        for i, opcode in enumerate(flat.opcodes):
+            if opcode == VARIABLE:
+                name = flat.var[flat.variables[i]]
+                self._leaves.setdefault(name, []).append(i)
+                continue
+            self._parent[flat.left[i]] = i
+            if flat.right[i] >= 0:
+                self._parent[flat.right[i]] = i
+        self._values = [0] * len(flat)
+        self._assignment = {}
+        self.reset(values)
+
+    def reset(self, values: Dict[str, float]) -> float:
+        """
+        Evaluate the whole tree for a new assignment.
+
+        Args:
+            values (Dict[str, float]): The truth values of all variables.
+
+        Returns:
+            float: The truth value of the expression.
+        """
+        self._assignment = dict(values)
+        for name, leaves in self._leaves.items():
+            for i in leaves:
+                self._values[i] = values[name]
+        flat = self._flat
+        for i, opcode in enumerate(flat.opcodes):
+            if opcode != VARIABLE:
+                right = flat.right[i]
+                self._values[i] = self._apply(
+                    opcode, self._values[flat.left[i]],
+                    self._values[right] if right >= 0 else 0)
+        return self.result
+
+    def set(self, name: str, value: float) -> float:
+        """
+        Change the truth value of one variable and recompute only the nodes
+        that depend on it.
+
+        Args:
+            name (str): The variable.
+            value (float): Its new truth value.
+
+        Returns:
+            float: The truth value of the expression.
+        """
+        if self._assignment[name] == value:
+            return self.result
+        self._assignment[name] = value
+        flat = self._flat
+        values = self._values
+        dirty = []
+        queued = set()
+        for i in self._leaves[name]:
+            values[i] = value
+            parent = self._parent[i]
+            if parent >= 0 and parent not in queued:
+                queued.add(parent)
+                heappush(dirty, parent)
+        while dirty:
+            i = heappop(dirty)
+            right = flat.right[i]
+            new = self._apply(flat.opcodes[i], values[flat.left[i]],
+                              values[right] if right >= 0 else 0)
+            if new == values[i]:
+                continue
+            values[i] = new
+            parent = self._parent[i]
+            if parent >= 0 and parent not in queued:
+                queued.add(parent)
+                heappush(dirty, parent)
+        return self.result
+
+    def update(self, **values) -> float:
+        """
+        Change the truth values of several variables.
+
+        Returns:
+            float: The truth value of the expression.
+        """
+        for name, value in values.items():
+            self.set(name, value)
+        return self.result
+
+    @property
+    def result(self) -> float:
+        """
+        The current truth value of the expression.
+        """
+        return self._values[-1]
+
+    @property
+    def assignment(self) -> Dict[str, float]:
+        """
+        A copy of the current truth values of the variables.
+        """
+        return dict(self._assignment)
+
+    def evaluations(self, positions: List[int]) -> Dict[int, float]:
+        """
+        Get the current truth values of the nodes at some positions of the
+        tokenized expression.
+
+        Args:
+            positions (List[int]): The positions, e.g. the positions of the
+            operators.
+
+        Returns:
+            Dict[int, float]: The truth values keyed by position.
+        """
+        by_position = dict(zip(self._flat.positions, self._values))
+        return {position: by_position[position] for position in positions}
+
+
+def gray_code(n: int, k: int) -> Iterator[Tuple[int, int]]:
+    """
+    Enumerate all n-digit numbers in base k in reflected Gray code order.
+
+    The enumeration starts at the number with all digits 0 and every next
+    number differs from the previous one in a single digit, by one. For k=2
+    this is the binary reflected Gray code.
+
+    Args:
+        n (int): The number of digits.
+        k (int): The base.
+
+    Yields:
+        tuple: For every number after the first, the index of the changed
+        digit (0 is the most significant digit) and its new value.
+
+    Example:
+        >>> list(gray_code(2, 2))
+        [(1, 1), (0, 1), (1, 0)]
+    """
+    digits = [0] * n
+    directions = [1] * n
+    while True:
+        j = n - 1
+        while j >= 0:
+            digit = digits[j] + directions[j]
+            if 0 <= digit < k:
+                digits[j] = digit
+                yield j, digit
+                break
+            directions[j] = -directions[j]
+            j -= 1
+        if j < 0:
+            return
@@ -0,0 +1,166 @@
+# 2024 Sven van Loon
+
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List
+import logging
+
+TIME = 'time'
+COUNT = 'count'
+LOG_INTERVAL = 10.0
+
+# A sink is called with the kind of an event (TIME or COUNT), the name of
+# the phase or counter and the measured seconds or the count.
+Sink = Callable[[str, str, float], None]
+
+_sinks: List[Sink] = []
+_disabled = nullcontext()
+
+
+def enabled() -> bool:
+    """
+    Check if any sink is installed. Instrumented code only measures anything
+    if this is the case.
+    """
+    return bool(_sinks)
+
+
+def add_sink(sink: Sink) -> None:
+    """
+    Install a sink, which receives every event until it is removed.
+    """
+    _sinks.append(sink)
+
+
+def remove_sink(sink: Sink) -> None:
+    _sinks.remove(sink)
+
+
+def emit(kind: str, name: str, value: float) -> None:
+    """
+    Send an event to all installed sinks.
+    """
+    for sink in _sinks:
+        sink(kind, name, value)
+
+
+@contextmanager
+def _timed(phase: str) -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        emit(TIME, phase, perf_counter() - start)
+
+
+def timer(phase: str):
+    """
+    Time the body of a with statement as a phase.
+
+    If no sink is installed a shared no-op context manager is returned, so a
+    disabled timer costs a function call.
+
+    Example:
+        >>> with timer('init.parse'):
+        ...     parse(expression)
+    """
+    return _timed(phase) if _sinks else _disabled
+
+
+def count(name: str, value: int = 1) -> None:
+    """
+    Increase a counter, if any sink is installed.
+    """
+    if _sinks:
+        emit(COUNT, name, value)
+
+
+class Stats():
+    """
+    A sink keeping the totals of all events in memory.
+
+    For every phase it keeps the number of times it ran and the total time
+    in seconds, for every counter its total.
+
+    Example:
+        >>> with instrument() as stats:
+        ...     LogicalExpression("A & !C").truth_table()
+        >>> stats.counters['truth_table.rows']
+        4
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def __call__(self, kind: str, name: str, value: float) -> None:
+        if kind == TIME:
+            timing = self.timings.setdefault(name, [0, 0.0])
+            timing[0] += 1
+            timing[1] += value
+        else:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        self.timings.clear()
+        self.counters.clear()
+
+    def summary(self) -> str:
+        """
+        Format the totals as a single line, e.g.
+        'init.parse=1.203ms/2 truth_table.rows=8'.
+        """
+        parts = [f"{name}={seconds * 1000:.3f}ms/{calls}"
+                 for name, (calls, seconds) in sorted(self.timings.items())]
+        parts += [f"{name}={value}"
+                  for name, value in sorted(self.counters.items())]
+        return ' '.join(parts)
+
+
+class LogSink():
+    """
+    A sink that periodically writes the totals of the events since its last
+    line to a logger.
+
+    A line is written when an event arrives at least 'interval' seconds
+    after the previous line, and by 'flush'.
+    """
+
+    def __init__(self, interval: float = LOG_INTERVAL,
+                 logger: logging.Logger | None = None,
+                 level: int = logging.INFO) -> None:
+        self.interval = interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+        self._stats = Stats()
+        self._last = perf_counter()
+
+    def __call__(self, kind: str, name: str, value: float) -> None:
+        self._stats(kind, name, value)
+        if perf_counter() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._stats.timings or self._stats.counters:
+            self.logger.log(self.level, self._stats.summary())
+            self._stats.reset()
+        self._last = perf_counter()
+
+
+@contextmanager
+def instrument(sink: Sink | None = None) -> Iterator[Sink]:
+    """
+    Install a sink for the duration of a with statement.
+
+    Args:
+        sink (Sink or None): The sink, a new Stats object if None.
+
+    Yields:
+        Sink: The installed sink.
+    """
+    sink = Stats() if sink is None else sink
+    add_sink(sink)
+    try:
+        yield sink
+    finally:
+        remove_sink(sink)
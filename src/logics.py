@@ -0,0 +1,245 @@
+# 2024 Sven van Loon
+
+from src.flat import NEGATION, AND, OR, IMPLICATION, EQUIVALENCE
+from fractions import Fraction
+from typing import Callable, Dict, List, Tuple
+
+# An operator of an n-valued logic as a function of the integer codes of
+# its operands, where code 0 is false and code n - 1 is true.
+Operator = Callable[..., int]
+# The largest number of truth values of a member of a family. Every binary
+# operator is a table of size ** 2 codes, so larger logics are refused.
+MAX_SIZE = 256
+
+
+class Logic():
+    """
+    A finite-valued logic with integer-encoded truth values.
+
+    The truth value with code t of an n-valued logic is t / (n - 1), so code
+    0 is false and code n - 1 is true. Every operator is a precomputed lookup
+    table of codes, 'tables[NEGATION][a]' for the negation and e.g.
+    'tables[AND][a][b]' for the binary operators, so evaluating a node is
+    indexing instead of arithmetic.
+    """
+
+    def __init__(self, name: str, size: int, negation: Operator,
+                 conjunction: Operator, disjunction: Operator,
+                 implication: Operator, equivalence: Operator) -> None:
+        """
+        Args:
+            name (str): The name the logic is registered under.
+            size (int): The number of truth values, at least 2.
+            negation (Operator): The negation of a code.
+            conjunction, disjunction, implication, equivalence (Operator):
+            The binary operators on codes.
+        """
+        self.name = name
+        self.size = size
+        codes = range(size)
+        self.tables = {NEGATION: tuple(negation(a) for a in codes)}
+        for opcode, operator in ((AND, conjunction), (OR, disjunction),
+                                 (IMPLICATION, implication),
+                                 (EQUIVALENCE, equivalence)):
+            self.tables[opcode] = tuple(tuple(operator(a, b) for b in codes)
+                                        for a in codes)
+        self.values = tuple(_value(Fraction(t, size - 1)) for t in codes)
+        self.symbols = tuple(_symbol(Fraction(t, size - 1)) for t in codes)
+
+    def __repr__(self) -> str:
+        return f"Logic({self.name!r}, {self.size})"
+
+    @property
+    def order(self) -> range:
+        """
+        The codes in the order used by truth tables, from true to false.
+        """
+        return range(self.size - 1, -1, -1)
+
+    def code(self, value: float) -> int:
+        """
+        Get the code of a truth value.
+
+        Raises:
+            ValueError: If the value is not a truth value of the logic.
+        """
+        t = value * (self.size - 1)
+        if t != round(t) or not 0 <= t < self.size:
+            raise ValueError(f"{value} is not a truth value of logic"
+                             f" {self.name}.")
+        return round(t)
+
+
+def _value(value: Fraction) -> float:
+    """
+    Convert a truth value to the number used outside of lookup tables, an
+    int for 0 and 1 and a float otherwise.
+    """
+    return int(value) if value.denominator == 1 else float(value)
+
+
+def _symbol(value: Fraction) -> int | str:
+    """
+    Get the symbol a truth value is printed as in a truth table, 'i' for
+    0.5 as in the '3' logic and a fraction like '1/3' for other values.
+    """
+    if value.denominator == 1:
+        return int(value)
+    return 'i' if value == Fraction(1, 2) else str(value)
+
+
+def lukasiewicz(n: int) -> Logic:
+    """
+    The n-valued logic of Lukasiewicz, which is classical logic for n=2 and
+    the '3' logic for n=3.
+    """
+    m = n - 1
+    return Logic(f"lukasiewicz-{n}", n,
+                 lambda a: m - a,
+                 min, max,
+                 lambda a, b: min(m, m - a + b),
+                 lambda a, b: m - abs(a - b))
+
+
+def goedel(n: int) -> Logic:
+    """
+    The n-valued logic of Goedel, with the residuum of min as implication
+    and the pseudo-complement as negation.
+    """
+    m = n - 1
+
+    def implication(a: int, b: int) -> int:
+        return m if a <= b else b
+
+    return Logic(f"goedel-{n}", n,
+                 lambda a: m if a == 0 else 0,
+                 min, max, implication,
+                 lambda a, b: min(implication(a, b), implication(b, a)))
+
+
+def post(n: int) -> Logic:
+    """
+    The n-valued logic of Post, with the cyclic negation that maps false to
+    true and every other value to the next lower one. The implication is
+    defined as !a | b and the equivalence as (a -> b) & (b -> a).
+    """
+    def implication(a: int, b: int) -> int:
+        return max((a - 1) % n, b)
+
+    return Logic(f"post-{n}", n,
+                 lambda a: (a - 1) % n,
+                 min, max, implication,
+                 lambda a, b: min(implication(a, b), implication(b, a)))
+
+
+def kleene_strong() -> Logic:
+    """
+    The strong three valued logic of Kleene, which differs from the '3'
+    logic in its implication !a | b and equivalence.
+    """
+    def implication(a: int, b: int) -> int:
+        return max(2 - a, b)
+
+    return Logic('kleene', 3, lambda a: 2 - a, min, max, implication,
+                 lambda a, b: min(implication(a, b), implication(b, a)))
+
+
+def kleene_weak() -> Logic:
+    """
+    The weak three valued logic of Kleene (Bochvar), in which every operation
+    with an unknown operand is unknown.
+    """
+    strong = kleene_strong()
+
+    def weak(opcode: int) -> Operator:
+        return lambda a, b: 1 if 1 in (a, b) else strong.tables[opcode][a][b]
+
+    return Logic('kleene-weak', 3, lambda a: 2 - a, weak(AND), weak(OR),
+                 weak(IMPLICATION), weak(EQUIVALENCE))
+
+
+_logics: Dict[str | None, Logic] = {}
+_families: Dict[str, Callable[[int], Logic]] = {}
+
+
+def register_logic(logic: Logic, *aliases: str | None) -> None:
+    """
+    Register a logic under its name and any aliases. A registered name
+    always keeps its logic, since evaluators compare logics by identity.
+
+    Raises:
+        ValueError: If a name is already registered for another logic.
+    """
+    names = (logic.name,) + aliases
+    for name in names:
+        if _logics.get(name, logic) is not logic:
+            raise ValueError(f"Logic {name} is already registered.")
+    for name in names:
+        _logics[name] = logic
+
+
+def register_family(prefix: str, factory: Callable[[int], Logic]) -> None:
+    """
+    Register a family of n-valued logics, named '<prefix>-<n>' for
+    2 <= n <= MAX_SIZE. A member is built by the factory the first time it
+    is used.
+    """
+    _families[prefix] = factory
+
+
+def get_logic(name: str | None) -> Logic:
+    """
+    Get a registered logic.
+
+    Args:
+        name (str or None): The name of the logic, None for classical logic
+        and '3' for the three valued logic of Lukasiewicz.
+
+    Returns:
+        Logic: The logic.
+
+    Raises:
+        ValueError: If the logic is not supported, which includes family
+        names with more than MAX_SIZE truth values or with a number that is
+        not written canonically, like 'goedel-04'.
+
+    Example:
+        >>> get_logic('goedel-4').symbols
+        (0, '1/3', '2/3', 1)
+    """
+    logic = _logics.get(name)
+    if logic is None and isinstance(name, str):
+        prefix, _, n = name.rpartition('-')
+        if prefix in _families and n.isdecimal() and n == str(int(n)) \
+                and 2 <= int(n) <= MAX_SIZE:
+            # Another thread may have built the same member meanwhile, the
+            # first one registered is kept.
+            logic = _logics.setdefault(name, _families[prefix](int(n)))
+    if logic is None:
+        raise ValueError(f"Logic {name} is not supported.")
+    return logic
+
+
+def is_arithmetic(logic: Logic) -> bool:
+    """
+    Check if the Lukasiewicz arithmetic of 'src.flat.apply_operator'
+    computes the truth values of a logic exactly, which holds for classical
+    logic and '3'. Evaluators can then skip the lookup tables.
+    """
+    return logic is _logics[None] or logic is _logics['3']
+
+
+def logic_names() -> Tuple[List[str | None], List[str]]:
+    """
+    List the registered logics and the prefixes of the registered families.
+    """
+    return list(_logics), [f"{prefix}-<n>" for prefix in _families]
+
+
+register_family('lukasiewicz', lukasiewicz)
+register_family('goedel', goedel)
+register_family('post', post)
+register_logic(lukasiewicz(2), 'classical', None)
+register_logic(lukasiewicz(3), '3')
+register_logic(kleene_strong())
+register_logic(kleene_weak())
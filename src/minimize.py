@@ -0,0 +1,352 @@
+# 2024 Sven van Loon
+
+from src.expression import LogicalExpression
+from src.bitset import evaluate_bitset
+from src.bdd import BDDManager, FALSE_NODE, TRUE_NODE, variable_order
+from typing import Dict, List, NamedTuple, Tuple
+
+# Up to this many variables the minimal cover is computed exactly with
+# Quine-McCluskey, above it the heuristic works on a decision diagram.
+EXACT_LIMIT = 10
+FORMS = ('dnf', 'cnf')
+METHODS = (None, 'exact', 'heuristic')
+# The heuristic stops when a pass does not lower the cost of the cover, or
+# after this many passes.
+MAX_PASSES = 8
+
+# A cube is a conjunction of literals as a pair of bitsets over the indices
+# of the variables, (values, mask): variable i occurs in the cube if bit i
+# of the mask is set, negated if bit i of the values is not set.
+Cube = Tuple[int, int]
+
+
+class Minimized(NamedTuple):
+    """
+    The result of 'minimize'.
+    """
+    expression: LogicalExpression
+    nodes_before: int
+    nodes_after: int
+
+
+def _literals(cube: Cube) -> int:
+    return cube[1].bit_count()
+
+
+def _cost(cover: List[Cube]) -> Tuple[int, int]:
+    return len(cover), sum(map(_literals, cover))
+
+
+def _minterms(bitset: int, n: int) -> List[int]:
+    """
+    Convert the result column of a classical truth table to the assignments
+    of its true rows, bit i of an assignment holds the value of variable i.
+    """
+    full = (1 << n) - 1
+    minterms = []
+    while bitset:
+        row = (bitset & -bitset).bit_length() - 1
+        # Row 0 of a truth table assigns 1 to every variable and the first
+        # variable changes slowest.
+        k = row ^ full
+        minterms.append(sum(((k >> (n - 1 - i)) & 1) << i for i in range(n)))
+        bitset &= bitset - 1
+    return minterms
+
+
+def _prime_implicants(minterms: List[int], n: int) -> List[Cube]:
+    """
+    Compute all prime implicants of a function by repeatedly merging pairs of
+    cubes that differ in a single literal (Quine-McCluskey).
+    """
+    full = (1 << n) - 1
+    cubes = {(m, full) for m in minterms}
+    primes = []
+    while cubes:
+        merged = set()
+        used = set()
+        for values, mask in cubes:
+            # Every pair is found once, from the cube with the literal.
+            bits = values
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                if (values ^ bit, mask) in cubes:
+                    used.add((values, mask))
+                    used.add((values ^ bit, mask))
+                    merged.add((values ^ bit, mask & ~bit))
+        primes += cubes - used
+        cubes = merged
+    return primes
+
+
+def _select_cover(primes: List[Cube], minterms: List[int]) -> List[Cube]:
+    """
+    Choose prime implicants covering every minterm, the essential ones first
+    and then greedily the one covering the most uncovered minterms.
+    """
+    covers = {prime: {m for m in minterms if m & prime[1] == prime[0]}
+              for prime in primes}
+    uncovered = set(minterms)
+    cover = []
+    for m in minterms:
+        covering = [prime for prime in primes if m in covers[prime]]
+        if len(covering) == 1 and covering[0] not in cover:
+            cover.append(covering[0])
+            uncovered -= covers[covering[0]]
+    while uncovered:
+        best = max(primes, key=lambda prime: (len(covers[prime] & uncovered),
+                                              -_literals(prime)))
+        cover.append(best)
+        uncovered -= covers[best]
+    return cover
+
+
+def _cofactor(cover: List[Cube], bit: int, value: int) -> List[Cube]:
+    """
+    Restrict a cover to the assignments in which the variable of 'bit' has
+    the given value.
+    """
+    wanted = bit if value else 0
+    return [(v & ~bit, m & ~bit) for v, m in cover
+            if not m & bit or v & bit == wanted]
+
+
+def _restrict(cover: List[Cube], cube: Cube) -> List[Cube]:
+    """
+    Restrict a cover to the assignments inside a cube, as cubes over the
+    variables that do not occur in it.
+    """
+    values, mask = cube
+    return [(v & ~mask, m & ~mask) for v, m in cover
+            if not (v ^ values) & m & mask]
+
+
+def _tautology(cover: List[Cube]) -> bool:
+    """
+    Check if a cover is true for every assignment, by recursively splitting
+    it on its most frequent binate variable as in Espresso.
+    """
+    if not cover:
+        return False
+    positive = negative = 0
+    for values, mask in cover:
+        if not mask:
+            return True
+        positive |= mask & values
+        negative |= mask & ~values
+    # A variable that occurs in both polarities is binate.
+    binate = positive & negative
+    if not binate:
+        # In a unate cover only a cube without literals is a tautology.
+        return False
+    counts = {}
+    for _, mask in cover:
+        bits = mask & binate
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            counts[bit] = counts.get(bit, 0) + 1
+    bit = max(counts, key=counts.get)
+    return _tautology(_cofactor(cover, bit, 1)) and \
+        _tautology(_cofactor(cover, bit, 0))
+
+
+def _exact_cover(bitset: int, n: int) -> List[Cube]:
+    minterms = _minterms(bitset, n)
+    if not minterms:
+        return []
+    return _select_cover(_prime_implicants(minterms, n), minterms)
+
+
+class _Heuristic():
+    """
+    An Espresso-style heuristic minimiser over a decision diagram.
+
+    The initial cover are the disjoint cubes of the paths of the diagram.
+    It is improved by passes of REDUCE, EXPAND and IRREDUNDANT. EXPAND checks
+    if a cube implies the function by restricting the diagram, the other
+    steps check if a cube is covered by the other cubes with tautology
+    checks on cube lists, so the truth table is never enumerated.
+    """
+
+    def __init__(self, manager: BDDManager, function: int,
+                 var: List[str]) -> None:
+        self.manager = manager
+        self.function = function
+        self.var = var
+
+    def _assignment(self, cube: Cube) -> Dict[str, int]:
+        values, mask = cube
+        return {name: (values >> i) & 1 for i, name in enumerate(self.var)
+                if mask >> i & 1}
+
+    def _implies(self, cube: Cube, function: int) -> bool:
+        return self.manager.restrict(function, self._assignment(cube)) \
+            == TRUE_NODE
+
+    def initial_cover(self) -> List[Cube]:
+        index = {name: i for i, name in enumerate(self.var)}
+        cover = []
+        for path in self.manager.paths(self.function):
+            values = mask = 0
+            for name, value in path.items():
+                mask |= 1 << index[name]
+                values |= value << index[name]
+            cover.append((values, mask))
+        return cover
+
+    def expand(self, cover: List[Cube]) -> List[Cube]:
+        """
+        Drop every literal of a cube that can be dropped without leaving the
+        function, and remove the cubes contained in an expanded cube.
+        """
+        expanded = []
+        for cube in sorted(cover, key=_literals):
+            values, mask = cube
+            if any(mask & m == m and values & m == v for v, m in expanded):
+                continue
+            for i in range(len(self.var)):
+                bit = 1 << i
+                if mask & bit and self._implies((values & ~bit, mask & ~bit),
+                                                self.function):
+                    values, mask = values & ~bit, mask & ~bit
+            expanded = [(v, m) for v, m in expanded
+                        if not (m & mask == mask and v & mask == values)]
+            expanded.append((values, mask))
+        return expanded
+
+    def irredundant(self, cover: List[Cube]) -> List[Cube]:
+        """
+        Remove the cubes that are covered by the union of the others, the
+        cubes with the most literals first.
+        """
+        cover = sorted(cover, key=_literals, reverse=True)
+        i = 0
+        while i < len(cover):
+            if _tautology(_restrict(cover[:i] + cover[i + 1:], cover[i])):
+                del cover[i]
+            else:
+                i += 1
+        return cover
+
+    def reduce(self, cover: List[Cube]) -> List[Cube]:
+        """
+        Shrink every cube to the smallest cube containing the part of the
+        function that no other cube covers, so the next expansion can grow
+        it in another direction.
+        """
+        cover = list(cover)
+        for i, cube in enumerate(cover):
+            covered = _restrict(cover[:i] + cover[i + 1:], cube)
+            if _tautology(covered):
+                continue
+            values, mask = cube
+            for j in range(len(self.var)):
+                bit = 1 << j
+                if mask & bit:
+                    continue
+                # The uncovered part lies where the variable has 'value' if
+                # the other cubes cover the cube where it has the other one.
+                for value in (0, 1):
+                    if _tautology(_cofactor(covered, bit, 1 - value)):
+                        values, mask = values | value << j, mask | bit
+                        covered = _cofactor(covered, bit, value)
+                        break
+            cover[i] = (values, mask)
+        return cover
+
+    def minimize(self) -> List[Cube]:
+        if self.function == FALSE_NODE:
+            return []
+        cover = self.irredundant(self.expand(self.initial_cover()))
+        for _ in range(MAX_PASSES):
+            candidate = self.irredundant(self.expand(self.reduce(cover)))
+            if _cost(candidate) >= _cost(cover):
+                break
+            cover = candidate
+        return cover
+
+
+def _heuristic_cover(expression: LogicalExpression,
+                     negate: bool) -> List[Cube]:
+    manager = BDDManager()
+    manager.declare(variable_order(expression.flat))
+    function = manager.compile(expression.flat)
+    if negate:
+        function = manager.negate(function)
+    return _Heuristic(manager, function, expression.var).minimize()
+
+
+def _format(cover: List[Cube], var: List[str], form: str) -> str:
+    """
+    Write a cover of cubes as a DNF, or as the CNF of its complement.
+    """
+    inner, outer = (' & ', ' | ') if form == 'dnf' else (' | ', ' & ')
+    if not cover or (0, 0) in cover:
+        # A constant, which the grammar can only express with a variable.
+        constant = (not cover) == (form == 'dnf')
+        return f"{var[0]}{' & !' if constant else ' | !'}{var[0]}"
+    terms = []
+    for values, mask in cover:
+        literals = [name if (values >> i & 1) == (form == 'dnf')
+                    else f"!{name}"
+                    for i, name in enumerate(var) if mask >> i & 1]
+        term = inner.join(literals)
+        terms.append(f"({term})" if len(literals) > 1 and len(cover) > 1
+                     else term)
+    return outer.join(terms)
+
+
+def minimize(expression: LogicalExpression, form: str = 'dnf',
+             method: str | None = None) -> Minimized:
+    """
+    Minimise an expression to an equivalent two-level expression.
+
+    A DNF is a minimal cover of the true rows of the classical truth table
+    with conjunctions of literals, a CNF is the negation of a minimal DNF of
+    the false rows. With the 'exact' method the cover is chosen from all
+    prime implicants (Quine-McCluskey), with the 'heuristic' method it is
+    improved by Espresso-style passes on a decision diagram, which works
+    for any number of variables but does not guarantee a minimal cover.
+
+    The result is equivalent to the expression in classical logic only, and
+    variables the expression does not depend on do not occur in it.
+
+    Args:
+        expression (LogicalExpression): The expression to minimise.
+        form (str): 'dnf' for a disjunction of conjunctions or 'cnf' for a
+        conjunction of disjunctions.
+        method (str or None): 'exact' or 'heuristic', by default 'exact' up
+        to EXACT_LIMIT variables and 'heuristic' above.
+
+    Returns:
+        Minimized: The minimised expression and the number of nodes of the
+        expression tree before and after minimisation.
+
+    Raises:
+        ValueError: If the form or the method is not supported.
+
+    Example:
+        >>> result = minimize(LogicalExpression("(A & B) | (A & !B) | C"))
+        >>> result.expression.text, result.nodes_before, result.nodes_after
+        ('A | C', 10, 3)
+    """
+    if form not in FORMS:
+        raise ValueError(f"Form {form} is not supported, use one of"
+                         f" {FORMS}.")
+    if method not in METHODS:
+        raise ValueError(f"Method {method} is not supported, use one of"
+                         f" {METHODS}.")
+    var = expression.var
+    if method is None:
+        method = 'exact' if len(var) <= EXACT_LIMIT else 'heuristic'
+    if method == 'exact':
+        bitset = evaluate_bitset(expression.flat)
+        if form == 'cnf':
+            bitset ^= (1 << (1 << len(var))) - 1
+        cover = _exact_cover(bitset, len(var))
+    else:
+        cover = _heuristic_cover(expression, negate=form == 'cnf')
+    minimized = LogicalExpression(_format(cover, var, form))
+    return Minimized(minimized, len(expression.flat), len(minimized.flat))
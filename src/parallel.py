@@ -0,0 +1,130 @@
+# 2024 Sven van Loon
+
+from src.expression import LogicalExpression
+from src.logics import get_logic
+from src.render import iter_rows
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat, starmap
+from typing import Callable, List, Tuple
+
+CHUNK_SIZE = 1 << 16
+AGGREGATES = (None, 'count', 'satisfying')
+
+
+def row_assignment(index: int, n: int, logic: str | None = None) \
+        -> Tuple[float, ...]:
+    """
+    Compute the combination of truth values in a row of a truth table.
+
+    Args:
+        index (int): The index of the row.
+        n (int): The number of variables.
+        logic (str or None): The name of a registered logic, None for
+        classical logic.
+
+    Returns:
+        Tuple[float, ...]: The truth values of the variables in the row, in
+        the order of the sorted variables.
+
+    Raises:
+        ValueError: If the logic is not supported.
+
+    Example:
+        >>> row_assignment(2, 2)
+        (0, 1)
+    """
+    logic = get_logic(logic)
+    k = logic.size
+    digits = []
+    for _ in range(n):
+        index, digit = divmod(index, k)
+        digits.append(logic.values[logic.order[digit]])
+    return tuple(reversed(digits))
+
+
+@lru_cache(maxsize=64)
+def _worker_function(text: str, logic: str | None) -> Callable[..., int]:
+    """
+    Parse and compile a serialised expression once per worker process and
+    logic, the function evaluates codes with the lookup tables of the logic.
+    """
+    return LogicalExpression(text)._compile_result(get_logic(logic))
+
+
+def _evaluate_range(text: str, n: int, logic: str | None,
+                    aggregate: str | None, start: int, stop: int):
+    """
+    Evaluate the rows in the range [start, stop) of a truth table in a worker
+    process.
+
+    Returns:
+        list or int: The results of the rows, their number of satisfying
+        rows, or the indices of the satisfying rows, depending on
+        'aggregate'.
+    """
+    evaluate = _worker_function(text, logic)
+    logic = get_logic(logic)
+    true = logic.size - 1
+    results = starmap(evaluate, iter_rows(logic.order, n, start, stop))
+    if aggregate is None:
+        return list(map(logic.values.__getitem__, results))
+    if aggregate == 'count':
+        return sum(1 for result in results if result == true)
+    return [start + i for i, result in enumerate(results) if result == true]
+
+
+def parallel_truth_table(expression: LogicalExpression,
+                         logic: str | None = None,
+                         aggregate: str | None = None,
+                         workers: int | None = None,
+                         chunk_size: int = CHUNK_SIZE) \
+        -> List[float] | int | List[Tuple[float, ...]]:
+    """
+    Evaluate the truth table of an expression in a pool of worker processes.
+
+    The rows of the truth table are split into contiguous ranges of
+    'chunk_size' rows. Each worker receives the canonical string of the
+    expression tree instead of a pickled LogicalExpression, compiles it once
+    and evaluates whole ranges. The results of the ranges are merged in row
+    order.
+
+    Args:
+        expression (LogicalExpression): The expression to evaluate.
+        logic (str or None): The name of a registered logic. If None,
+        defaults to propositional logic, if '3' Lukasiewicz logic.
+        aggregate (str or None): If None, return the truth value of the
+        expression in every row. If 'count', return the number of rows in
+        which the expression is true. If 'satisfying', return the
+        combinations of truth values for which the expression is true.
+        workers (int or None): The number of worker processes, defaults to
+        the number of processors.
+        chunk_size (int): The number of rows evaluated per task.
+
+    Returns:
+        list or int: The results, as specified by 'aggregate'.
+
+    Raises:
+        ValueError: If the logic, the aggregate or the chunk size is not
+        valid.
+    """
+    if aggregate not in AGGREGATES:
+        raise ValueError(f"Aggregate {aggregate} is not supported, use one"
+                         f" of {AGGREGATES}.")
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}.")
+    n = len(expression.var)
+    rows = get_logic(logic).size ** n
+    text = expression.flat.to_string()
+    starts = range(0, rows, chunk_size)
+    stops = [min(start + chunk_size, rows) for start in starts]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(_evaluate_range, repeat(text), repeat(n),
+                              repeat(logic), repeat(aggregate), starts, stops)
+        if aggregate == 'count':
+            return sum(chunks)
+        results = [value for chunk in chunks for value in chunk]
+    if aggregate == 'satisfying':
+        return [row_assignment(index, n, logic) for index in results]
+    return results
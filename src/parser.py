@@ -0,0 +1,149 @@
+# 2024 Sven van Loon
+
+from src.scanner import (Token, TokenType, OPERATORS, START_OPERATORS,
+                         NEGATIONS, _match_operator)
+from src.expression_tree import TreeNode
+from typing import List, Tuple
+
+
+def _syntax_error(message: str, expression: str, offset: int) -> SyntaxError:
+    """
+    Create a SyntaxError pointing at a character of the expression.
+
+    Args:
+        message (str): The description of the error.
+        expression (str): The logical expression being parsed.
+        offset (int): The index of the offending character.
+
+    Returns:
+        SyntaxError: The error, its 'offset' attribute is 1-based like the
+        offsets of Python's own syntax errors.
+    """
+    return SyntaxError(f"{message} at position {offset}.",
+                       ('<expression>', 1, offset + 1, expression))
+
+
+def _reduce(operands: List[TreeNode], operator: TreeNode) -> None:
+    """
+    Attach the topmost operand(s) to an operator node and push the operator
+    node back as a new operand.
+    """
+    if operator.type == TokenType.NEGATION:
+        operator.left = operands.pop()
+    else:
+        operator.right = operands.pop()
+        operator.left = operands.pop()
+    operands.append(operator)
+
+
+def parse(expression: str) -> Tuple[List[Token], TreeNode]:
+    """
+    Tokenize, validate and build the tree of a logical expression in a single
+    pass.
+
+    The parser is an iterative operator precedence parser, so its running
+    time is linear in the length of the expression and long expressions do
+    not hit Python's recursion limit. Negations bind tighter than the binary
+    operators, which all have the same precedence and associate to the
+    right.
+
+    Args:
+        expression (str): The logical expression to parse.
+
+    Returns:
+        tuple: A tuple containing the list of tokens of the expression and
+        the root node of its expression tree. The position of the root node
+        is the position of the main connective.
+
+    Raises:
+        ValueError: If the expression contains a character that is not part
+        of any token.
+        SyntaxError: If the tokens do not form a valid expression, with the
+        position of the offending character.
+
+    Example:
+        >>> tokens, root = parse("A & !C")
+        >>> root.data, root.left.data, root.right.data
+        ('&', 'A', '!')
+    """
+    tokens = []
+    operands = []
+    # Pending operators and opening parentheses, with the offset of the
+    # parentheses kept for error messages.
+    operators = []
+    expect_operand = True
+    offset = 0
+    length = len(expression)
+    while offset < length:
+        character = expression[offset]
+        start = offset
+        if character.isspace():
+            offset += 1
+            continue
+        if expect_operand:
+            if character.isalpha():
+                token = Token(character, TokenType.VARIABLE, len(tokens))
+                operands.append(TreeNode(token))
+                expect_operand = False
+            elif character in NEGATIONS:
+                token = Token(character, TokenType.NEGATION, len(tokens))
+                operators.append(TreeNode(token))
+            elif character == '(':
+                token = Token(character, TokenType.SYMBOL, len(tokens))
+                operators.append(start)
+            elif character == ')' or character in OPERATORS or \
+                    character in START_OPERATORS:
+                raise _syntax_error(f"Expected a variable, a negation or "
+                                    f"'(' but found {character!r}",
+                                    expression, start)
+            else:
+                raise ValueError(f"Provided expression is not valid, "
+                                 f"unexpected character {character!r} at "
+                                 f"position {start}.")
+        else:
+            if character in OPERATORS or character in START_OPERATORS:
+                if character in OPERATORS:
+                    token = Token(character, TokenType.OPERATOR, len(tokens))
+                else:
+                    try:
+                        value, offset, additional_space = \
+                            _match_operator(expression, offset)
+                    except ValueError:
+                        raise _syntax_error("Incomplete operator",
+                                            expression, start) from None
+                    token = Token(value, TokenType.OPERATOR, len(tokens),
+                                  additional_space)
+                # Negations bind tighter than binary operators, binary
+                # operators associate to the right and are left pending.
+                while operators and not isinstance(operators[-1], int) and \
+                        operators[-1].type == TokenType.NEGATION:
+                    _reduce(operands, operators.pop())
+                operators.append(TreeNode(token))
+                expect_operand = True
+            elif character == ')':
+                while operators and not isinstance(operators[-1], int):
+                    _reduce(operands, operators.pop())
+                if not operators:
+                    raise _syntax_error("Unmatched ')'", expression, start)
+                operators.pop()
+                token = Token(character, TokenType.SYMBOL, len(tokens))
+            elif character.isalpha() or character in NEGATIONS or \
+                    character == '(':
+                raise _syntax_error(f"Expected an operator or ')' but found "
+                                    f"{character!r}", expression, start)
+            else:
+                raise ValueError(f"Provided expression is not valid, "
+                                 f"unexpected character {character!r} at "
+                                 f"position {start}.")
+        tokens.append(token)
+        offset += 1
+
+    if expect_operand:
+        raise _syntax_error("Unexpected end of expression", expression,
+                            length)
+    while operators:
+        operator = operators.pop()
+        if isinstance(operator, int):
+            raise _syntax_error("Unmatched '('", expression, operator)
+        _reduce(operands, operator)
+    return tokens, operands[0]
@@ -0,0 +1,411 @@
+# 2024 Sven van Loon
+
+from src.scanner import Token
+from src.logics import Logic, get_logic
+from src import instrumentation
+from itertools import product
+from time import perf_counter
+from typing import Iterator, List, Sequence, TextIO, Tuple, TypeVar
+import sys
+
+FORMATS = ('text', 'markdown', 'latex', 'compact')
+# Rows are evaluated and formatted in chunks of this many rows, every chunk
+# is written to the output with a single call.
+ROWS_PER_CHUNK = 1 << 12
+# The rows of a range are generated as a fixed prefix of the first variables
+# followed by every combination of at most this many rows of the last ones.
+BLOCK_SIZE = 1 << 12
+# The characters of the codes in the compact format.
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+LATEX_TOKENS = {'&': r'$\land$', '|': r'$\lor$', '!': r'$\neg$',
+                '~': r'$\neg$', '->': r'$\rightarrow$',
+                '<->': r'$\leftrightarrow$'}
+T = TypeVar('T')
+
+
+def iter_rows(values: Sequence[T], n: int, start: int,
+              stop: int) -> Iterator[Tuple[T, ...]]:
+    """
+    Lazily generate the rows [start, stop) of a truth table of n variables
+    without generating the rows before 'start'. The first variable changes
+    slowest, like in 'product(values, repeat=n)'.
+
+    Args:
+        values (Sequence): What to fill the rows with in table order, e.g.
+        'logic.order' for the codes or the truth values from true to false.
+        n (int): The number of variables.
+        start (int): The index of the first row.
+        stop (int): The index after the last row.
+
+    Yields:
+        tuple: The values of the variables in the next row.
+    """
+    k = len(values)
+    low = 0
+    while low < n and k ** (low + 1) <= BLOCK_SIZE:
+        low += 1
+    block = k ** low
+    suffixes = list(product(values, repeat=low))
+    for p in range(start // block, (stop - 1) // block + 1):
+        prefix = []
+        index = p
+        for _ in range(n - low):
+            index, digit = divmod(index, k)
+            prefix.append(values[digit])
+        prefix = tuple(reversed(prefix))
+        first = max(start - p * block, 0)
+        last = min(stop - p * block, block)
+        for suffix in suffixes[first:last]:
+            yield prefix + suffix
+
+
+class TableRenderer():
+    """
+    A renderer of the truth table of an expression in one of FORMATS.
+
+    The layout of the table is computed once: every column is as wide as
+    the widest of its heading and the symbols of the logic, and the cells of
+    a row are filled into a precompiled '%' template from tuples of symbols
+    that are already padded to the width of their column. Rows are
+    evaluated and formatted in chunks that are written with a single call,
+    so a row costs a template substitution and no print calls.
+
+    The formats are:
+        'text': the table of 'LogicalExpression.truth_table', with the
+        variables and the main connective separated by '/'.
+        'markdown': a Markdown table, the column of the main connective is
+        bold.
+        'latex': a LaTeX tabular environment, the column of the main
+        connective is bold.
+        'compact': one line per row with a character per variable, a space
+        and a character for the expression, the codes of the truth values
+        with 0 for false, e.g. '101 1'. Only the expression is evaluated.
+
+    Example:
+        >>> renderer = TableRenderer(LogicalExpression("A -> B"))
+        >>> renderer.render(stop=2)
+        A  B  /  A  /  ->  /  B
+        -----------------------
+        1  1  /     /  1   /
+        1  0  /     /  0   /
+        2
+    """
+
+    def __init__(self, expression, logic: str | None = None,
+                 format: str = 'text') -> None:
+        """
+        Args:
+            expression (LogicalExpression): The expression.
+            logic (str or None): The name of a registered logic.
+            format (str): One of FORMATS.
+
+        Raises:
+            ValueError: If the logic or the format is not supported, or the
+            logic has more truth values than the compact format has digits.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Format {format} is not supported, use one of"
+                             f" {FORMATS}.")
+        self.expression = expression
+        self.logic: Logic = get_logic(logic)
+        self.format = format
+        if format == 'compact' and self.logic.size > len(DIGITS):
+            raise ValueError(f"The compact format supports at most"
+                             f" {len(DIGITS)} truth values.")
+        self.rows = self.logic.size ** len(expression.var)
+        symbols = [str(symbol) for symbol in self.logic.symbols]
+        self._symbol_width = max(map(len, symbols))
+        if format == 'compact':
+            self._layout_compact()
+        else:
+            self._layout(symbols)
+
+    def _widths(self, tokens: List[Token]) -> Tuple[List[int], List[int]]:
+        """
+        Compute the widths of the columns of the variables and of the tokens.
+        """
+        width = self._symbol_width
+        variables = [max(len(name), width) for name in self.expression.var]
+        tokens = [max(len(token.value), 1 + token.additional_space, width)
+                  for token in tokens]
+        return variables, tokens
+
+    def _layout(self, symbols: List[str]) -> None:
+        """
+        Build the header, the row template and the padded symbols of every
+        column of the 'text', 'markdown' and 'latex' formats.
+        """
+        expression = self.expression
+        main = expression._main_connective_position
+        evaluated = set(expression.evaluation_positions)
+        exp = expression.exp
+        variables, tokens = self._widths(exp)
+        headings = list(expression.var)
+        texts = [token.value for token in exp]
+        bold = '%s'
+        if self.format == 'markdown':
+            texts = [text.replace('|', r'\|') for text in texts]
+            bold = '**%s**'
+        elif self.format == 'latex':
+            texts = [LATEX_TOKENS.get(text, text) for text in texts]
+            bold = r'\textbf{%s}'
+        texts[main] = bold % texts[main]
+        # Markup makes the columns wider, the symbols stay aligned.
+        tokens = [max(width, len(text)) for width, text in zip(tokens, texts)]
+        tokens[main] = max(tokens[main],
+                           len(bold % ('x' * self._symbol_width)))
+
+        def pad(cells: List[str], widths: List[int]) -> List[str]:
+            return [cell.ljust(width) for cell, width in zip(cells, widths)]
+
+        # The padded symbols of a column, indexed by code.
+        self._variable_cells = [tuple(symbol.ljust(width)
+                                      for symbol in symbols)
+                                for width in variables]
+        self._evaluation_cells = [
+            tuple((bold % symbol if position == main else symbol)
+                  .ljust(tokens[position]) for symbol in symbols)
+            for position in expression.evaluation_positions]
+        self._variable_widths = variables
+        self._token_widths = tokens
+        # The cells of the tokens without an evaluation are constant.
+        cells = ['%s' if i in evaluated else
+                 ' '.ljust(width).replace('%', '%%')
+                 for i, width in enumerate(tokens)]
+        variable_slots = ['%s'] * len(variables)
+        if self.format == 'text':
+            line = self._join_text(pad(headings, variables),
+                                   pad(texts, tokens))
+            # The dashes end with the last heading.
+            self._header = line + '\n' + '-' * len(line.rstrip()) + '\n'
+            template = self._join_text(variable_slots, cells)
+        elif self.format == 'markdown':
+            heading = pad(headings, variables) + pad(texts, tokens)
+            self._header = '| ' + ' | '.join(heading) + ' |\n' + \
+                '|' + '|'.join('-' * (len(cell) + 2) for cell in heading) + \
+                '|\n'
+            template = '| ' + ' | '.join(variable_slots + cells) + ' |'
+        else:
+            columns = 'c' * len(variables) + '|' + 'c' * len(tokens)
+            self._header = '\\begin{tabular}{' + columns + '}\n' + \
+                ' & '.join(pad(headings, variables) + pad(texts, tokens)) + \
+                ' \\\\\n\\hline\n'
+            template = ' & '.join(variable_slots + cells) + ' \\\\'
+        self._footer = '\\end{tabular}\n' if self.format == 'latex' else ''
+        self._template = template + '\n'
+        self._evaluate = expression._compile_logic(self.logic)
+
+    def _join_text(self, variables: List[str], tokens: List[str]) -> str:
+        """
+        Join the cells of a line of the 'text' format, the variables and
+        both sides of the main connective are separated by '/'.
+        """
+        main = self.expression._main_connective_position
+        left, right = tokens[:main], tokens[main + 1:]
+        line = '  '.join(variables) + '  /  '
+        if left:
+            line += '  '.join(left) + '  /  '
+        return line + tokens[main] + '  /  ' + '  '.join(right)
+
+    def _layout_compact(self) -> None:
+        symbols = ', '.join(f"{DIGITS[code]} = {symbol}"
+                            for code, symbol in enumerate(self.logic.symbols))
+        self._header = f"# {' '.join(self.expression.var)}:" \
+            f" {self.expression.text} ({symbols})\n"
+        self._footer = ''
+        digits = tuple(DIGITS[:self.logic.size])
+        self._variable_cells = [digits] * len(self.expression.var)
+        self._evaluation_cells = [digits]
+        self._template = '%s' * len(self.expression.var) + ' %s\n'
+        result = self.expression._compile_result(self.logic)
+        self._evaluate = lambda *codes: (result(*codes),)
+
+    @property
+    def header(self) -> str:
+        """
+        The lines written before the rows.
+        """
+        return self._header
+
+    @property
+    def footer(self) -> str:
+        """
+        The lines written after the rows.
+        """
+        return self._footer
+
+    def indices(self, start: int, stop: int | None) -> Tuple[int, int]:
+        """
+        Resolve a range of rows like a slice, negative indices count from
+        the end of the table.
+        """
+        return slice(start, stop).indices(self.rows)[:2]
+
+    def iter_chunks(self, start: int = 0, stop: int | None = None) \
+            -> Iterator[str]:
+        """
+        Lazily format the rows [start, stop) of the table, without header
+        and footer, in chunks of at most ROWS_PER_CHUNK rows.
+
+        Args:
+            start (int): The index of the first row, negative indices count
+            from the end of the table.
+            stop (int or None): The index after the last row, by default the
+            end of the table.
+
+        Yields:
+            str: The formatted lines of the next rows.
+        """
+        for chunk, rows in self._iter_evaluated(start, stop):
+            yield self._format(chunk, rows)
+
+    def _iter_evaluated(self, start: int, stop: int | None) \
+            -> Iterator[Tuple[list, list]]:
+        """
+        Evaluate the rows [start, stop) in chunks of at most ROWS_PER_CHUNK
+        rows.
+
+        Yields:
+            tuple: The codes of the variables and the evaluated codes of the
+            rows of the next chunk.
+        """
+        start, stop = self.indices(start, stop)
+        if start >= stop:
+            return
+        codes = iter_rows(self.logic.order, len(self.expression.var), start,
+                          stop)
+        evaluate = self._evaluate
+        for chunk_start in range(start, stop, ROWS_PER_CHUNK):
+            chunk = [next(codes)
+                     for _ in range(min(ROWS_PER_CHUNK, stop - chunk_start))]
+            yield chunk, [evaluate(*row) for row in chunk]
+
+    def _format(self, chunk: list, rows: list) -> str:
+        """
+        Format the evaluated rows of a chunk.
+        """
+        template = self._template
+        variable_cells = self._variable_cells
+        evaluation_cells = self._evaluation_cells
+        get = tuple.__getitem__
+        return ''.join([template % (*map(get, variable_cells, row),
+                                    *map(get, evaluation_cells, values))
+                        for row, values in zip(chunk, rows)])
+
+    def _instrumented_chunks(self, start: int, stop: int | None) \
+            -> Iterator[str]:
+        """
+        Format chunks like 'iter_chunks', reporting the time spent on
+        evaluating and on formatting rows to the installed sinks.
+        """
+        evaluating = formatting = 0.0
+        rows = 0
+        chunks = self._iter_evaluated(start, stop)
+        while True:
+            begin = perf_counter()
+            evaluated = next(chunks, None)
+            middle = perf_counter()
+            evaluating += middle - begin
+            if evaluated is None:
+                break
+            text = self._format(*evaluated)
+            formatting += perf_counter() - middle
+            rows += len(evaluated[0])
+            yield text
+        instrumentation.emit(instrumentation.TIME, 'truth_table.evaluate',
+                             evaluating)
+        instrumentation.emit(instrumentation.TIME, 'truth_table.render',
+                             formatting)
+        self.expression._count_evaluations('truth_table', rows)
+
+    def render(self, file: TextIO | None = None, start: int = 0,
+               stop: int | None = None, header: bool = True) -> int:
+        """
+        Write the rows [start, stop) of the table to a file.
+
+        Args:
+            file (TextIO or None): The file, by default standard output.
+            start (int): The index of the first row, negative indices count
+            from the end of the table.
+            stop (int or None): The index after the last row, by default the
+            end of the table.
+            header (bool): Whether to write the header and the footer, e.g.
+            False for the pages after the first one.
+
+        Returns:
+            int: The number of rows written.
+        """
+        if file is None:
+            file = sys.stdout
+        write = file.write
+        instrumented = instrumentation.enabled()
+        if header:
+            if instrumented:
+                with instrumentation.timer('truth_table.header'):
+                    write(self._header)
+            else:
+                write(self._header)
+        chunks = self._instrumented_chunks(start, stop) if instrumented \
+            else self.iter_chunks(start, stop)
+        for chunk in chunks:
+            write(chunk)
+        if header:
+            write(self._footer)
+        first, last = self.indices(start, stop)
+        return max(last - first, 0)
+
+    def head(self, rows: int, file: TextIO | None = None) -> int:
+        """
+        Write the header and the first rows of the table.
+        """
+        return self.render(file, 0, rows)
+
+    def tail(self, rows: int, file: TextIO | None = None) -> int:
+        """
+        Write the header and the last rows of the table.
+        """
+        return self.render(file, max(self.rows - rows, 0))
+
+    def page(self, number: int, size: int, file: TextIO | None = None) -> int:
+        """
+        Write the header and page 'number' of the table, counted from 0,
+        with 'size' rows per page.
+
+        Raises:
+            ValueError: If the page size is smaller than 1.
+        """
+        if size < 1:
+            raise ValueError(f"Page size must be at least 1, got {size}.")
+        return self.render(file, number * size, (number + 1) * size)
+
+    def format_values(self, variables: Sequence, evaluations: Sequence) \
+            -> str:
+        """
+        Format a single row of arbitrary truth values, e.g. of an assignment
+        that is not a row of the table.
+
+        Args:
+            variables (Sequence): The truth values of the variables, in the
+            order of 'var', 0.5 is written as 'i'.
+            evaluations (Sequence): The truth values at
+            'evaluation_positions'.
+
+        Returns:
+            str: The formatted line.
+
+        Raises:
+            ValueError: If the format is 'compact'.
+        """
+        if self.format == 'compact':
+            raise ValueError("The compact format only formats codes.")
+        main = self.expression._main_connective_position
+        positions = self.expression.evaluation_positions
+        bold = {'text': '%s', 'markdown': '**%s**',
+                'latex': r'\textbf{%s}'}[self.format]
+        cells = [str('i' if value == 0.5 else value).ljust(width)
+                 for value, width in zip(variables, self._variable_widths)]
+        cells += [(bold % ('i' if value == 0.5 else value) if position == main
+                   else str('i' if value == 0.5 else value))
+                  .ljust(self._token_widths[position])
+                  for position, value in zip(positions, evaluations)]
+        return self._template % tuple(cells)
@@ -0,0 +1,387 @@
+# 2024 Sven van Loon
+
+from src.expression import LogicalExpression
+from src.cache import get_expression
+from src.compiler import compile_flat
+from src.flat import (FlatExpression, VARIABLE, NEGATION, AND, OR,
+                      EQUIVALENCE)
+from src.logics import Logic, get_logic
+from array import array
+from typing import (Callable, Dict, Iterable, List, Mapping, NamedTuple,
+                    Sequence)
+
+# The operands of these operators are ordered by node, so 'A & B' and
+# 'B & A' share a node. This holds in every logic whose tables of these
+# operators are symmetric, which is checked before evaluating in a logic.
+COMMUTATIVE = (AND, OR, EQUIVALENCE)
+
+Rule = str | LogicalExpression
+
+
+class Sharing(NamedTuple):
+    """
+    The sharing achieved by a RuleSet.
+    """
+    rules: int
+    # The number of nodes of the trees of all rules.
+    tree_nodes: int
+    # The number of nodes of the shared graph, each is evaluated once per
+    # assignment.
+    dag_nodes: int
+
+    @property
+    def saved(self) -> int:
+        return self.tree_nodes - self.dag_nodes
+
+    @property
+    def ratio(self) -> float:
+        """
+        The number of tree nodes per graph node, 1.0 without any sharing.
+        """
+        return self.tree_nodes / self.dag_nodes if self.dag_nodes else 1.0
+
+
+def _check_commutative(logic: Logic) -> None:
+    """
+    Raises:
+        ValueError: If an operator in COMMUTATIVE is not commutative in the
+        logic.
+    """
+    for opcode in COMMUTATIVE:
+        table = logic.tables[opcode]
+        if any(table[a][b] != table[b][a] for a in range(logic.size)
+               for b in range(a)):
+            raise ValueError(f"Rule sets share the operands of commutative"
+                             f" operators, which logic {logic.name} does"
+                             f" not have.")
+
+
+class RuleSet():
+    """
+    Many expressions compiled into one directed acyclic graph, in which every
+    distinct subformula is a single node.
+
+    The nodes are hash-consed: a node is identified by its operator and the
+    nodes of its operands, so a subformula that occurs in several rules, or
+    several times in one rule, is added once. The operands of '&', '|' and
+    '<->' are ordered, so 'A & B' and 'B & A' are the same node. The graph is
+    stored like a FlatExpression, with nodes after their operands, and
+    compiled into one function that evaluates every node once and returns
+    the results of all rules.
+
+    Example:
+        >>> rules = RuleSet({'r1': "(A & B) | C", 'r2': "!(B & A)"})
+        >>> rules.evaluate({'A': 1, 'B': 1, 'C': 0})
+        {'r1': 1, 'r2': 0}
+        >>> rules.sharing()
+        Sharing(rules=2, tree_nodes=9, dag_nodes=6)
+    """
+
+    def __init__(self, rules: Iterable[Rule] | Mapping[str, Rule] = ()) \
+            -> None:
+        """
+        Args:
+            rules (Iterable or Mapping): The rules, given as expressions or
+            their text, or as a mapping of the names of the rules to them.
+            Rules without a name are named by their text.
+
+        Raises:
+            ValueError: If a rule is not a valid expression or two rules have
+            the same name.
+        """
+        self.names: List[str] = []
+        self.texts: List[str] = []
+        self._indices: Dict[str, int] = {}
+        self._roots = array('i')
+        self._variable_ids: Dict[str, int] = {}
+        self._opcodes = array('b')
+        self._left = array('i')
+        self._right = array('i')
+        self._variables = array('i')
+        self._unique: Dict[tuple, int] | None = {}
+        self._tree_nodes = 0
+        self._flat = None
+        self._functions: Dict[str | None, Callable[..., tuple]] = {}
+        if isinstance(rules, Mapping):
+            for name, rule in rules.items():
+                self.add(rule, name)
+        else:
+            for rule in rules:
+                self.add(rule)
+
+    @classmethod
+    def _restore(cls, names: List[str], texts: List[str], var: List[str],
+                 opcodes: array, left: array, right: array,
+                 variables: array, roots: array,
+                 tree_nodes: int) -> 'RuleSet':
+        """
+        Create a rule set from the arrays of its graph, as stored by
+        'src.bank', without parsing its rules. The unique table is only
+        rebuilt when a rule is added.
+        """
+        ruleset = cls()
+        ruleset.names, ruleset.texts = names, texts
+        ruleset._indices = {name: i for i, name in enumerate(names)}
+        ruleset._variable_ids = {name: i for i, name in enumerate(var)}
+        ruleset._opcodes, ruleset._left, ruleset._right = \
+            opcodes, left, right
+        ruleset._variables, ruleset._roots = variables, roots
+        ruleset._tree_nodes = tree_nodes
+        ruleset._unique = None
+        return ruleset
+
+    def _rebuild_unique(self) -> Dict[tuple, int]:
+        unique = {}
+        for node, opcode in enumerate(self._opcodes):
+            if opcode == VARIABLE:
+                unique[opcode, self._variables[node]] = node
+            elif opcode == NEGATION:
+                unique[opcode, self._left[node]] = node
+            else:
+                unique[opcode, self._left[node], self._right[node]] = node
+        return unique
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def var(self) -> List[str]:
+        """
+        The sorted variables of all rules.
+        """
+        return sorted(self._variable_ids)
+
+    def _node(self, key: tuple) -> int:
+        """
+        Get the node of an operator and its operands, adding it if needed.
+        """
+        if self._unique is None:
+            self._unique = self._rebuild_unique()
+        node = self._unique.get(key)
+        if node is None:
+            node = len(self._opcodes)
+            self._unique[key] = node
+            self._opcodes.append(key[0])
+            if key[0] == VARIABLE:
+                self._variables.append(key[1])
+                self._left.append(-1)
+            else:
+                self._variables.append(-1)
+                self._left.append(key[1])
+            self._right.append(key[2] if len(key) > 2 else -1)
+        return node
+
+    def add(self, rule: Rule, name: str | None = None) -> int:
+        """
+        Add a rule, sharing its subformulas with the rules already added.
+
+        Args:
+            rule (str or LogicalExpression): The rule. The text is kept as it
+            was written, the parsed expression is shared through
+            'src.cache'.
+            name (str or None): The name of the rule, by default its text.
+
+        Returns:
+            int: The node of the graph that evaluates the rule.
+
+        Raises:
+            ValueError: If the rule is not a valid expression or a rule with
+            the same name was added before.
+        """
+        # The cache returns the spelling it saw first of an equivalent
+        # expression, only its tree is used.
+        text = rule if isinstance(rule, str) else rule.text
+        name = text if name is None else name
+        if name in self._indices:
+            raise ValueError(f"A rule named {name!r} already exists.")
+        if isinstance(rule, str):
+            rule = get_expression(rule)
+        flat = rule.flat
+        nodes = []
+        for i, opcode in enumerate(flat.opcodes):
+            if opcode == VARIABLE:
+                variable = flat.var[flat.variables[i]]
+                key = (VARIABLE, self._variable_ids.setdefault(
+                    variable, len(self._variable_ids)))
+            elif opcode == NEGATION:
+                key = (NEGATION, nodes[flat.left[i]])
+            else:
+                a, b = nodes[flat.left[i]], nodes[flat.right[i]]
+                if opcode in COMMUTATIVE and b < a:
+                    a, b = b, a
+                key = (opcode, a, b)
+            nodes.append(self._node(key))
+        self._indices[name] = len(self.names)
+        self.names.append(name)
+        self.texts.append(text)
+        self._roots.append(nodes[-1])
+        self._tree_nodes += len(flat)
+        self._flat = None
+        self._functions.clear()
+        return nodes[-1]
+
+    @property
+    def flat(self) -> FlatExpression:
+        """
+        The graph as a FlatExpression over the sorted variables, the
+        position of every node is its index.
+        """
+        if self._flat is None:
+            rank = {name: i for i, name in enumerate(self.var)}
+            ids = [rank[name] for name in self._variable_ids]
+            variables = array('i', [ids[v] if v >= 0 else -1
+                                    for v in self._variables])
+            self._flat = FlatExpression(
+                self.var, array('b', self._opcodes), array('i', self._left),
+                array('i', self._right), variables,
+                array('i', range(len(self._opcodes))))
+        return self._flat
+
+    def sharing(self) -> Sharing:
+        """
+        Report how many nodes the trees of the rules have and how many of
+        them remain in the shared graph.
+        """
+        return Sharing(len(self.names), self._tree_nodes, len(self._opcodes))
+
+    def _function(self, logic: Logic | None) -> Callable[..., tuple]:
+        """
+        Compile the function returning the results of all rules, cached per
+        logic until a rule is added.
+        """
+        key = None if logic is None else logic.name
+        function = self._functions.get(key)
+        if function is None:
+            if logic is not None:
+                _check_commutative(logic)
+            function = compile_flat(self.flat, list(self._roots), logic)
+            self._functions[key] = function
+        return function
+
+    def _columns(self, assignments: Mapping | Sequence) -> List[list]:
+        """
+        Convert a batch of assignments to one column of values per variable,
+        in the order of 'var'.
+
+        Raises:
+            ValueError: If a variable is missing or unknown, or the rows or
+            columns have different lengths.
+        """
+        var = self.var
+        if isinstance(assignments, Mapping):
+            self._check_variables(assignments.keys())
+            columns = [list(assignments[name]) for name in var]
+            if len({len(column) for column in columns}) > 1:
+                raise ValueError("All columns of values must have the same"
+                                 " length.")
+            return columns
+        rows = list(assignments)
+        if rows and isinstance(rows[0], Mapping):
+            for row in rows:
+                self._check_variables(row.keys())
+            rows = [[row[name] for name in var] for row in rows]
+        elif any(len(row) != len(var) for row in rows):
+            raise ValueError(f"Every row must have a value for each of the"
+                             f" variables {var}.")
+        return [list(column) for column in zip(*rows)] if rows else \
+            [[] for _ in var]
+
+    def _check_variables(self, names) -> None:
+        names = set(names)
+        unknown = sorted(names.difference(self._variable_ids))
+        if unknown:
+            raise ValueError(f"Variables {unknown} were specified but do not"
+                             f" exist in the rules. This is the list of"
+                             f" variables in the rules {self.var}")
+        missing = [name for name in self.var if name not in names]
+        if missing:
+            raise ValueError(f"No values were specified for the variables"
+                             f" {missing}.")
+
+    def _check_values(self, columns: List[list],
+                      logic: Logic | None) -> List[list]:
+        """
+        Check the values of a batch and convert them to codes of the logic.
+
+        Raises:
+            TypeError: If a value is not of type int or float.
+            ValueError: If a value is not in the range [0, 1] or not a truth
+            value of the logic.
+        """
+        for name, column in zip(self.var, columns):
+            for value in column:
+                if not isinstance(value, (int, float)):
+                    raise TypeError(f"Value specified for variable {name} is"
+                                    f" not of int or float type, it is of"
+                                    f" {type(value)}")
+            if column and (min(column) < 0 or max(column) > 1):
+                value = min(column) if min(column) < 0 else max(column)
+                raise ValueError(f"Value specified for variable {name} is "
+                                 f" {value} which is not in the range [0, 1].")
+        if logic is None:
+            return columns
+        return [list(map(logic.code, column)) for column in columns]
+
+    def evaluate_many(self, assignments: Mapping | Sequence,
+                      logic: str | None = None) -> Dict[str, list]:
+        """
+        Evaluate all rules for a batch of assignments.
+
+        Args:
+            assignments (Mapping or Sequence): Either a mapping of every
+            variable to a sequence of values, or a sequence of assignments
+            given as dictionaries or as tuples in the order of 'var'.
+            logic (str or None): If None, the rules are evaluated with the
+            arithmetic of 'LogicalExpression.evaluate_many', otherwise on the
+            lookup tables of the named logic, whose truth values the values
+            must be.
+
+        Returns:
+            Dict[str, list]: The results of every rule, one per assignment,
+            keyed by the names of the rules.
+
+        Raises:
+            ValueError: If a variable is missing or unknown, a value is not a
+                valid truth value, or the logic is not supported or does not
+                have commutative '&', '|' and '<->'.
+            TypeError: If a value is not of type int or float.
+        """
+        logic = None if logic is None else get_logic(logic)
+        if not self.names:
+            return {}
+        columns = self._check_values(self._columns(assignments), logic)
+        function = self._function(logic)
+        results = list(zip(*map(function, *columns))) or \
+            [()] * len(self.names)
+        if logic is not None:
+            values = logic.values
+            results = [map(values.__getitem__, column) for column in results]
+        return {name: list(column) for name, column in zip(self.names,
+                                                           results)}
+
+    def evaluate(self, values: Mapping[str, float],
+                 logic: str | None = None) -> Dict[str, float]:
+        """
+        Evaluate all rules for one assignment, every shared subformula is
+        evaluated once.
+
+        Args:
+            values (Mapping[str, float]): The truth value of every variable.
+            logic (str or None): See 'evaluate_many'.
+
+        Returns:
+            Dict[str, float]: The result of every rule, keyed by the names of
+            the rules.
+
+        Raises:
+            ValueError, TypeError: Like 'evaluate_many'.
+        """
+        results = self.evaluate_many([values], logic)
+        return {name: column[0] for name, column in results.items()}
+
+    def roots(self) -> Dict[str, int]:
+        """
+        Map the name of every rule to the node of the graph evaluating it,
+        rules with the same node are equivalent up to commutativity.
+        """
+        return dict(zip(self.names, self._roots))
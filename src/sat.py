@@ -0,0 +1,364 @@
+# 2024 Sven van Loon
+
+from src.flat import (FlatExpression, VARIABLE, NEGATION, AND, OR,
+                      IMPLICATION, EQUIVALENCE)
+from heapq import heappush, heappop
+from typing import Dict, List
+
+TRUE = 1
+FALSE = -1
+UNASSIGNED = 0
+RESTART_BASE = 100
+ACTIVITY_DECAY = 0.95
+ACTIVITY_LIMIT = 1e100
+
+
+class CNF():
+    """
+    A formula in conjunctive normal form built with the Tseitin
+    transformation.
+
+    Variables are numbered from 1 and literals are non-zero integers, a
+    negative literal is the negation of its variable. Expression variables
+    with the same name share one CNF variable, so several expressions can be
+    encoded in the same formula, e.g. to check their equivalence.
+    """
+
+    def __init__(self) -> None:
+        self.variables = {}
+        self.num_vars = 0
+        self.clauses = []
+
+    def new_variable(self) -> int:
+        """
+        Create a fresh auxiliary variable.
+        """
+        self.num_vars += 1
+        return self.num_vars
+
+    def variable(self, name: str) -> int:
+        """
+        Get the CNF variable of an expression variable, creating it on first
+        use.
+        """
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def encode(self, flat: FlatExpression) -> int:
+        """
+        Add the Tseitin clauses of an expression to the formula.
+
+        Every binary operator gets an auxiliary variable that is equivalent
+        to its subformula, negations are encoded by negating the literal of
+        their operand, so the formula grows linearly with the expression.
+
+        Args:
+            flat (FlatExpression): The flattened expression.
+
+        Returns:
+            int: A literal equivalent to the whole expression.
+        """
+        literals = []
+        for i, opcode in enumerate(flat.opcodes):
+            if opcode == VARIABLE:
+                literals.append(self.variable(flat.var[flat.variables[i]]))
+                continue
+            a = literals[flat.left[i]]
+            if opcode == NEGATION:
+                literals.append(-a)
+                continue
+            b = literals[flat.right[i]]
+            x = self.new_variable()
+            if opcode == AND:
+                self.clauses += [[-x, a], [-x, b], [x, -a, -b]]
+            elif opcode == OR:
+                self.clauses += [[x, -a], [x, -b], [-x, a, b]]
+            elif opcode == IMPLICATION:
+                self.clauses += [[x, a], [x, -b], [-x, -a, b]]
+            elif opcode == EQUIVALENCE:
+                self.clauses += [[-x, -a, b], [-x, a, -b],
+                                 [x, a, b], [x, -a, -b]]
+            literals.append(x)
+        return literals[flat.root]
+
+
+def _luby(i: int) -> int:
+    """
+    Return the i-th element (starting at 1) of the Luby restart sequence
+    1, 1, 2, 1, 1, 2, 4, ...
+    """
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class Solver():
+    """
+    A conflict driven clause learning SAT solver.
+
+    The solver uses two watched literals per clause for unit propagation,
+    first unique implication point clause learning with non-chronological
+    backtracking, an activity based (VSIDS) decision heuristic with phase
+    saving, and restarts following the Luby sequence.
+    """
+
+    def __init__(self, num_vars: int) -> None:
+        self._num_vars = num_vars
+        self._clauses = []
+        self._watches = [[] for _ in range(2 * num_vars + 2)]
+        self._assigns = [UNASSIGNED] * (num_vars + 1)
+        self._level = [0] * (num_vars + 1)
+        self._reason = [None] * (num_vars + 1)
+        self._phase = [FALSE] * (num_vars + 1)
+        self._activity = [0.0] * (num_vars + 1)
+        self._activity_increment = 1.0
+        self._heap = [(0.0, v) for v in range(1, num_vars + 1)]
+        self._trail = []
+        self._trail_limits = []
+        self._queue_head = 0
+        self._unsatisfiable = False
+        self._model = None
+
+    @property
+    def model(self) -> Dict[int, bool] | None:
+        """
+        The satisfying assignment found by the last call of 'solve', mapping
+        every variable to its truth value, or None.
+        """
+        return self._model
+
+    def _value(self, literal: int) -> int:
+        value = self._assigns[abs(literal)]
+        return value if literal > 0 else -value
+
+    @staticmethod
+    def _index(literal: int) -> int:
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+    def add_clause(self, literals: List[int]) -> None:
+        """
+        Add a clause to the solver, this can only be done at decision level
+        zero, i.e. before or between calls of 'solve'.
+
+        Args:
+            literals (List[int]): The literals of the clause.
+        """
+        literals = set(literals)
+        clause = []
+        for literal in literals:
+            if -literal in literals or self._value(literal) == TRUE:
+                return
+            if self._value(literal) == UNASSIGNED:
+                clause.append(literal)
+        if not clause:
+            self._unsatisfiable = True
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            if self._propagate() is not None:
+                self._unsatisfiable = True
+        else:
+            self._attach(clause)
+
+    def _attach(self, clause: List[int]) -> int:
+        self._clauses.append(clause)
+        index = len(self._clauses) - 1
+        self._watches[self._index(clause[0])].append(index)
+        self._watches[self._index(clause[1])].append(index)
+        return index
+
+    def _enqueue(self, literal: int, reason: int | None) -> None:
+        v = abs(literal)
+        self._assigns[v] = TRUE if literal > 0 else FALSE
+        self._level[v] = len(self._trail_limits)
+        self._reason[v] = reason
+        self._trail.append(literal)
+
+    def _propagate(self) -> int | None:
+        """
+        Propagate all enqueued literals.
+
+        Returns:
+            int or None: The index of a conflicting clause, or None.
+        """
+        clauses = self._clauses
+        watches = self._watches
+        value = self._value
+        while self._queue_head < len(self._trail):
+            false_literal = -self._trail[self._queue_head]
+            self._queue_head += 1
+            watching = watches[self._index(false_literal)]
+            kept = []
+            conflict = None
+            for position, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if value(first) == TRUE:
+                    kept.append(index)
+                    continue
+                for k in range(2, len(clause)):
+                    if value(clause[k]) != FALSE:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches[self._index(clause[1])].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if value(first) == FALSE:
+                        conflict = index
+                        kept.extend(watching[position + 1:])
+                        break
+                    self._enqueue(first, index)
+            watches[self._index(false_literal)] = kept
+            if conflict is not None:
+                self._queue_head = len(self._trail)
+                return conflict
+        return None
+
+    def _bump(self, v: int) -> None:
+        self._activity[v] += self._activity_increment
+        if self._activity[v] > ACTIVITY_LIMIT:
+            self._activity = [a / ACTIVITY_LIMIT for a in self._activity]
+            self._activity_increment /= ACTIVITY_LIMIT
+            self._heap = [(-self._activity[u], u)
+                          for u in range(1, self._num_vars + 1)
+                          if self._assigns[u] == UNASSIGNED]
+            self._heap.sort()
+        elif self._assigns[v] == UNASSIGNED:
+            heappush(self._heap, (-self._activity[v], v))
+
+    def _analyze(self, conflict: int) -> tuple:
+        """
+        Derive a learnt clause from a conflict with the first unique
+        implication point scheme.
+
+        Returns:
+            tuple: The learnt clause, with its asserting literal first and a
+            literal of the backtrack level second, and the backtrack level.
+        """
+        seen = set()
+        learnt = [0]
+        counter = 0
+        literal = None
+        position = len(self._trail) - 1
+        current_level = len(self._trail_limits)
+        clause = self._clauses[conflict]
+        while True:
+            for q in clause:
+                v = abs(q)
+                if q == literal or v in seen or self._level[v] == 0:
+                    continue
+                seen.add(v)
+                self._bump(v)
+                if self._level[v] == current_level:
+                    counter += 1
+                else:
+                    learnt.append(q)
+            while abs(self._trail[position]) not in seen:
+                position -= 1
+            literal = self._trail[position]
+            position -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self._clauses[self._reason[abs(literal)]]
+        learnt[0] = -literal
+        if len(learnt) == 1:
+            return learnt, 0
+        deepest = max(range(1, len(learnt)),
+                      key=lambda i: self._level[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self._level[abs(learnt[1])]
+
+    def _backtrack(self, level: int) -> None:
+        if len(self._trail_limits) <= level:
+            return
+        start = self._trail_limits[level]
+        for literal in self._trail[start:]:
+            v = abs(literal)
+            self._phase[v] = TRUE if literal > 0 else FALSE
+            self._assigns[v] = UNASSIGNED
+            self._reason[v] = None
+            heappush(self._heap, (-self._activity[v], v))
+        del self._trail[start:]
+        del self._trail_limits[level:]
+        self._queue_head = len(self._trail)
+
+    def _pick_branch(self) -> int | None:
+        while self._heap:
+            activity, v = heappop(self._heap)
+            if self._assigns[v] == UNASSIGNED and \
+                    -activity == self._activity[v]:
+                return v
+        for v in range(1, self._num_vars + 1):
+            if self._assigns[v] == UNASSIGNED:
+                return v
+        return None
+
+    def solve(self) -> bool:
+        """
+        Decide whether the clauses are satisfiable.
+
+        Returns:
+            bool: True if the clauses are satisfiable, in that case 'model'
+            holds a satisfying assignment.
+        """
+        self._model = None
+        if self._unsatisfiable or self._propagate() is not None:
+            self._unsatisfiable = True
+            return False
+        restarts = 1
+        budget = RESTART_BASE * _luby(restarts)
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                if not self._trail_limits:
+                    self._unsatisfiable = True
+                    return False
+                learnt, level = self._analyze(conflict)
+                self._backtrack(level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self._enqueue(learnt[0], self._attach(learnt))
+                self._activity_increment /= ACTIVITY_DECAY
+                budget -= 1
+                if budget == 0:
+                    self._backtrack(0)
+                    restarts += 1
+                    budget = RESTART_BASE * _luby(restarts)
+                continue
+            v = self._pick_branch()
+            if v is None:
+                self._model = {u: self._assigns[u] == TRUE
+                               for u in range(1, self._num_vars + 1)}
+                self._backtrack(0)
+                return True
+            self._trail_limits.append(len(self._trail))
+            self._enqueue(v if self._phase[v] == TRUE else -v, None)
+
+
+def solve(cnf: CNF, assumptions: List[int] = ()) -> Dict[str, bool] | None:
+    """
+    Find a satisfying assignment of a formula.
+
+    Args:
+        cnf (CNF): The formula.
+        assumptions (List[int]): Literals that are added as unit clauses.
+
+    Returns:
+        Dict[str, bool] or None: The truth values of the expression
+        variables in a satisfying assignment, or None if the formula is not
+        satisfiable.
+    """
+    solver = Solver(cnf.num_vars)
+    for clause in cnf.clauses:
+        solver.add_clause(clause)
+    for literal in assumptions:
+        solver.add_clause([literal])
+    if not solver.solve():
+        return None
+    return {name: solver.model[v] for name, v in cnf.variables.items()}
@@ -0,0 +1,295 @@
+# 2024 Sven van Loon
+
+"""
+An asyncio server evaluating expressions for many concurrent clients.
+
+Clients connect over TCP or a Unix socket and send newline-delimited JSON
+requests, one object per line:
+
+    {"id": 1, "expression": "A & !C", "values": {"A": 1, "C": 0}}
+
+and receive one response per request, in the order the evaluations finish,
+which is not necessarily the order of the requests:
+
+    {"id": 1, "result": 1}
+    {"id": 2, "error": "ValueError: ..."}
+
+The request {"stats": true} returns the statistics of the server.
+
+Run the server with 'python -m src.server --port 8765' or
+'python -m src.server --unix /tmp/evaluator.sock'.
+"""
+
+from src.cache import ExpressionCache
+from src.expression import LogicalExpression
+from collections import deque
+from time import perf_counter
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import json
+
+MAX_BATCH = 1024
+BATCH_DELAY = 0.0
+MAX_PENDING = 10000
+MAX_LINE = 1 << 20
+LATENCY_WINDOW = 10000
+BACKLOG = 1024
+
+
+class _Batch():
+    """
+    The pending evaluations of one expression.
+    """
+
+    __slots__ = ('rows', 'futures', 'handle')
+
+    def __init__(self) -> None:
+        self.rows: List[tuple] = []
+        self.futures: List[asyncio.Future] = []
+        self.handle: asyncio.Handle | None = None
+
+
+class EvaluationServer():
+    """
+    Evaluate expressions for concurrent requests with micro-batching.
+
+    Parsed and compiled expressions stay resident in an LRU cache. Requests
+    for the same expression that arrive while the event loop is busy are
+    coalesced into a batch, which is evaluated with a single call into the
+    compiled function of the expression once the loop gets to it, after
+    'batch_delay' seconds or as soon as it holds 'max_batch' rows.
+
+    At most 'max_pending' requests are evaluated at a time. Beyond that the
+    server stops reading from its connections, so clients are slowed down by
+    the flow control of their sockets instead of queueing unbounded work.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH,
+                 batch_delay: float = BATCH_DELAY,
+                 max_pending: int = MAX_PENDING,
+                 cache: ExpressionCache | None = None) -> None:
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.cache = cache or ExpressionCache()
+        self._batches: Dict[int, Tuple[LogicalExpression, _Batch]] = {}
+        self._pending = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._started = perf_counter()
+        self._requests = 0
+        self._errors = 0
+        self._evaluated_batches = 0
+        self._evaluated_rows = 0
+        self._connections = 0
+
+    def _rows(self, expression: LogicalExpression, values: dict) -> tuple:
+        """
+        Validate the values of a request and order them like 'var'.
+
+        Raises:
+            ValueError: If a variable is missing or does not exist in the
+                expression, or a value is outside the valid range [0, 1].
+            TypeError: If a value is not of type int or float.
+        """
+        if not isinstance(values, dict):
+            raise TypeError(f"The values must be an object, not"
+                            f" {type(values).__name__}.")
+        expression._check_user_values(values)
+        missing = [name for name in expression.var if name not in values]
+        if missing:
+            raise ValueError(f"No values were specified for the variables"
+                             f" {missing}.")
+        return tuple(values[name] for name in expression.var)
+
+    def evaluate(self, text: str, values: dict) -> asyncio.Future:
+        """
+        Schedule the evaluation of an expression in the next batch of that
+        expression.
+
+        Args:
+            text (str): The expression.
+            values (dict): The truth values of all its variables.
+
+        Returns:
+            asyncio.Future: The future truth value of the expression.
+
+        Raises:
+            ValueError, TypeError: If the expression or the values are not
+            valid.
+        """
+        expression = self.cache.get(text)
+        row = self._rows(expression, values)
+        loop = asyncio.get_running_loop()
+        key = id(expression)
+        entry = self._batches.get(key)
+        if entry is None:
+            entry = self._batches[key] = (expression, _Batch())
+            if self.batch_delay:
+                entry[1].handle = loop.call_later(self.batch_delay,
+                                                  self._flush, key)
+            else:
+                entry[1].handle = loop.call_soon(self._flush, key)
+        batch = entry[1]
+        future = loop.create_future()
+        batch.rows.append(row)
+        batch.futures.append(future)
+        if len(batch.rows) >= self.max_batch:
+            batch.handle.cancel()
+            self._flush(key)
+        return future
+
+    def _flush(self, key: int) -> None:
+        """
+        Evaluate the pending batch of an expression.
+        """
+        expression, batch = self._batches.pop(key)
+        try:
+            results = list(map(expression.compile(), *zip(*batch.rows)))
+        except Exception as error:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
+        self._evaluated_batches += 1
+        self._evaluated_rows += len(batch.rows)
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter,
+                       lock: asyncio.Lock) -> None:
+        """
+        Answer a single request line.
+        """
+        start = perf_counter()
+        response = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise TypeError("A request must be a JSON object.")
+            response['id'] = request.get('id')
+            if request.get('stats'):
+                response['stats'] = self.stats()
+            else:
+                response['result'] = await self.evaluate(
+                    request['expression'], request.get('values', {}))
+        except Exception as error:
+            self._errors += 1
+            response['error'] = f"{type(error).__name__}: {error}"
+        finally:
+            self._pending.release()
+        self._requests += 1
+        self._latencies.append(perf_counter() - start)
+        writer.write(json.dumps(response).encode() + b'\n')
+        async with lock:
+            await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one connection until the client closes it.
+        """
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+        self._connections += 1
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                # Stop reading while too many requests are in flight.
+                await self._pending.acquire()
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    line = b''
+                if not line.strip():
+                    self._pending.release()
+                    if not line:
+                        break
+                    continue
+                task = asyncio.create_task(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        The statistics of the server.
+
+        Returns:
+            Dict[str, float]: The number of requests, errors, batches and open
+            connections, the mean batch size, the throughput in requests per
+            second since the start and the 50th, 99th and maximum latency in
+            seconds of the last LATENCY_WINDOW requests.
+        """
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1,
+                                 int(p * len(latencies)))]
+
+        elapsed = perf_counter() - self._started
+        info = self.cache.info()
+        return {'requests': self._requests,
+                'errors': self._errors,
+                'connections': self._connections,
+                'batches': self._evaluated_batches,
+                'mean_batch_size': self._evaluated_rows /
+                self._evaluated_batches if self._evaluated_batches else 0.0,
+                'throughput': self._requests / elapsed if elapsed else 0.0,
+                'latency_p50': percentile(0.5),
+                'latency_p99': percentile(0.99),
+                'latency_max': latencies[-1] if latencies else 0.0,
+                'cached_expressions': info.currsize}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765,
+                    path: str | None = None) -> asyncio.AbstractServer:
+        """
+        Start listening on a TCP port, or on a Unix socket if a path is
+        given.
+
+        Returns:
+            asyncio.AbstractServer: The listening server.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path,
+                                                   limit=MAX_LINE,
+                                                   backlog=BACKLOG)
+        return await asyncio.start_server(self.handle, host, port,
+                                          limit=MAX_LINE, backlog=BACKLOG)
+
+
+async def _serve(server: EvaluationServer, host: str, port: int,
+                 path: str | None) -> None:
+    listening = await server.start(host, port, path)
+    async with listening:
+        await listening.serve_forever()
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="listen on this Unix socket instead")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--batch-delay', type=float, default=BATCH_DELAY,
+                        help="seconds to wait for more requests of a batch")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING)
+    args = parser.parse_args(argv)
+    server = EvaluationServer(args.max_batch, args.batch_delay,
+                              args.max_pending)
+    try:
+        asyncio.run(_serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,446 @@
+# 2024 Sven van Loon
+
+from src.flat import (FlatExpression, VARIABLE, NEGATION, AND, OR,
+                      IMPLICATION, EQUIVALENCE)
+from src.logics import get_logic, is_arithmetic
+import json
+import mmap
+import struct
+from typing import Dict, List, Tuple
+
+MAGIC = b'LETT'
+VERSION = 1
+# magic, version, bits per value, number of rows, header length
+PREFIX = struct.Struct('<4sBBQI')
+ALIGNMENT = 8
+# Rows evaluated at once by 'write_table' and scanned at once by
+# 'TruthTableFile.count', a multiple of 8 so blocks start on a byte.
+ROWS_PER_CHUNK = 1 << 16
+# The files store classical logic (None) and the three valued logic of
+# Lukasiewicz ('3') only, the bit-parallel evaluation implements its
+# operators.
+TRUTH_VALUES = {None: (1, 0), '3': (1, 0.5, 0)}
+# A classical value is stored as one bit, a three valued value v as the
+# 2-bit code 2 * v.
+BITS = {None: 1, '3': 2}
+
+
+def _file_logic(logic: str | None) -> str | None:
+    """
+    Get the key in TRUTH_VALUES of a logic, which may be given by any of its
+    names, e.g. 'classical' or 'lukasiewicz-3'.
+
+    Raises:
+        ValueError: If the logic is not registered, or is not classical
+        logic or '3'.
+    """
+    resolved = get_logic(logic)
+    if not is_arithmetic(resolved):
+        raise ValueError(f"Truth table files store classical logic and the"
+                         f" logic '3' only, not {logic}.")
+    return None if resolved.size == 2 else '3'
+
+
+def _code(value: float, bits: int) -> int:
+    return int(value) if bits == 1 else int(2 * value)
+
+
+def _decode(code: int, bits: int) -> float:
+    return 0.5 if bits == 2 and code == 1 else code // bits
+
+
+def _column_size(rows: int, bits: int) -> int:
+    return (rows * bits + 7) // 8
+
+
+def _repeat(pattern: int, period: int, total: int) -> int:
+    """
+    Repeat a pattern of 'period' bits until it covers 'total' bits.
+    """
+    while period < total:
+        pattern |= pattern << period
+        period *= 2
+    return pattern & ((1 << total) - 1)
+
+
+def _digit_mask(i: int, n: int, k: int, digit: int, bits: int) -> int:
+    """
+    Select the rows of a table of n variables with k truth values in which
+    variable i has its digit-th truth value.
+
+    Returns:
+        int: A mask with bit 'bits * r' set for every selected row r.
+    """
+    total = k ** n * bits
+    block = k ** (n - 1 - i) * bits
+    pattern = ((1 << block) - 1) << (digit * block)
+    return _repeat(pattern, k * block, total) & _repeat(1, bits, total)
+
+
+def _run_mask(start: int, stop: int, period: int, run: int, offset: int,
+              bits: int) -> int:
+    """
+    Select the rows r from 'start' to 'stop' with (r - offset) % period below
+    'run', the rows of a table in which a variable has one truth value.
+
+    Returns:
+        int: A mask with all 'bits' bits of every selected row set, bit
+        'bits * (r - start)' being the lowest bit of row r.
+    """
+    total = (stop - start) * bits
+    shift = (offset - start) % period
+    if period <= stop - start:
+        # One period starting at 'start', the run may wrap around its end.
+        pattern = ((1 << run * bits) - 1) << shift * bits
+        pattern |= pattern >> period * bits
+        return _repeat(pattern & ((1 << period * bits) - 1), period * bits,
+                       total)
+    # A longer period overlaps the block with at most two runs.
+    mask = 0
+    for first in (shift - period, shift):
+        low = max(first, 0)
+        high = min(first + run, stop - start)
+        if low < high:
+            mask |= ((1 << (high - low) * bits) - 1) << low * bits
+    return mask
+
+
+def _evaluate_chunk(flat: FlatExpression,
+                    columns: List[Tuple[int, int]], flags: int,
+                    outputs: Dict[int, int]) -> List[Tuple[int, int]]:
+    """
+    Evaluate the nodes of an expression over all rows of a chunk at once.
+
+    A column is a pair of masks, of the rows in which a node is 1 and of the
+    rows in which it is 0, rows in neither mask are 0.5. On such pairs the
+    Lukasiewicz operators are bitwise operations, e.g. a & b is 1 where both
+    are 1 and 0 where either is 0.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+        columns (List[Tuple[int, int]]): The column of every variable.
+        flags (int): The mask of all rows of the chunk.
+        outputs (Dict[int, int]): The indices of the nodes to return, mapped
+        to their index in the returned list.
+
+    Returns:
+        List[Tuple[int, int]]: The columns of the output nodes.
+    """
+    results = []
+    selected = [None] * len(outputs)
+    for i, opcode in enumerate(flat.opcodes):
+        if opcode == VARIABLE:
+            results.append(columns[flat.variables[i]])
+        else:
+            # Every node has a single parent, release the operands as soon
+            # as they are used.
+            true_left, false_left = results[flat.left[i]]
+            results[flat.left[i]] = None
+            if opcode == NEGATION:
+                results.append((false_left, true_left))
+            else:
+                true_right, false_right = results[flat.right[i]]
+                results[flat.right[i]] = None
+                if opcode == AND:
+                    results.append((true_left & true_right,
+                                    false_left | false_right))
+                elif opcode == OR:
+                    results.append((true_left | true_right,
+                                    false_left & false_right))
+                else:
+                    both_unknown = flags & ~(true_left | false_left |
+                                             true_right | false_right)
+                    if opcode == IMPLICATION:
+                        results.append((false_left | true_right |
+                                        both_unknown,
+                                        true_left & false_right))
+                    elif opcode == EQUIVALENCE:
+                        results.append(((true_left & true_right) |
+                                        (false_left & false_right) |
+                                        both_unknown,
+                                        (true_left & false_right) |
+                                        (false_left & true_right)))
+        if i in outputs:
+            selected[outputs[i]] = results[i]
+    return selected
+
+
+def write_table(expression, path: str, logic: str | None = None) -> int:
+    """
+    Write the truth table of an expression to a binary file that can be
+    queried with 'TruthTableFile'.
+
+    The file starts with a fixed prefix and a JSON header naming the
+    expression, its variables in table order and the stored columns, padded
+    to a multiple of eight bytes. It is followed by one packed column per
+    intermediate evaluation, the value of row r taking bit r in classical
+    logic and bits 2r and 2r + 1 in the '3' logic. The variable columns are
+    not stored, they follow from the row index.
+
+    The table is evaluated bit-parallel in chunks of rows, so the memory use
+    does not grow with the size of the table.
+
+    Args:
+        expression (LogicalExpression): The expression to write.
+        path (str): The path of the output file.
+        logic (str or None): Specifies the logic to be used. If None,
+        defaults to propositional logic, if '3' Lukasiewicz logic. Other
+        logics cannot be stored.
+
+    Returns:
+        int: The number of rows in the table.
+
+    Raises:
+        ValueError: If the logic is not classical logic or '3'.
+
+    Example:
+        >>> write_table(LogicalExpression("A & !C"), "table.lett", logic='3')
+        9
+    """
+    logic = _file_logic(logic)
+    flat = expression.flat
+    bits = BITS[logic]
+    k = len(TRUTH_VALUES[logic])
+    n = len(flat.var)
+    rows = k ** n
+    positions = expression.evaluation_positions
+    tokens = expression.exp
+    names = [f"{tokens[p].value}@{p}" for p in positions]
+    result = names[positions.index(flat.positions[flat.root])]
+    header = json.dumps({'expression': expression.text, 'logic': logic,
+                         'variables': flat.var, 'columns': names,
+                         'result': result}).encode()
+    start = PREFIX.size + len(header)
+    start += -start % ALIGNMENT
+    size = _column_size(rows, bits)
+    index = {p: i for i, p in enumerate(flat.positions)}
+    outputs = {index[p]: j for j, p in enumerate(positions)}
+
+    # Every chunk fixes the first n - m variables, the columns of the last
+    # m variables are the same in every chunk.
+    m = 0
+    while m < n and k ** (m + 1) <= ROWS_PER_CHUNK:
+        m += 1
+    chunk_bits = k ** m * bits
+    flags = _repeat(1, bits, chunk_bits)
+    low = [(_digit_mask(i, m, k, 0, bits), _digit_mask(i, m, k, k - 1, bits))
+           for i in range(m)]
+
+    with open(path, 'wb') as file:
+        file.write(PREFIX.pack(MAGIC, VERSION, bits, rows, len(header)))
+        file.write(header)
+        file.truncate(start + size * len(names))
+        # Chunks of the '3' logic do not end on a byte boundary, the bits
+        # that do not fill a byte yet are carried over to the next chunk.
+        pending = [0] * len(names)
+        pending_bits = 0
+        written = 0
+        for chunk in range(k ** (n - m)):
+            high = []
+            for i in range(n - m):
+                digit = chunk // k ** (n - m - 1 - i) % k
+                high.append((flags if digit == 0 else 0,
+                             flags if digit == k - 1 else 0))
+            columns = _evaluate_chunk(flat, high + low, flags, outputs)
+            for j, (true, false) in enumerate(columns):
+                code = true if bits == 1 else \
+                    (true << 1) | (flags & ~(true | false))
+                pending[j] |= code << pending_bits
+            pending_bits += chunk_bits
+            complete = pending_bits // 8 if chunk < k ** (n - m) - 1 else \
+                size - written
+            for j in range(len(names)):
+                file.seek(start + j * size + written)
+                file.write((pending[j] & ((1 << 8 * complete) - 1))
+                           .to_bytes(complete, 'little'))
+                pending[j] >>= 8 * complete
+            pending_bits -= 8 * complete
+            written += complete
+    return rows
+
+
+class TruthTableFile():
+    """
+    A truth table written by 'write_table', opened with mmap.
+
+    Stored columns are exposed as zero-copy memoryviews of the mapped file
+    and queries only read the columns they need, so tables larger than the
+    available memory can be queried.
+
+    Example:
+        >>> with TruthTableFile("table.lett") as table:
+        ...     table.count(A=1, result=1)
+        1
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The path of a file written by 'write_table'.
+
+        Raises:
+            ValueError: If the file is not a truth table file of a supported
+            version.
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, bits, rows, length = PREFIX.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a truth table file of version"
+                             f" {VERSION}.")
+        header = json.loads(self._map[PREFIX.size:PREFIX.size + length])
+        self.expression = header['expression']
+        self.logic = header['logic']
+        self.variables = header['variables']
+        self.columns = header['columns']
+        self.result = header['result']
+        self.rows = rows
+        self._bits = bits
+        self._values = TRUTH_VALUES[self.logic]
+        self._start = PREFIX.size + length
+        self._start += -self._start % ALIGNMENT
+        self._size = _column_size(rows, bits)
+
+    def __enter__(self) -> 'TruthTableFile':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _column_name(self, name: str) -> str:
+        if name == 'result':
+            return self.result
+        if name not in self.columns:
+            raise KeyError(f"Column {name} does not exist, the columns are"
+                           f" {self.variables + self.columns + ['result']}.")
+        return name
+
+    def column(self, name: str) -> memoryview:
+        """
+        Get the packed bytes of a stored column without copying them.
+
+        Args:
+            name (str): The name of an evaluation column, e.g. '&@1', or
+            'result'.
+
+        Returns:
+            memoryview: The packed column, see 'write_table'.
+        """
+        start = self._start + \
+            self.columns.index(self._column_name(name)) * self._size
+        return memoryview(self._map)[start:start + self._size]
+
+    def row(self, k: int) -> Dict[str, float]:
+        """
+        Fetch a single row of the table.
+
+        Args:
+            k (int): The index of the row.
+
+        Returns:
+            Dict[str, float]: The truth values of the variables and of the
+            stored columns, and the value of the expression under 'result'.
+
+        Raises:
+            IndexError: If the row does not exist.
+        """
+        if not 0 <= k < self.rows:
+            raise IndexError(f"Row {k} does not exist, the table has"
+                             f" {self.rows} rows.")
+        digits = len(self._values)
+        n = len(self.variables)
+        row = {name: self._values[k // digits ** (n - 1 - i) % digits]
+               for i, name in enumerate(self.variables)}
+        bit = k * self._bits
+        for name in self.columns:
+            code = self.column(name)[bit // 8] >> (bit % 8)
+            row[name] = _decode(code & ((1 << self._bits) - 1), self._bits)
+        row['result'] = row[self.result]
+        return row
+
+    def _check_value(self, name: str, value: float) -> None:
+        if isinstance(value, bool) or value not in self._values:
+            raise ValueError(f"Value {value!r} of {name} is not a truth value"
+                             f" of the logic {self.logic}, use one of"
+                             f" {self._values}.")
+
+    def _mask(self, name: str, value: float, start: int, stop: int) -> int:
+        """
+        Select the rows from 'start' to 'stop' in which a column has a truth
+        value. The rows are read from the mapped file, so the mask only
+        covers the block.
+
+        Returns:
+            int: A mask with bit 'bits * (r - start)' set for every selected
+            row r.
+        """
+        bits = self._bits
+        total = (stop - start) * bits
+        flags = _repeat(1, bits, total)
+        if name in self.variables:
+            k = len(self._values)
+            run = k ** (len(self.variables) - 1 - self.variables.index(name))
+            return flags & _run_mask(start, stop, k * run, run,
+                                     self._values.index(value) * run, bits)
+        column = int.from_bytes(
+            self.column(name)[start * bits // 8:(stop * bits + 7) // 8],
+            'little') & ((1 << total) - 1)
+        code = _code(value, bits)
+        if bits == 1:
+            return column if code else flags & ~column
+        low = column & flags
+        high = (column >> 1) & flags
+        if code == 2:
+            return high
+        if code == 1:
+            return low
+        return flags & ~(low | high)
+
+    def count(self, **conditions) -> int:
+        """
+        Count the rows matching all conditions.
+
+        The columns are scanned in blocks of 'ROWS_PER_CHUNK' rows, so the
+        memory use does not grow with the size of the table.
+
+        Args:
+            **conditions: Keyword arguments mapping variables, evaluation
+            columns or 'result' to a truth value. Evaluation columns have
+            names like '&@1' that are not identifiers, pass them as
+            '**{"&@1": 1}'.
+
+        Returns:
+            int: The number of rows in which every named column has the given
+            truth value.
+
+        Raises:
+            KeyError: If a column does not exist.
+            ValueError: If a value is not a truth value of the logic of the
+            table.
+
+        Example:
+            >>> table.count(A=1, result=1)
+            1
+        """
+        selected = []
+        for name, value in conditions.items():
+            self._check_value(name, value)
+            if name not in self.variables:
+                name = self._column_name(name)
+            selected.append((name, value))
+        count = 0
+        for start in range(0, self.rows, ROWS_PER_CHUNK):
+            stop = min(start + ROWS_PER_CHUNK, self.rows)
+            mask = _repeat(1, self._bits, (stop - start) * self._bits)
+            for name, value in selected:
+                mask &= self._mask(name, value, start, stop)
+            count += mask.bit_count()
+        return count
@@ -0,0 +1,185 @@
+# 2024 Sven van Loon
+
+from src.flat import (FlatExpression, VARIABLE, NEGATION, AND, OR,
+                      IMPLICATION, EQUIVALENCE)
+from src.logics import Logic, get_logic, is_arithmetic
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+
+def _require_numpy() -> None:
+    """
+    Make sure numpy is available before running the vectorized engine.
+
+    Raises:
+        ImportError: If numpy is not installed.
+    """
+    if np is None:
+        raise ImportError("The vectorized truth table engine requires numpy,"
+                          " install it with 'pip install numpy'.")
+
+
+def _values(logic: Logic) -> "np.ndarray":
+    """
+    The truth values of a logic indexed by their codes, as int8 for
+    classical logic and as float32 if that represents them exactly.
+    """
+    if logic.size == 2:
+        return np.array(logic.values, dtype=np.int8)
+    values = np.array(logic.values, dtype=np.float32)
+    if (values == np.array(logic.values)).all():
+        return values
+    return np.array(logic.values, dtype=np.float64)
+
+
+def _columns(var: List[str], values: "np.ndarray") \
+        -> Dict[str, "np.ndarray"]:
+    """
+    Repeat the values in table order into a column per variable.
+    """
+    k = len(values)
+    n = len(var)
+    columns = {}
+    for i, name in enumerate(var):
+        columns[name] = np.tile(np.repeat(values, k ** (n - 1 - i)), k ** i)
+    return columns
+
+
+def variable_columns(var: List[str], logic: str | None = None) \
+        -> Dict[str, "np.ndarray"]:
+    """
+    Build the column of truth values of every variable in a truth table.
+
+    The rows are ordered exactly like 'itertools.product' orders them, so row
+    k of the columns corresponds to the k-th combination printed by
+    'LogicalExpression.truth_table'.
+
+    Args:
+        var (List[str]): The sorted variables of the expression.
+        logic (str or None): The name of a registered logic, None for
+        classical logic.
+
+    Returns:
+        Dict[str, np.ndarray]: A dictionary mapping each variable to its
+        column of truth values.
+
+    Raises:
+        ValueError: If the logic is not supported.
+    """
+    _require_numpy()
+    logic = get_logic(logic)
+    return _columns(var, _values(logic)[list(logic.order)])
+
+
+def evaluate_columns(flat: FlatExpression, columns: Dict[str, "np.ndarray"]) \
+        -> Dict[int, "np.ndarray"]:
+    """
+    Evaluate an expression once over whole columns of truth values.
+
+    Every operator node is evaluated with the array form of the Lukasiewicz
+    operators (min, max, 1 - x, min(1, 1 - x + y) and 1 - |x - y|), which
+    coincide with the classical operators on the values 0 and 1.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+        columns (Dict[str, np.ndarray]): A dictionary mapping each variable
+        to its column of truth values.
+
+    Returns:
+        Dict[int, np.ndarray]: A dictionary mapping the position of every
+        node in the tokenized expression to its column of truth values.
+    """
+    _require_numpy()
+    results = []
+    for i, opcode in enumerate(flat.opcodes):
+        if opcode == VARIABLE:
+            results.append(columns[flat.var[flat.variables[i]]])
+            continue
+        left_side = results[flat.left[i]]
+        if opcode == NEGATION:
+            results.append(1 - left_side)
+            continue
+        right_side = results[flat.right[i]]
+        if opcode == AND:
+            results.append(np.minimum(left_side, right_side))
+        elif opcode == OR:
+            results.append(np.maximum(left_side, right_side))
+        elif opcode == IMPLICATION:
+            results.append(np.minimum(1, 1 - left_side + right_side))
+        elif opcode == EQUIVALENCE:
+            results.append(1 - np.abs(left_side - right_side))
+    return dict(zip(flat.positions, results))
+
+
+def evaluate_codes(flat: FlatExpression, columns: Dict[str, "np.ndarray"],
+                   logic: Logic) -> Dict[int, "np.ndarray"]:
+    """
+    Evaluate an expression once over whole columns of codes of truth values
+    with the lookup tables of a logic.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+        columns (Dict[str, np.ndarray]): A dictionary mapping each variable
+        to its column of codes.
+        logic (Logic): The logic.
+
+    Returns:
+        Dict[int, np.ndarray]: A dictionary mapping the position of every
+        node in the tokenized expression to its column of codes.
+    """
+    _require_numpy()
+    # A binary table is indexed with a * size + b in its flattened form.
+    tables = {opcode: np.array(table, dtype=np.int8).ravel()
+              for opcode, table in logic.tables.items()}
+    results = []
+    for i, opcode in enumerate(flat.opcodes):
+        if opcode == VARIABLE:
+            results.append(columns[flat.var[flat.variables[i]]])
+        elif opcode == NEGATION:
+            results.append(tables[NEGATION][results[flat.left[i]]])
+        else:
+            index = results[flat.left[i]].astype(np.intp) * logic.size
+            results.append(tables[opcode][index + results[flat.right[i]]])
+    return dict(zip(flat.positions, results))
+
+
+def vectorized_truth_table(flat: FlatExpression,
+                           operators_positions: List[int],
+                           logic: str | None = None) \
+        -> Tuple[Dict[str, "np.ndarray"], Dict[int, "np.ndarray"]]:
+    """
+    Compute a complete truth table with one pass over whole columns.
+
+    Args:
+        flat (FlatExpression): The flattened expression.
+        operators_positions (List[int]): The positions of the operators in
+        the tokenized expression.
+        logic (str or None): The name of a registered logic, None for
+        classical logic.
+
+    Returns:
+        tuple: A tuple containing the variable columns keyed by variable name
+        and the evaluation columns keyed by the position of the operator in
+        the tokenized expression. If the expression has no operators the
+        evaluation column of its single variable is returned instead.
+
+    Raises:
+        ValueError: If the logic is not supported.
+    """
+    positions = operators_positions or [flat.positions[flat.root]]
+    columns = variable_columns(flat.var, logic)
+    logic = get_logic(logic)
+    if is_arithmetic(logic):
+        results = evaluate_columns(flat, columns)
+        return columns, {position: results[position]
+                         for position in positions}
+    codes = evaluate_codes(
+        flat, _columns(flat.var, np.array(logic.order, dtype=np.int8)),
+        logic)
+    values = _values(logic)
+    return columns, {position: values[codes[position]]
+                     for position in positions}
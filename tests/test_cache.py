@@ -0,0 +1,15 @@
+# 2024 Sven van Loon
+
+from src.cache import ExpressionCache
+
+
+def test_spellings_keep_their_own_text_and_positions():
+    cache = ExpressionCache()
+    first = cache.get('A&~C')
+    second = cache.get('(A) & !C')
+    assert second.text == '(A) & !C'
+    assert second.evaluation_positions == [3, 4]
+    _, evaluations = second.evaluate_many([(1, 0)], intermediate=True)
+    assert evaluations == {3: [1], 4: [1]}
+    assert second.compile() is first.compile()
+    assert cache.get('(A) & !C') is second
@@ -0,0 +1,19 @@
+# 2024 Sven van Loon
+
+from src.cli import main
+import pytest
+
+
+@pytest.mark.parametrize('format', ['jsonl', 'text'])
+def test_table_invalid_expression(capsys, format):
+    assert main(['table', 'A &', '--format', format]) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert captured.err.startswith("error: Unexpected end of expression")
+
+
+def test_table_valid_expression(capsys):
+    assert main(['table', 'A & !C']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == '{"A": 1, "C": 1, "result": 0}'
+    assert len(lines) == 4
@@ -0,0 +1,16 @@
+# 2024 Sven van Loon
+
+from src.expression import LogicalExpression
+import pytest
+
+
+def test_frozen_expression_ignores_a_new_rule():
+    expression = LogicalExpression("A & !C")
+    compiled = expression.freeze()
+    expression.exp = "B"
+    assert compiled.var == ('A', 'C')
+    assert compiled.flat.to_string() == 'A & !C'
+    assert compiled.evaluate(A=1, C=0) == 1
+    assert compiled.evaluate_many({'A': [1, 1], 'C': [0, 1]}) == [1, 0]
+    with pytest.raises(ValueError, match="Variable B was specified"):
+        compiled.evaluate(A=1, B=0, C=0)
@@ -0,0 +1,32 @@
+# 2024 Sven van Loon
+
+from src.expression import LogicalExpression
+from src.filtering import evaluate_chunk, filter_csv
+import pytest
+
+
+def test_evaluate_chunk_rejects_nan():
+    expression = LogicalExpression("A & !C")
+    with pytest.raises(ValueError, match="variable A is nan"):
+        evaluate_chunk(expression, {'A': [1, float('nan')], 'C': [0, 0]})
+
+
+def test_evaluate_many_rejects_nan():
+    expression = LogicalExpression("A & !C")
+    with pytest.raises(ValueError, match="not in the range"):
+        expression.evaluate_many({'A': [float('nan')], 'C': [0]})
+
+
+def test_filter_csv_rejects_nan(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("A,C\n1,0\nnan,0\n")
+    with pytest.raises(ValueError, match="nan"):
+        filter_csv(LogicalExpression("A & !C"), str(source),
+                   str(tmp_path / "out.csv"), threshold=0)
+
+
+def test_filter_csv_threshold_zero_writes_every_row(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("A,C\n1,0\n0,1\n0.5,0.5\n")
+    assert filter_csv(LogicalExpression("A & !C"), str(source),
+                      str(tmp_path / "out.csv"), threshold=0) == (3, 3)
@@ -0,0 +1,23 @@
+# 2024 Sven van Loon
+
+from src.logics import MAX_SIZE, get_logic, is_arithmetic, register_logic
+from src.logics import lukasiewicz
+import pytest
+
+
+@pytest.mark.parametrize('name', ['lukasiewicz-02', 'lukasiewicz-03',
+                                  'goedel-1', f'post-{MAX_SIZE + 1}',
+                                  'goedel-4x', 'goedel-'])
+def test_get_logic_rejects_invalid_family_names(name):
+    with pytest.raises(ValueError, match="is not supported"):
+        get_logic(name)
+
+
+def test_get_logic_keeps_registered_logics():
+    classical = get_logic(None)
+    assert get_logic('lukasiewicz-2') is classical
+    assert get_logic('goedel-4') is get_logic('goedel-4')
+    assert get_logic(f'post-{MAX_SIZE}').size == MAX_SIZE
+    with pytest.raises(ValueError, match="already registered"):
+        register_logic(lukasiewicz(3))
+    assert is_arithmetic(get_logic('lukasiewicz-3'))